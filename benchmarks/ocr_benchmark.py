@@ -0,0 +1,460 @@
+"""OCR throughput benchmark over a synthetic, reproducible page corpus.
+
+The corpus is generated locally from known text: scanned-looking PDFs
+(pages rendered with PyMuPDF, then degraded with noise and skew and
+stored as images) in English, Tamil and mixed text, plus loose PNG/JPEG
+page images. Each stage below runs in its own process so peak RSS is
+measured per stage:
+
+    perform_ocr        ocr_engine.perform_ocr on every page image
+    ocr_tamil_cleaned  gui.ocr_tamil_cleaned on every page image
+    process_pdf        gui.process_pdf (DOCX output) on every corpus PDF
+
+Results (pages/sec, p50/p95 per-page latency, peak RSS) are written as
+JSON. For process_pdf the latency is that of its OCR pass; the per-page
+time of the cleanup and translation pass that follows is reported as
+cleanup_p50_ms and cleanup_p95_ms. Pass --baseline to compare with an
+earlier run:
+
+    python benchmarks/ocr_benchmark.py --output results.json
+    python benchmarks/ocr_benchmark.py --baseline results.json
+
+Translation is skipped in process_pdf unless --translate is given, so runs
+don't depend on the network. The OCR result cache is redirected to a
+fresh database for every stage, so every page is really recognized.
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import shutil
+import sys
+import tempfile
+import time
+import traceback
+
+import cv2
+import fitz  # PyMuPDF
+import numpy as np
+import pytesseract
+
+# The benchmark lives one level below the scripts it measures
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import ocr_cache  # noqa: E402
+import ocr_engine  # noqa: E402
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_CORPUS_DIR = os.path.join(os.path.expanduser("~"), ".ocr_tool", "bench_corpus")
+STAGES = ("perform_ocr", "ocr_tamil_cleaned", "process_pdf")
+CORPUS_VERSION = 1
+
+# Fonts that cover Tamil; the first one found is used for Tamil pages
+TAMIL_FONT_CANDIDATES = [
+    r"C:\Windows\Fonts\Nirmala.ttf",
+    r"C:\Windows\Fonts\latha.ttf",
+    "/usr/share/fonts/truetype/noto/NotoSansTamil-Regular.ttf",
+    "/usr/share/fonts/opentype/noto/NotoSansTamil-Regular.ttf",
+    "/usr/share/fonts/truetype/lohit-tamil/Lohit-Tamil.ttf",
+    "/Library/Fonts/Tamil MN.ttc",
+]
+
+ENGLISH_WORDS = (
+    "the quick brown fox jumps over lazy dog document page report section "
+    "library archive record evidence history village temple river market "
+    "letter number table figure summary chapter method result account"
+).split()
+TAMIL_WORDS = (
+    "தமிழ் மொழி நூல் பக்கம் கோயில் ஆறு ஊர் வரலாறு கடிதம் அறிக்கை "
+    "பள்ளி மாணவர் ஆசிரியர் புத்தகம் செய்தி நாள் மக்கள் நாடு"
+).split()
+
+# Page variants cycle through clean, noisy, skewed and noisy+skewed scans
+DEGRADATIONS = [
+    {"noise": 0, "skew": 0.0},
+    {"noise": 25, "skew": 0.0},
+    {"noise": 0, "skew": 2.5},
+    {"noise": 25, "skew": -1.5},
+]
+
+
+def find_tamil_font(explicit=None):
+    for path in ([explicit] if explicit else []) + TAMIL_FONT_CANDIDATES:
+        if path and os.path.isfile(path):
+            return path
+    return None
+
+
+def make_text(rng, script, word_count):
+    """Random but reproducible paragraph text in the given script"""
+    if script == "english":
+        words = rng.choice(ENGLISH_WORDS, word_count)
+    elif script == "tamil":
+        words = rng.choice(TAMIL_WORDS, word_count)
+    else:
+        words = [rng.choice(TAMIL_WORDS if i % 2 else ENGLISH_WORDS) for i in range(word_count)]
+    lines = [" ".join(words[i:i + 8]) for i in range(0, len(words), 8)]
+    return "\n".join(lines)
+
+
+def degrade(gray, rng, noise, skew):
+    """Add Gaussian noise and rotate by skew degrees, like a cheap scanner"""
+    image = gray.astype(np.float32)
+    if noise:
+        image += rng.normal(0, noise, image.shape)
+    image = np.clip(image, 0, 255).astype(np.uint8)
+    if skew:
+        height, width = image.shape
+        matrix = cv2.getRotationMatrix2D((width / 2, height / 2), skew, 1.0)
+        image = cv2.warpAffine(image, matrix, (width, height), borderValue=255)
+    return image
+
+
+def render_scan(text, script, tamil_font, rng, degradation):
+    """Lay text out on an A4 page and return it as a degraded grayscale scan"""
+    doc = fitz.open()
+    page = doc.new_page(width=595, height=842)
+    rect = fitz.Rect(60, 60, 535, 782)
+    if script == "english" or tamil_font is None:
+        page.insert_textbox(rect, text, fontsize=12, fontname="helv")
+    else:
+        page.insert_textbox(rect, text, fontsize=12, fontname="tamil", fontfile=tamil_font)
+    gray = np.array(ocr_engine.render_page_gray(page, ocr_engine.RENDER_ZOOM))
+    doc.close()
+    return degrade(gray, rng, **degradation)
+
+
+def build_corpus(corpus_dir, documents, pages_per_document, images, seed, tamil_font):
+    """Generate the corpus unless one with the same parameters already exists"""
+    params = {
+        "version": CORPUS_VERSION, "documents": documents, "pages_per_document": pages_per_document,
+        "images": images, "seed": seed, "tamil_font": os.path.basename(tamil_font or ""),
+    }
+    manifest_path = os.path.join(corpus_dir, "manifest.json")
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest["params"] == params:
+            return manifest
+    except (FileNotFoundError, ValueError, KeyError):
+        pass
+
+    if os.path.isdir(corpus_dir):
+        shutil.rmtree(corpus_dir)
+    os.makedirs(corpus_dir)
+
+    scripts = ["english", "tamil", "mixed"] if tamil_font else ["english"]
+    if tamil_font is None:
+        print("No Tamil font found; generating English pages only (see --tamil-font)")
+
+    rng = np.random.default_rng(seed)
+    manifest = {"params": params, "pdfs": [], "images": []}
+    page_counter = 0
+    for doc_index in range(documents):
+        script = scripts[doc_index % len(scripts)]
+        pdf_path = os.path.join(corpus_dir, f"doc_{doc_index:02d}_{script}.pdf")
+        pdf = fitz.open()
+        texts = []
+        for _ in range(pages_per_document):
+            text = make_text(rng, script, 160)
+            scan = render_scan(text, script, tamil_font, rng, DEGRADATIONS[page_counter % len(DEGRADATIONS)])
+            page_counter += 1
+            _, png = cv2.imencode(".png", scan)
+            # Image-only pages, so every page goes through OCR like a real scan
+            page = pdf.new_page(width=595, height=842)
+            page.insert_image(page.rect, stream=png.tobytes())
+            texts.append(text)
+        pdf.save(pdf_path)
+        pdf.close()
+        manifest["pdfs"].append({"path": os.path.basename(pdf_path), "script": script, "texts": texts})
+
+    for image_index in range(images):
+        script = scripts[image_index % len(scripts)]
+        text = make_text(rng, script, 120)
+        scan = render_scan(text, script, tamil_font, rng, DEGRADATIONS[image_index % len(DEGRADATIONS)])
+        extension = ".png" if image_index % 2 == 0 else ".jpg"
+        image_path = os.path.join(corpus_dir, f"image_{image_index:02d}_{script}{extension}")
+        cv2.imwrite(image_path, scan)
+        manifest["images"].append({"path": os.path.basename(image_path), "script": script, "text": text})
+
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process so far, or None if unknown"""
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        # peak_wset is the Windows peak; elsewhere fall back to getrusage
+        if hasattr(info, "peak_wset"):
+            return info.peak_wset
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and kilobytes on Linux
+        return peak if sys.platform == "darwin" else peak * 1024
+    return None
+
+
+def corpus_page_images(corpus_dir, manifest):
+    """Every page of the corpus as (name, image) with PDF pages pre-rendered"""
+    pages = []
+    for entry in manifest["images"]:
+        path = os.path.join(corpus_dir, entry["path"])
+        pages.append((entry["path"], ocr_engine.load_page_image(path, None)))
+    for entry in manifest["pdfs"]:
+        path = os.path.join(corpus_dir, entry["path"])
+        for page_num in range(len(entry["texts"])):
+            # Copy, since the rendered view is tied to the open document
+            gray = np.array(ocr_engine.load_page_image(path, page_num))
+            pages.append((f"{entry['path']}:{page_num + 1}", gray))
+    return pages
+
+
+class _SilentProgress:
+    """process_pdf progress reporter that only records when pages finish each pass"""
+
+    def __init__(self):
+        # Pass 1 (OCR) and pass 2 (cleanup and translation)
+        self.recognized_times = []
+        self.completed_times = []
+
+    def set_status(self, text):
+        if text.startswith("Recognized page"):
+            self.recognized_times.append(time.perf_counter())
+        elif text.startswith("Completed page"):
+            self.completed_times.append(time.perf_counter())
+
+    def set_percent(self, percent):
+        pass
+
+    def set_elapsed(self, text):
+        pass
+
+    def set_estimated(self, text):
+        pass
+
+    def refresh(self):
+        pass
+
+    def show_info(self, title, message):
+        pass
+
+    def show_error(self, title, message):
+        print(f"{title}: {message}", file=sys.stderr)
+
+
+def run_stage(stage, corpus_dir, manifest, options):
+    """Run one stage in the current process and return its measurements"""
+    # Measure recognition, not cache hits
+    cache_dir = tempfile.mkdtemp(prefix="ocr_bench_cache_")
+    ocr_cache._default_cache = ocr_cache.OCRCache(path=os.path.join(cache_dir, "cache.sqlite"))
+
+    latencies = []
+    # process_pdf only: per-page time of the cleanup and translation pass
+    cleanup_latencies = []
+    errors = 0
+    started = time.perf_counter()
+    try:
+        if stage in ("perform_ocr", "ocr_tamil_cleaned"):
+            pages = corpus_page_images(corpus_dir, manifest)
+            if stage == "ocr_tamil_cleaned":
+                import gui
+                pytesseract.pytesseract.tesseract_cmd = options["tesseract_cmd"]
+            started = time.perf_counter()
+            for page_number, (name, image) in enumerate(pages, 1):
+                page_start = time.perf_counter()
+                try:
+                    if stage == "perform_ocr":
+                        ocr_engine.perform_ocr(image, options["lang"])
+                    else:
+                        gui.ocr_tamil_cleaned(image, page_number)
+                except Exception as e:
+                    errors += 1
+                    print(f"{stage} {name}: {e}", file=sys.stderr)
+                latencies.append(time.perf_counter() - page_start)
+
+        elif stage == "process_pdf":
+            import gui
+            pytesseract.pytesseract.tesseract_cmd = options["tesseract_cmd"]
+            if not options["translate"]:
+                gui.translate_and_rewrite_text = lambda text, target_lang='en', max_retries=3: text
+            output_dir = tempfile.mkdtemp(prefix="ocr_bench_out_")
+            # A journal left by an interrupted run would skip pages
+            journal_dir = tempfile.mkdtemp(prefix="ocr_bench_journal_")
+            started = time.perf_counter()
+            for entry in manifest["pdfs"]:
+                progress = _SilentProgress()
+                doc_start = time.perf_counter()
+                ok = gui.process_pdf(
+                    os.path.join(corpus_dir, entry["path"]),
+                    set(range(1, len(entry["texts"]) + 1)),
+                    "DOCX",
+                    "en",
+                    progress=progress,
+                    output_dir=output_dir,
+                    ocr_lang=options["lang"],
+                    play_audio=False,
+                    journal_dir=journal_dir,
+                )
+                errors += not ok
+                previous = doc_start
+                for finished in progress.recognized_times:
+                    latencies.append(finished - previous)
+                    previous = finished
+                for finished in progress.completed_times:
+                    cleanup_latencies.append(finished - previous)
+                    previous = finished
+            shutil.rmtree(output_dir, ignore_errors=True)
+            shutil.rmtree(journal_dir, ignore_errors=True)
+    finally:
+        elapsed = time.perf_counter() - started
+        ocr_cache._default_cache.close()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    result = {
+        "pages": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "pages_per_sec": round(len(latencies) / elapsed, 3) if elapsed > 0 else None,
+        "p50_ms": percentile_ms(latencies, 50),
+        "p95_ms": percentile_ms(latencies, 95),
+        "peak_rss_mb": None if peak_rss_bytes() is None else round(peak_rss_bytes() / 2 ** 20, 1),
+    }
+    if cleanup_latencies:
+        result["cleanup_p50_ms"] = percentile_ms(cleanup_latencies, 50)
+        result["cleanup_p95_ms"] = percentile_ms(cleanup_latencies, 95)
+    return result
+
+
+def percentile_ms(latencies, percent):
+    """A percentile of latencies in seconds, in milliseconds, or None if there are none"""
+    if not latencies:
+        return None
+    return round(float(np.percentile(latencies, percent)) * 1000, 1)
+
+
+def _stage_process(stage, corpus_dir, manifest, options, results):
+    # Results go back as (ok, measurements or traceback text)
+    try:
+        pytesseract.pytesseract.tesseract_cmd = options["tesseract_cmd"]
+        results.put((True, run_stage(stage, corpus_dir, manifest, options)))
+    except BaseException:
+        results.put((False, traceback.format_exc()))
+        raise
+
+
+def run_stage_isolated(stage, corpus_dir, manifest, options):
+    """Run a stage in a fresh process so its peak RSS is its own.
+
+    Raises RuntimeError if the stage fails or its process exits without a result.
+    """
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=_stage_process, args=(stage, corpus_dir, manifest, options, results))
+    process.start()
+    try:
+        while True:
+            try:
+                ok, result = results.get(timeout=1)
+                break
+            except queue.Empty:
+                # A process that died before reporting (on import, say) never will
+                if process.exitcode is not None and results.empty():
+                    raise RuntimeError(f"{stage} exited with code {process.exitcode} and no result")
+    finally:
+        process.join()
+    if not ok:
+        raise RuntimeError(f"{stage} failed:\n{result}")
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """Print the change from the baseline; returns the names of regressed stages"""
+    regressions = []
+    for stage, current in results["stages"].items():
+        previous = baseline.get("stages", {}).get(stage)
+        if not previous:
+            continue
+        print(f"{stage}:")
+        for metric, higher_is_better in (("pages_per_sec", True), ("p50_ms", False),
+                                         ("p95_ms", False), ("cleanup_p50_ms", False),
+                                         ("cleanup_p95_ms", False), ("peak_rss_mb", False)):
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            flag = "  REGRESSION" if worse > tolerance else ""
+            print(f"  {metric:14} {old:10.2f} -> {new:10.2f} ({change:+.1%}){flag}")
+            if flag and stage not in regressions:
+                regressions.append(stage)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark OCR throughput on a synthetic corpus")
+    parser.add_argument("--corpus-dir", default=DEFAULT_CORPUS_DIR)
+    parser.add_argument("--documents", type=int, default=6, help="number of corpus PDFs")
+    parser.add_argument("--pages", type=int, default=4, help="pages per corpus PDF")
+    parser.add_argument("--images", type=int, default=4, help="number of loose page images")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--tamil-font", help="TrueType font with Tamil glyphs")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--lang", default="tam+eng", help="Tesseract language(s)")
+    parser.add_argument("--tesseract-cmd", default=shutil.which("tesseract") or pytesseract.pytesseract.tesseract_cmd)
+    parser.add_argument("--translate", action="store_true", help="include translation in process_pdf")
+    parser.add_argument("--output", default="ocr_benchmark_results.json")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="relative slowdown reported as a regression (default: 0.10)")
+    args = parser.parse_args(argv)
+
+    tamil_font = find_tamil_font(args.tamil_font)
+    manifest = build_corpus(args.corpus_dir, args.documents, args.pages, args.images, args.seed, tamil_font)
+
+    options = {"lang": args.lang, "tesseract_cmd": args.tesseract_cmd, "translate": args.translate}
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": {"platform": platform.platform(), "python": platform.python_version(),
+                    "cpus": os.cpu_count(), "tesserocr": ocr_engine.engine.available},
+        "corpus": manifest["params"],
+        "corpus_digest": hashlib.sha256(json.dumps(manifest, sort_keys=True).encode()).hexdigest()[:16],
+        "stages": {},
+    }
+    for stage in args.stages:
+        print(f"Running {stage}...", flush=True)
+        results["stages"][stage] = run_stage_isolated(stage, args.corpus_dir, manifest, options)
+        print(f"  {results['stages'][stage]}", flush=True)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get("corpus_digest") != results["corpus_digest"]:
+            print("Warning: the baseline was measured on a different corpus")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"Regressed stages: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
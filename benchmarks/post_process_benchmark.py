@@ -0,0 +1,131 @@
+"""Benchmark of text_processing.post_process_text on multi-megabyte OCR text.
+
+Compares the compiled rule set with the original implementation from
+new.py (kept below as the reference), checks that both give the same
+output, and reports throughput for each:
+
+    python benchmarks/post_process_benchmark.py --sizes 1 4 16
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+# The benchmark lives one level below the module it measures
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import text_processing  # noqa: E402
+
+WORDS = (
+    "the quick brown fox jumps over lazy dog page 10 chapter l1 section [a] {b} rn "
+    "modern corner | 0pen closed tamil தமிழ் மொழி நூல் - hyphen- ated , . ! ? x y z"
+).split()
+NOISE = ["\x0c", "​", "‍", "\t", "  ", "\r", "\x07"]
+
+
+def reference_post_process_text(text):
+    """post_process_text as it was in new.py, minus the error reporting"""
+    if not text:
+        return text
+
+    paragraphs = text.split('\n\n')
+    cleaned_paragraphs = []
+    for para in paragraphs:
+        lines = para.split('\n')
+        merged_lines = []
+        current_line = ""
+
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+
+            if current_line and not current_line[-1] in '.!?":)]}':
+                current_line += ' ' + line
+            else:
+                if current_line:
+                    merged_lines.append(current_line)
+                current_line = line
+
+        if current_line:
+            merged_lines.append(current_line)
+
+        cleaned_para = ' '.join(merged_lines)
+        if cleaned_para:
+            cleaned_paragraphs.append(cleaned_para)
+
+    text = '\n\n'.join(cleaned_paragraphs)
+
+    common_fixes = {
+        'l': 'I', '0': 'O', '|': 'I', '1': 'l', 'rn': 'm',
+        '[': '(', ']': ')', '{': '(', '}': ')',
+    }
+    for wrong, correct in common_fixes.items():
+        text = text.replace(wrong, correct)
+
+    text = re.sub(r'(?<=\w)\s+(?=[\.,!?])', '', text)
+    text = re.sub(r'(?<=[\.,!?])\s*(?=\w)', ' ', text)
+    text = re.sub(r'\s+[b-zB-Z]\s+', ' ', text)
+    text = re.sub(r'(?<=\w)[-]\s+', '-', text)
+    text = re.sub(r'\s+[-](?=\w)', '-', text)
+    text = ''.join(char for char in text if char.isprintable() or char in '\n\t')
+
+    return text.strip()
+
+
+def make_ocr_text(size_bytes, seed, noise=0.01):
+    """Page-like text with short lines, blank-line paragraphs and OCR noise.
+
+    noise is the share of lines that end in a control or invisible character.
+    """
+    rng = random.Random(seed)
+    pieces = []
+    length = 0
+    while length < size_bytes:
+        line = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 12)))
+        if rng.random() < noise:
+            line += rng.choice(NOISE)
+        pieces.append(line)
+        pieces.append("\n\n" if rng.random() < 0.1 else "\n")
+        length += len(line) + 1
+    return "".join(pieces)
+
+
+def best_time(func, text, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark OCR text post-processing")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 4, 16], help="input sizes in MB")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement; the fastest counts")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--noise", type=float, default=0.01,
+                        help="share of lines ending in a control or invisible character (default: 0.01)")
+    args = parser.parse_args(argv)
+
+    mismatches = 0
+    print(f"{'size':>8} {'reference':>12} {'compiled':>12} {'speedup':>8}")
+    for size in args.sizes:
+        text = make_ocr_text(int(size * 1024 * 1024), args.seed, args.noise)
+        reference_time, expected = best_time(reference_post_process_text, text, args.repeat)
+        compiled_time, result = best_time(text_processing.post_process_text, text, args.repeat)
+        if result != expected:
+            mismatches += 1
+        megabytes = len(text.encode('utf-8')) / 2 ** 20
+        print(f"{megabytes:6.1f}MB {megabytes / reference_time:9.1f}MB/s "
+              f"{megabytes / compiled_time:9.1f}MB/s {reference_time / compiled_time:7.1f}x"
+              f"{'' if result == expected else '  OUTPUT DIFFERS'}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
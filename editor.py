@@ -17,9 +17,10 @@ import tempfile
 import pygame
 import fitz  # PyMuPDF for PDF export
 import pytesseract
-from langdetect import detect
 from deep_translator import GoogleTranslator
-import re
+import ocr_cache
+import ocr_engine
+import text_processing
 
 # Configure Tesseract OCR path
 pytesseract.pytesseract.tesseract_cmd = r"C:\\Program Files\\Tesseract-OCR\\tesseract.exe"
@@ -480,7 +481,7 @@ class DocumentEditor:
 
         try:
             # Detect language of the text
-            detected_lang = detect(text)
+            detected_lang = text_processing.detect_language(text)
             # Map detected language to gTTS language code
             lang_map = {
                 'ta': 'ta',  # Tamil
@@ -622,30 +623,43 @@ class DocumentEditor:
         self.read_button.config(state='normal')
         self.stop_reading()
 
-    def ocr_tamil_cleaned(self, image_path, page_number):
-        """Extract text while removing headers and footers"""
-        image = Image.open(image_path)
-        raw_text = pytesseract.image_to_string(image, lang='tam+eng')
-        
+    def ocr_tamil_cleaned(self, image, page_number):
+        """Extract text while removing headers and footers
+
+        image can be a file path, a PIL image or a grayscale NumPy array.
+        """
+        if isinstance(image, str):
+            image = Image.open(image)
+        if ocr_engine.is_blank_page(image):
+            return "", None
+        raw_text = ocr_engine.cached_image_to_string(image, 'tam+eng', ocr_cache.get_default_cache())
+        return self.clean_page_text(raw_text, page_number)
+
+    def ocr_rendered_page(self, gray, zoom, debug_name):
+        """OCR a rendered page in memory; set OCR_DEBUG_IMAGES to keep copies"""
+        ocr_engine.dump_debug_image(gray, f"{debug_name}_x{zoom}")
+        cache = ocr_cache.get_default_cache()
+        # Pages in a single script are read with just that language's model
+        page_lang = ocr_engine.page_language(gray, 'tam+eng', cache)
+        return ocr_engine.recognize_routed(
+            lambda lang_code: ocr_engine.cached_recognize(gray, lang_code, cache), 'tam+eng', page_lang)
+
+    def clean_page_text(self, raw_text, page_number, boilerplate=None):
+        """Detect the language of a page's raw text and drop its headers and footers.
+
+        boilerplate is the document's text_processing.BoilerplateIndex; without
+        one only a line holding the page number is dropped.
+        """
+        # Language detection fails on empty text
+        if not raw_text.strip():
+            return "", None
+
         # Detect language
-        detected_lang = detect(raw_text)
+        detected_lang = text_processing.detect_language(raw_text)
         
         # Remove headers and footers
-        lines = raw_text.splitlines()
-        cleaned_lines = []
-        for line in lines:
-            if line.strip() and not self.is_header_or_footer(line, page_number):
-                cleaned_lines.append(line)
-        
-        return " ".join(cleaned_lines), detected_lang
-
-    def is_header_or_footer(self, line, page_number):
-        """Detect if a line is a header or footer"""
-        if re.match(rf"^\s*{page_number}\s*$", line):
-            return True
-        if len(line.strip()) < 5:
-            return True
-        return False
+        boilerplate = boilerplate or text_processing.BoilerplateIndex([])
+        return " ".join(boilerplate.clean_lines(raw_text, page_number)), detected_lang
 
     def translate_and_rewrite_text(self, text, target_lang='en', max_retries=3):
         """Translate text to target language"""
@@ -797,11 +811,8 @@ class DocumentEditor:
     def process_file_ocr(self, file_path, target_lang='en', pages_to_process=None, read_aloud=False):
         """Process file with OCR and translation"""
         try:
-            # Create temporary directory for images
-            output_folder = os.path.join(os.path.expanduser("~"), "output_images")
-            os.makedirs(output_folder, exist_ok=True)
-            
             extracted_text = ""
+            blank_pages = 0
             self.status_label.config(text="Starting OCR processing...")
             
             # Create cancel button in status bar
@@ -822,6 +833,9 @@ class DocumentEditor:
                     if not pages_to_process:
                         pages_to_process = range(1, total_pages + 1)
                     
+                    # OCR every page first, so running headers and footers can be
+                    # found across the document before anything is translated
+                    raw_texts = {}
                     for page_number in sorted(pages_to_process):
                         if self.ocr_cancel_flag:
                             self.status_label.config(text="OCR processing cancelled")
@@ -832,12 +846,29 @@ class DocumentEditor:
                         self.root.update_idletasks()
                         
                         page = pdf_document[page_number - 1]
-                        pix = page.get_pixmap()
-                        image_path = f"{output_folder}/page_{page_number}.jpg"
-                        pix.save(image_path)
-                        
-                        # Process the image
-                        page_text, detected_lang = self.ocr_tamil_cleaned(image_path, page_number)
+                        # Render at a zoom that suits the page's text size, larger if confidence is low
+                        debug_name = f"{os.path.splitext(os.path.basename(file_path))[0]}_page_{page_number}"
+                        result = ocr_engine.ocr_page_adaptive(
+                            page, lambda gray, zoom: self.ocr_rendered_page(gray, zoom, debug_name),
+                            skip_blank=True
+                        )
+                        if result is None:
+                            # Blank page; skipped without running OCR
+                            blank_pages += 1
+                            continue
+                        raw_texts[page_number] = result[0]
+
+                    boilerplate = text_processing.BoilerplateIndex(raw_texts.values())
+                    for page_number, raw_text in raw_texts.items():
+                        if self.ocr_cancel_flag:
+                            self.status_label.config(text="OCR processing cancelled")
+                            break
+
+                        self.status_label.config(text=f"Translating page {page_number} of {total_pages}...")
+                        self.root.update_idletasks()
+
+                        # Process the text
+                        page_text, detected_lang = self.clean_page_text(raw_text, page_number, boilerplate)
                         
                         # Translate if needed
                         if detected_lang != target_lang:
@@ -845,9 +876,6 @@ class DocumentEditor:
                             
                         extracted_text += page_text + "\n"
                         
-                        # Clean up temporary image
-                        os.remove(image_path)
-                        
                     pdf_document.close()
                     
                 else:
@@ -869,7 +897,11 @@ class DocumentEditor:
                 if not self.ocr_cancel_flag:
                     self.text_area.delete('1.0', tk.END)
                     self.text_area.insert('1.0', extracted_text)
-                    self.status_label.config(text="OCR processing complete")
+                    if blank_pages:
+                        self.status_label.config(
+                            text=f"OCR processing complete ({blank_pages} blank pages skipped)")
+                    else:
+                        self.status_label.config(text="OCR processing complete")
                     
                     # Read the text if requested
                     if read_aloud and extracted_text.strip():
@@ -917,12 +949,6 @@ class DocumentEditor:
             finally:
                 # Clean up cancel button
                 cancel_button.destroy()
-                
-                # Clean up output folder
-                try:
-                    os.rmdir(output_folder)
-                except:
-                    pass
             
         except Exception as e:
             messagebox.showerror("Error", f"OCR processing failed: {str(e)}")
@@ -4,19 +4,25 @@ import pytesseract
 from docx import Document
 from gtts import gTTS
 import os
-import re
+import sys
 import time
 import threading
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-from langdetect import detect
 from deep_translator import GoogleTranslator
 from tkinter import TclError
 import tkinterdnd2 as tkdnd
+import ocr_cache
+import ocr_engine
+import ocr_journal
+import ocr_pdf
+import ocr_trace
+import text_processing
 
 # Configure Tesseract OCR
 pytesseract.pytesseract.tesseract_cmd = r"C:\\Program Files\\Tesseract-OCR\\tesseract.exe"
 tamil_lang = "tam+eng"  # Tamil language code
+DEFAULT_OUTPUT_DIR = os.path.expanduser("~/Documents")  # Where DOCX, MP3 and PDF files are saved
 
 # Language Detection and Translation
 def translate_and_rewrite_text(text, target_lang='en', max_retries=3):
@@ -34,7 +40,8 @@ def translate_and_rewrite_text(text, target_lang='en', max_retries=3):
         
         try:
             translator = GoogleTranslator(source='auto', target=target_lang)
-            translated_chunk = translator.translate(chunk)
+            with ocr_trace.span("translate", chars=len(chunk)):
+                translated_chunk = translator.translate(chunk)
             translated_chunks.append(translated_chunk if translated_chunk else chunk)
         except Exception as chunk_error:
             print(f"Chunk translation error: {chunk_error}")
@@ -46,37 +53,58 @@ def translate_and_rewrite_text(text, target_lang='en', max_retries=3):
     return text
 
 # Extract text while removing headers and footers
-def ocr_tamil_cleaned(image_path, page_number):
-    image = Image.open(image_path)
-    raw_text = pytesseract.image_to_string(image, lang=tamil_lang)
-    
+# image can be a file path, a PIL image or a grayscale NumPy array
+def ocr_tamil_cleaned(image, page_number):
+    if isinstance(image, str):
+        image = Image.open(image)
+    if ocr_engine.is_blank_page(image):
+        return "", None
+    raw_text = ocr_engine.cached_image_to_string(image, tamil_lang, ocr_cache.get_default_cache())
+    return clean_page_text(raw_text, page_number)
+
+# OCR a rendered page in memory; set OCR_DEBUG_IMAGES to keep copies
+# With use_layout, only the page's text blocks are recognized when layout analysis finds them
+# Word boxes are added to words, if given, for a searchable PDF
+def ocr_rendered_page(gray, zoom, debug_name, lang=tamil_lang, words=None, use_layout=True):
+    ocr_engine.dump_debug_image(gray, f"{debug_name}_x{zoom}")
+    cache = ocr_cache.get_default_cache()
+    # Pages in a single script are read with just that language's model
+    page_lang = ocr_engine.page_language(gray, lang, cache)
+
+    def ocr_region(region, words=None):
+        return ocr_engine.recognize_routed(
+            lambda lang_code, words=None: ocr_engine.cached_recognize(region, lang_code, cache, words),
+            lang, page_lang, words)
+
+    if use_layout:
+        result = ocr_engine.ocr_text_blocks(gray, ocr_region, words=words)
+        if result is not None:
+            return result
+    return ocr_region(gray, words)
+
+# Detect the language of a page's raw text and drop its headers and footers
+# boilerplate is the document's BoilerplateIndex; without one only the page number is dropped
+@ocr_trace.traced("clean_page_text")
+def clean_page_text(raw_text, page_number, boilerplate=None):
+    # Language detection fails on empty text
+    if not raw_text.strip():
+        return "", None
+
     # Detect language
-    detected_lang = detect(raw_text)
+    detected_lang = text_processing.detect_language(raw_text)
     
     # Optionally print detected language for debugging
     print(f"Detected Language: {detected_lang}")
 
     # Remove headers and footers
-    lines = raw_text.splitlines()
-    cleaned_lines = []
-    for line in lines:
-        if line.strip() and not is_header_or_footer(line, page_number):
-            cleaned_lines.append(line)
-    
-    return " ".join(cleaned_lines), detected_lang
-
-# Detect header/footer (example implementation)
-def is_header_or_footer(line, page_number):
-    if re.match(rf"^\s*{page_number}\s*$", line):
-        return True
-    if len(line.strip()) < 5:
-        return True
-    return False
+    boilerplate = boilerplate or text_processing.BoilerplateIndex([])
+    return " ".join(boilerplate.clean_lines(raw_text, page_number)), detected_lang
 
 # Create or append to Word document with PDF name
-def create_or_append_word_file_from_pdf(pdf_path, content):
+# Saves to the Documents folder unless output_dir is given
+def create_or_append_word_file_from_pdf(pdf_path, content, output_dir=None):
     file_name = os.path.splitext(os.path.basename(pdf_path))[0] + ".docx"
-    file_path = os.path.join(os.path.expanduser("~/Documents"), file_name)  # Save to Documents folder
+    file_path = os.path.join(output_dir or DEFAULT_OUTPUT_DIR, file_name)
     try:
         doc = Document(file_path)
     except Exception as e:
@@ -84,20 +112,25 @@ def create_or_append_word_file_from_pdf(pdf_path, content):
         doc = Document()  # Create a new document if opening fails
     doc.add_paragraph(content)
     doc.save(file_path)
+    return file_path
 
 # Convert text to speech and save as MP3 with PDF name
-def text_to_speech_google(pdf_path, text, target_lang='en'):
+def text_to_speech_google(pdf_path, text, target_lang='en', progress=None, output_dir=None, play=True):
+    progress = progress or TkProgress()
+    output_dir = output_dir or DEFAULT_OUTPUT_DIR
     pdf_name = os.path.splitext(os.path.basename(pdf_path))[0]
-    output_file = os.path.join(os.path.expanduser("~/Documents"), f"{pdf_name}_{target_lang}.mp3")
+    output_file = os.path.join(output_dir, f"{pdf_name}_{target_lang}.mp3")
+    # Chunk files are named after the output so parallel jobs don't share them
+    temp_prefix = os.path.join(output_dir, f"temp_{pdf_name}_")
     
     try:
         # Split text into smaller chunks for progress tracking
         chunks = text.split('. ')
         total_chunks = len(chunks)
-        progress_var.set(0)
+        progress.set_percent(0)
         
-        progress_label.config(text="Preparing text-to-speech conversion...")
-        root.update_idletasks()
+        progress.set_status("Preparing text-to-speech conversion...")
+        progress.refresh()
         
         # Initialize timing variables
         start_time = time.time()
@@ -106,7 +139,7 @@ def text_to_speech_google(pdf_path, text, target_lang='en'):
         # Process chunks and show progress
         for i, chunk in enumerate(chunks, 1):
             if cancel_event.is_set():
-                progress_label.config(text="Text-to-speech conversion cancelled!")
+                progress.set_status("Text-to-speech conversion cancelled!")
                 return
                 
             # Add period back if it was removed during split
@@ -114,42 +147,42 @@ def text_to_speech_google(pdf_path, text, target_lang='en'):
                 chunk += '.'
                 
             # Create temporary file for this chunk
-            temp_file = os.path.join(os.path.expanduser("~/Documents"), f"temp_{i}.mp3")
+            temp_file = f"{temp_prefix}{i}.mp3"
             
             try:
-                tts = gTTS(text=chunk, lang=target_lang)
-                tts.save(temp_file)
+                with ocr_trace.span("gTTS", chunk=i, chars=len(chunk)):
+                    tts = gTTS(text=chunk, lang=target_lang)
+                    tts.save(temp_file)
                 
                 # Update progress and timing information
                 processed_chunks += 1
-                progress = (processed_chunks / total_chunks) * 100
-                progress_var.set(progress)
+                percent = (processed_chunks / total_chunks) * 100
+                progress.set_percent(percent)
                 
                 # Update elapsed time
                 elapsed_time = int(time.time() - start_time)
-                elapsed_label.config(text=f"Elapsed Time: {format_time(elapsed_time)}")
+                progress.set_elapsed(f"Elapsed Time: {format_time(elapsed_time)}")
                 
                 # Calculate and update estimated time remaining
                 if processed_chunks > 0:
                     avg_time_per_chunk = elapsed_time / processed_chunks
                     remaining_chunks = total_chunks - processed_chunks
                     estimated_time = int(avg_time_per_chunk * remaining_chunks)
-                    estimated_label.config(text=f"Estimated Time: {format_time(estimated_time)}")
+                    progress.set_estimated(f"Estimated Time: {format_time(estimated_time)}")
                 
-                progress_label.config(text=f"Converting to speech: {int(progress)}%")
-                root.update()  # Update the entire GUI
+                progress.set_status(f"Converting to speech: {int(percent)}%")
+                progress.refresh()
                 
             except Exception as e:
                 print(f"Error processing chunk {i}: {e}")
                 continue
         
         # Combine all temporary files
-        progress_label.config(text="Finalizing audio file...")
-        root.update_idletasks()
+        progress.set_status("Finalizing audio file...")
+        progress.refresh()
         
         # Use system commands to concatenate MP3 files
-        temp_files = [os.path.join(os.path.expanduser("~/Documents"), f"temp_{j}.mp3") 
-                     for j in range(1, total_chunks + 1)]
+        temp_files = [f"{temp_prefix}{j}.mp3" for j in range(1, total_chunks + 1)]
         
         with open(output_file, 'wb') as outfile:
             for temp_file in temp_files:
@@ -160,41 +193,42 @@ def text_to_speech_google(pdf_path, text, target_lang='en'):
         
         # Play the final audio file and update final status
         if not cancel_event.is_set():
-            os.system(f"start {output_file}")
+            if play:
+                os.system(f"start {output_file}")
             final_time = int(time.time() - start_time)
-            progress_label.config(text="Speech conversion complete!")
-            elapsed_label.config(text=f"Total Time: {format_time(final_time)}")
-            estimated_label.config(text="Estimated Time: 0s")
+            progress.set_status("Speech conversion complete!")
+            progress.set_elapsed(f"Total Time: {format_time(final_time)}")
+            progress.set_estimated("Estimated Time: 0s")
         else:
-            progress_label.config(text="Speech conversion cancelled!")
+            progress.set_status("Speech conversion cancelled!")
             if os.path.exists(output_file):
                 os.remove(output_file)
                 
         # Update progress and timing information during conversion
         processed_chunks += 1
-        progress = (processed_chunks / total_chunks) * 100
-        progress_var.set(progress)
+        percent = (processed_chunks / total_chunks) * 100
+        progress.set_percent(percent)
         
         # Update elapsed time
         elapsed_time = int(time.time() - start_time)
-        elapsed_label.config(text=f"Elapsed Time: {format_time(elapsed_time)}")
+        progress.set_elapsed(f"Elapsed Time: {format_time(elapsed_time)}")
         
         # Calculate and update estimated time remaining
         if processed_chunks > 0:
             avg_time_per_chunk = elapsed_time / processed_chunks
             remaining_chunks = total_chunks - processed_chunks
             estimated_time = int(avg_time_per_chunk * remaining_chunks)
-            estimated_label.config(text=f"Estimated Time: {format_time(estimated_time)}")
+            progress.set_estimated(f"Estimated Time: {format_time(estimated_time)}")
         
-        progress_label.config(text=f"Converting to speech: {int(progress)}%")
-        root.update()
+        progress.set_status(f"Converting to speech: {int(percent)}%")
+        progress.refresh()
 
     except Exception as e:
         print(f"Error during text-to-speech conversion: {e}")
-        progress_label.config(text="Error during conversion. Please check the console for details.")
+        progress.set_status("Error during conversion. Please check the console for details.")
         # Clean up any temporary files
         for i in range(1, total_chunks + 1):
-            temp_file = os.path.join(os.path.expanduser("~/Documents"), f"temp_{i}.mp3")
+            temp_file = f"{temp_prefix}{i}.mp3"
             if os.path.exists(temp_file):
                 os.remove(temp_file)
 
@@ -214,88 +248,259 @@ def format_time(seconds):
     else:
         return f"{seconds}s"
 
+# Progress reporting for the main window's progress bar, labels and dialogs
+class TkProgress:
+    def set_status(self, text):
+        progress_label.config(text=text)
+
+    def set_percent(self, percent):
+        progress_var.set(percent)
+
+    def set_elapsed(self, text):
+        elapsed_label.config(text=text)
+
+    def set_estimated(self, text):
+        estimated_label.config(text=text)
+
+    def refresh(self):
+        root.update_idletasks()
+
+    def show_info(self, title, message):
+        messagebox.showinfo(title, message)
+
+    def show_error(self, title, message):
+        messagebox.showerror(title, message)
+
+# Progress reporting as console lines, for running without a display
+class ConsoleProgress:
+    def __init__(self, prefix=""):
+        self.prefix = prefix
+
+    def set_status(self, text):
+        print(f"{self.prefix}{text}", flush=True)
+
+    def set_percent(self, percent):
+        pass
+
+    def set_elapsed(self, text):
+        pass
+
+    def set_estimated(self, text):
+        pass
+
+    def refresh(self):
+        pass
+
+    def show_info(self, title, message):
+        print(f"{self.prefix}{message}", flush=True)
+
+    def show_error(self, title, message):
+        print(f"{self.prefix}{title}: {message}", file=sys.stderr, flush=True)
+
+# Parse page ranges like "1-3, 5, 7-9" into a set of page numbers
+# An empty string selects every page; raises ValueError on bad input
+def parse_page_ranges(page_range_text, total_pages):
+    page_range_text = page_range_text.strip()
+    if page_range_text == "":
+        return set(range(1, total_pages + 1))
+
+    pages_to_process = set()
+    for part in page_range_text.split(","):
+        part = part.strip()
+        if "-" in part:
+            start, end = map(int, part.split("-"))
+            if start < 1 or end > total_pages or start > end:
+                raise ValueError(f"Invalid page range: {part}")
+            pages_to_process.update(range(start, end + 1))
+        else:
+            page_num = int(part)
+            if page_num < 1 or page_num > total_pages:
+                raise ValueError(f"Invalid page number: {page_num}")
+            pages_to_process.add(page_num)
+    return pages_to_process
+
 # Process PDF
-def process_pdf(pdf_path, pages_to_process, conversion_type, target_lang='en'):
+# Reports through progress (the main window by default); returns True if the job finished
+# Stage timings are traced to trace_dir (or the OCR_TRACE directory) when either is set
+# Finished pages are journaled in journal_dir (the per-user journal directory by default)
+# use_layout=False OCRs whole pages instead of the text blocks found on them
+def process_pdf(pdf_path, pages_to_process, conversion_type, target_lang='en',
+                progress=None, output_dir=None, ocr_lang=tamil_lang, play_audio=True, trace_dir=None,
+                journal_dir=None, use_layout=True):
+    progress = progress or TkProgress()
     start_time = time.time()
-    output_folder = os.path.join(os.path.expanduser("~"), "output_images")
-    
-    # Attempt to create the output directory
-    try:
-        os.makedirs(output_folder, exist_ok=True)
-    except PermissionError:
-        print(f"Permission denied: Unable to create directory '{output_folder}'. Please check your permissions.")
-        return
+    pdf_name = os.path.splitext(os.path.basename(pdf_path))[0]
 
     # Initialize progress
-    progress_var.set(0)
+    progress.set_percent(0)
     total_pages = len(pages_to_process)  # Total pages to process based on user selection
-    progress_label.config(text=f"Starting PDF processing... ({'All pages' if not page_entry.get().strip() or page_entry.get() == 'e.g., 1-3, 5, 7-9' else 'Specific pages'})")
-    elapsed_label.config(text="Elapsed Time: 0s")
-    estimated_label.config(text="Estimated Time: --")
-    root.update_idletasks()
-
+    progress.set_status(f"Starting PDF processing... ({total_pages} pages)")
+    progress.set_elapsed("Elapsed Time: 0s")
+    progress.set_estimated("Estimated Time: --")
+    progress.refresh()
+
+    journal = None
+    searchable_pdf = None
+    trace = ocr_trace.start_job(pdf_name, trace_dir)
     try:
         pdf_document = fitz.open(pdf_path)
+        # A searchable PDF takes its text layer from the word boxes of this run's OCR;
+        # the text is neither cleaned nor translated
+        searchable = conversion_type == "Searchable PDF"
+        if searchable:
+            searchable_pdf = ocr_pdf.SearchablePDF(pdf_path)
+        # Every finished page is journaled so an interrupted job can resume
+        journal = ocr_journal.OCRJournal([pdf_path], {"lang": ocr_lang, "target_lang": target_lang},
+                                         journal_dir or ocr_journal.DEFAULT_JOURNAL_DIR)
         extracted_text = ""
-        processed_pages = 0
-
-        for page_number in sorted(pages_to_process):  # Process pages in the order specified
-            if cancel_event.is_set():
-                # Update the UI to show that the task has been canceled
-                progress_label.config(text="Task Canceled!")
-                elapsed_time = int(time.time() - start_time)
-                elapsed_label.config(text=f"Elapsed Time: {format_time(elapsed_time)}")
-                estimated_label.config(text="Estimated Time: 0s")
-                break  # Exit the loop if canceled
+        blank_pages = 0
+        pages = sorted(pages_to_process)  # Process pages in the order specified
+        # Every page is recognized first, then cleaned and translated
+        total_steps = total_pages if searchable else 2 * total_pages
+        steps_done = 0
+
+        def cancelled():
+            if not cancel_event.is_set():
+                return False
+            # Update the UI to show that the task has been canceled
+            progress.set_status("Task Canceled!")
+            elapsed_time = int(time.time() - start_time)
+            progress.set_elapsed(f"Elapsed Time: {format_time(elapsed_time)}")
+            progress.set_estimated("Estimated Time: 0s")
+            return True
 
-            progress_label.config(text=f"Processing page {page_number} of {total_pages}...")
-            root.update_idletasks()  # Update the GUI
+        def step_done(message):
+            nonlocal steps_done
+            steps_done += 1
+            progress.set_percent((steps_done / total_steps) * 100)
+            progress.set_status(message)
 
-            page = pdf_document[page_number - 1]  # Adjust for zero-based index
-            pix = page.get_pixmap()
-            image_path = f"{output_folder}/page_{page_number}.jpg"
-            pix.save(image_path)
+            # Update timing information
+            elapsed_time = int(time.time() - start_time)
+            progress.set_elapsed(f"Elapsed Time: {format_time(elapsed_time)}")
+            avg_time_per_step = elapsed_time / steps_done
+            estimated_time = int(avg_time_per_step * (total_steps - steps_done))
+            progress.set_estimated(f"Estimated Time: {format_time(estimated_time)}")
+            progress.refresh()
+
+        # Pass 1: raw text of every page, None for blank pages. Pages finished by
+        # an earlier, interrupted run of this job come from the journal, except
+        # for a searchable PDF, which needs their word boxes
+        raw_texts = {}
+        for page_number in pages:
+            if cancelled():
+                break
+            progress.set_status(f"Processing page {page_number} of {total_pages}...")
+            progress.refresh()
+
+            ocr_trace.set_context(file=os.path.basename(pdf_path), page=page_number)
+            raw_key = f"raw:{page_number}"
+            if raw_key in journal.completed and not searchable:
+                raw_texts[page_number] = journal.completed[raw_key]
+            elif searchable or str(page_number) not in journal.completed:
+                page = pdf_document[page_number - 1]  # Adjust for zero-based index
+
+                # Use the page's own text layer when it has one; only image-only regions get OCR
+                raw_text = ocr_engine.page_text_from_layer(
+                    page,
+                    lambda image: ocr_engine.cached_image_to_string(image, ocr_lang, ocr_cache.get_default_cache())
+                )
+                if raw_text is None:
+                    # Render at a zoom that suits the page's text size, larger if confidence is low
+                    debug_name = f"{pdf_name}_page_{page_number}"
+                    words = [] if searchable else None
+                    result = ocr_engine.ocr_page_adaptive(
+                        page,
+                        lambda gray, zoom, words=None: ocr_rendered_page(gray, zoom, debug_name, ocr_lang, words,
+                                                                         use_layout),
+                        skip_blank=True,
+                        words=words
+                    )
+                    raw_text = None if result is None else result[0]
+                    if searchable:
+                        searchable_pdf.add_page_words(page_number - 1, words)
+                raw_texts[page_number] = raw_text
+                journal.record(raw_key, raw_text)
+            step_done(f"Recognized page {page_number}.")
+
+        if not searchable:
+            # Running headers and footers are found across all pages, so they
+            # are dropped before translation and speech, which are paid per character
+            boilerplate = text_processing.BoilerplateIndex(text for text in raw_texts.values() if text)
+
+            # Pass 2: clean and translate
+            for page_number in pages:
+                if cancelled():
+                    break
+                ocr_trace.set_context(file=os.path.basename(pdf_path), page=page_number)
+                page_key = str(page_number)
+                if page_key in journal.completed:
+                    # Finished by an earlier, interrupted run of this job
+                    page_text = journal.completed[page_key]
+                else:
+                    raw_text = raw_texts[page_number]
+                    if raw_text is None:
+                        # Blank page; nothing to clean or translate
+                        blank_pages += 1
+                        page_text, detected_lang = "", target_lang
+                    else:
+                        page_text, detected_lang = clean_page_text(raw_text, page_number, boilerplate)
 
-            page_text, detected_lang = ocr_tamil_cleaned(image_path, page_number)
-            
-            if detected_lang != target_lang:
-                page_text = translate_and_rewrite_text(page_text, target_lang)
+                    if detected_lang != target_lang:
+                        page_text = translate_and_rewrite_text(page_text, target_lang)
 
-            extracted_text += page_text + "\n"  # Accumulate text for DOCX
+                    journal.record(page_key, page_text)
 
-            # Update progress
-            processed_pages += 1
-            progress_var.set((processed_pages / total_pages) * 100)
-            progress_label.config(text=f"Completed page {page_number}.")
-            
-            # Update timing information
-            elapsed_time = int(time.time() - start_time)
-            elapsed_label.config(text=f"Elapsed Time: {format_time(elapsed_time)}")
-            if processed_pages > 0:
-                avg_time_per_page = elapsed_time / processed_pages
-                remaining_pages = total_pages - processed_pages
-                estimated_time = int(avg_time_per_page * remaining_pages)
-                estimated_label.config(text=f"Estimated Time: {format_time(estimated_time)}")
-            root.update()  # Ensure the GUI updates
+                extracted_text += page_text + "\n"  # Accumulate text for DOCX
+                step_done(f"Completed page {page_number}.")
+        else:
+            blank_pages = sum(1 for raw_text in raw_texts.values() if raw_text is None)
 
         if conversion_type == "DOCX" and not cancel_event.is_set():
             # Include target language in the output file name
             file_name = os.path.splitext(os.path.basename(pdf_path))[0] + f"_{target_lang}.docx"
-            create_or_append_word_file_from_pdf(file_name, extracted_text)
-            messagebox.showinfo("Success", f"Text saved to {file_name}")
+            saved_path = create_or_append_word_file_from_pdf(file_name, extracted_text, output_dir)
+            progress.show_info("Success", f"Text saved to {saved_path}")
+
+        if searchable and not cancel_event.is_set():
+            output_file = os.path.join(output_dir or DEFAULT_OUTPUT_DIR, f"{pdf_name}_searchable.pdf")
+            searchable_pdf.save(output_file)
+            searchable_pdf = None
+            progress.show_info("Success", f"Searchable PDF saved to {output_file}")
 
         if conversion_type == "Speech" and not cancel_event.is_set():
             # Include target language in the output file name
             pdf_name = os.path.splitext(os.path.basename(pdf_path))[0]
-            output_file = os.path.join(os.path.expanduser("~/Documents"), f"{pdf_name}_{target_lang}.mp3")
-            text_to_speech_google(output_file, extracted_text, target_lang)
+            output_file = os.path.join(output_dir or DEFAULT_OUTPUT_DIR, f"{pdf_name}_{target_lang}.mp3")
+            text_to_speech_google(output_file, extracted_text, target_lang,
+                                  progress=progress, output_dir=output_dir, play=play_audio)
 
         pdf_document.close()
-        if not cancel_event.is_set():
-            progress_label.config(text="Processing Complete!")
+        if cancel_event.is_set():
+            return False
+        journal.discard()
+        if blank_pages:
+            progress.set_status(f"Processing Complete! ({blank_pages} blank pages skipped)")
+        else:
+            progress.set_status("Processing Complete!")
+        return True
 
     except Exception as e:
-        messagebox.showerror("Error", f"An error occurred: {e}")
+        progress.show_error("Error", f"An error occurred: {e}")
+        return False
+    finally:
+        if journal is not None:
+            journal.close()
+        if searchable_pdf is not None:
+            searchable_pdf.close()
+        trace_path = ocr_trace.finish_job(trace)
+        if trace_path:
+            progress.show_info("Trace", f"Trace saved to {trace_path}")
+
+# Run process_pdf for the main window and re-enable its buttons afterwards
+def run_process_pdf(pdf_path, pages_to_process, conversion_type, target_lang):
+    try:
+        process_pdf(pdf_path, pages_to_process, conversion_type, target_lang)
     finally:
         start_button.config(state=tk.NORMAL)
         cancel_button.config(state=tk.DISABLED)
@@ -315,30 +520,16 @@ def start_processing():
         total_pages = len(pdf_document)
         pdf_document.close()
 
-        pages_to_process = set()
         page_range_text = page_entry.get().strip()
         
         # Process all pages if entry is empty or contains placeholder
-        if page_range_text == "" or page_range_text == "e.g., 1-3, 5, 7-9":
-            pages_to_process = set(range(1, total_pages + 1))
-        else:
-            # Process specified pages
-            try:
-                for part in page_range_text.split(","):
-                    part = part.strip()
-                    if "-" in part:
-                        start, end = map(int, part.split("-"))
-                        if start < 1 or end > total_pages or start > end:
-                            raise ValueError(f"Invalid page range: {part}")
-                        pages_to_process.update(range(start, end + 1))
-                    else:
-                        page_num = int(part)
-                        if page_num < 1 or page_num > total_pages:
-                            raise ValueError(f"Invalid page number: {page_num}")
-                        pages_to_process.add(page_num)
-            except ValueError as e:
-                messagebox.showerror("Error", f"Invalid page range: {str(e)}\nPlease use format like '1-3, 5, 7-9'")
-                return
+        if page_range_text == "e.g., 1-3, 5, 7-9":
+            page_range_text = ""
+        try:
+            pages_to_process = parse_page_ranges(page_range_text, total_pages)
+        except ValueError as e:
+            messagebox.showerror("Error", f"Invalid page range: {str(e)}\nPlease use format like '1-3, 5, 7-9'")
+            return
 
         cancel_event.clear()
         start_button.config(state=tk.DISABLED)
@@ -346,7 +537,7 @@ def start_processing():
         
         # Run process_pdf in a separate thread
         threading.Thread(
-            target=process_pdf, 
+            target=run_process_pdf, 
             args=(pdf_path, pages_to_process, conversion_var.get(), target_lang), 
             daemon=True
         ).start()
@@ -373,64 +564,6 @@ def select_pdf():
         except Exception as e:
             messagebox.showerror("Error", f"Failed to open PDF: {e}")
 
-# GUI
-root = tkdnd.TkinterDnD.Tk()
-root.title("OCR and Conversion Tool")
-root.grid_rowconfigure(0, weight=1)
-root.grid_columnconfigure(0, weight=1)
-root.configure(bg="#f5f5f5")  # Light gray background
-
-# Custom styles for ttk widgets
-style = ttk.Style()
-style.theme_use('clam')  # Use clam theme as base
-style.configure('TProgressbar', thickness=20, troughcolor='#E0E0E0', background='#4CAF50')
-style.configure('TCombobox', padding=5, background='#FFFFFF')
-
-# Replace container creation and packing with grid
-container = tk.Frame(root, bg="#f5f5f5", padx=20, pady=10)
-container.grid(row=0, column=0, sticky="nsew")
-
-# Configure container grid
-container.grid_columnconfigure(0, weight=1)
-for i in range(8):  # For title, subtitle, and 6 main sections
-    container.grid_rowconfigure(i, weight=1)
-
-# Update title frame
-title_frame = tk.Frame(container, bg="#f5f5f5")
-title_frame.grid(row=0, column=0, sticky="ew", pady=(0, 15))
-title_frame.grid_columnconfigure(0, weight=1)
-
-title_label = tk.Label(
-    title_frame,
-    text="OCR Conversion Tool",
-    font=("Helvetica", 28, "bold"),
-    bg="#f5f5f5",
-    fg="#2C3E50"
-)
-title_label.pack()
-
-subtitle_label = tk.Label(
-    title_frame,
-    text="Convert PDF documents to text and speech",
-    font=("Helvetica", 12),
-    bg="#f5f5f5",
-    fg="#7F8C8D"
-)
-subtitle_label.pack()
-
-# Update file frame
-file_frame = tk.LabelFrame(
-    container,
-    text="Document Selection (Browse or Drag & Drop)",
-    font=("Helvetica", 12, "bold"),
-    bg="#f5f5f5",
-    fg="#2C3E50",
-    padx=10,
-    pady=5
-)
-file_frame.grid(row=1, column=0, sticky="ew", pady=(0, 10))
-file_frame.grid_columnconfigure(1, weight=1)
-
 # Add drop functionality
 def handle_drop(event):
     file_path = event.data
@@ -449,64 +582,15 @@ def handle_drop(event):
     else:
         messagebox.showerror("Error", "Please drop a PDF file")
 
-# Update file entry with drop binding
-file_entry = tk.Entry(
-    file_frame,
-    font=("Helvetica", 10),
-    relief="solid",
-    bd=1
-)
-file_entry.grid(row=0, column=1, sticky="ew", padx=(0, 10))
-file_entry.drop_target_register(tkdnd.DND_FILES)
-file_entry.dnd_bind('<<Drop>>', handle_drop)
-
-# Add browse button back
-browse_button = tk.Button(
-    file_frame,
-    text="Browse",
-    command=select_pdf,
-    font=("Helvetica", 10),
-    bg="#3498DB",
-    fg="white",
-    relief="flat",
-    padx=15,
-    pady=5
-)
-browse_button.grid(row=0, column=2)
 
 # Add hover effects for browse button
 def on_browse_enter(e):
     e.widget['background'] = '#2980B9'
 
+
 def on_browse_leave(e):
     e.widget['background'] = '#3498DB'
 
-browse_button.bind("<Enter>", on_browse_enter)
-browse_button.bind("<Leave>", on_browse_leave)
-
-# Update extraction frame
-extraction_frame = tk.LabelFrame(
-    container,
-    text="Page Range (Optional)",
-    font=("Helvetica", 12, "bold"),
-    bg="#f5f5f5",
-    fg="#2C3E50",
-    padx=10,
-    pady=5
-)
-extraction_frame.grid(row=2, column=0, sticky="ew", pady=(0, 10))
-extraction_frame.grid_columnconfigure(0, weight=1)
-
-# Remove the combobox and just keep the entry with placeholder
-page_entry = tk.Entry(
-    extraction_frame,
-    font=("Helvetica", 10),
-    relief="solid",
-    bd=1
-)
-page_entry.grid(row=0, column=0, sticky="ew")
-page_entry.insert(0, "e.g., 1-3, 5, 7-9")  # Add placeholder text
-page_entry.config(fg='gray')  # Gray out placeholder text
 
 # Add placeholder behavior
 def on_entry_click(event):
@@ -514,158 +598,283 @@ def on_entry_click(event):
         page_entry.delete(0, tk.END)
         page_entry.config(fg='black')
 
+
 def on_focus_out(event):
     if page_entry.get() == "":
         page_entry.insert(0, "e.g., 1-3, 5, 7-9")
         page_entry.config(fg='gray')
 
-page_entry.bind('<FocusIn>', on_entry_click)
-page_entry.bind('<FocusOut>', on_focus_out)
-
-# Update language frame
-language_frame = tk.LabelFrame(
-    container,
-    text="Target Language",
-    font=("Helvetica", 12, "bold"),
-    bg="#f5f5f5",
-    fg="#2C3E50",
-    padx=10,
-    pady=5
-)
-language_frame.grid(row=3, column=0, sticky="ew", pady=(0, 10))
-language_frame.grid_columnconfigure(0, weight=1)
-
-# Target language contents remain the same
-target_lang_var = tk.StringVar(value='en')
-target_lang_combo = ttk.Combobox(
-    language_frame,
-    textvariable=target_lang_var,
-    values=["en", "ta"],
-    state="readonly",
-    font=("Helvetica", 10)
-)
-target_lang_combo.grid(row=0, column=0, sticky="ew")
-
-# Update conversion frame
-conversion_frame = tk.LabelFrame(
-    container,
-    text="Output Format",
-    font=("Helvetica", 12, "bold"),
-    bg="#f5f5f5",
-    fg="#2C3E50",
-    padx=10,
-    pady=5
-)
-conversion_frame.grid(row=4, column=0, sticky="ew", pady=(0, 10))
-conversion_frame.grid_columnconfigure(0, weight=1)
-
-# Conversion type contents remain the same
-conversion_var = tk.StringVar(value="DOCX")
-conversion_combo = ttk.Combobox(
-    conversion_frame,
-    textvariable=conversion_var,
-    values=["DOCX", "Speech"],
-    state="readonly",
-    font=("Helvetica", 10)
-)
-conversion_combo.grid(row=0, column=0, sticky="ew")
-
-# Update progress section
-progress_frame = tk.Frame(container, bg="#f5f5f5")
-progress_frame.grid(row=5, column=0, sticky="ew", pady=15)
-progress_frame.grid_columnconfigure(0, weight=1)
-
-progress_var = tk.DoubleVar()
-progress_bar = ttk.Progressbar(
-    progress_frame,
-    variable=progress_var,
-    maximum=100,
-    style='TProgressbar'
-)
-progress_bar.grid(row=0, column=0, sticky="ew", pady=(0, 10))
-
-# Update status frame
-status_frame = tk.Frame(progress_frame, bg="#f5f5f5")
-status_frame.grid(row=1, column=0, sticky="ew")
-status_frame.grid_columnconfigure(1, weight=1)  # Make middle space expand
-
-progress_label = tk.Label(
-    status_frame,
-    text="Ready to start",
-    font=("Helvetica", 10),
-    bg="#f5f5f5",
-    fg="#2C3E50"
-)
-progress_label.grid(row=0, column=0, sticky="w")
-
-total_pages_label = tk.Label(
-    status_frame,
-    text="Total Pages: --",
-    font=("Helvetica", 10),
-    bg="#f5f5f5",
-    fg="#7F8C8D"
-)
-total_pages_label.grid(row=0, column=1, sticky="e", padx=(0, 20))
-
-elapsed_label = tk.Label(
-    status_frame,
-    text="Elapsed Time: 0s",
-    font=("Helvetica", 10),
-    bg="#f5f5f5",
-    fg="#7F8C8D"
-)
-elapsed_label.grid(row=0, column=2, sticky="e", padx=(0, 20))
-
-estimated_label = tk.Label(
-    status_frame,
-    text="Estimated Time: --",
-    font=("Helvetica", 10),
-    bg="#f5f5f5",
-    fg="#7F8C8D"
-)
-estimated_label.grid(row=0, column=3, sticky="e", padx=(0, 20))
-
-# Update button frame
-button_frame = tk.Frame(container, bg="#f5f5f5")
-button_frame.grid(row=6, column=0, pady=10)
-
-start_button = tk.Button(
-    button_frame,
-    text="Start",
-    command=start_processing,
-    font=("Helvetica", 10),
-    bg="#2ECC71",
-    fg="white",
-    relief="flat",
-    padx=15,
-    pady=5
-)
-start_button.grid(row=0, column=0, padx=5)
-
-cancel_button = tk.Button(
-    button_frame,
-    text="Cancel",
-    command=cancel_processing,
-    font=("Helvetica", 10),
-    bg="#E74C3C",
-    fg="white",
-    relief="flat",
-    state=tk.DISABLED,
-    padx=15,
-    pady=5
-)
-cancel_button.grid(row=0, column=1, padx=5)
 
 # Add hover effects
 def on_enter(e):
     e.widget['background'] = '#27AE60' if e.widget == start_button else '#C0392B'
 
+
 def on_leave(e):
     e.widget['background'] = '#2ECC71' if e.widget == start_button else '#E74C3C'
 
-start_button.bind("<Enter>", on_enter)
-start_button.bind("<Leave>", on_leave)
-cancel_button.bind("<Enter>", on_enter)
-cancel_button.bind("<Leave>", on_leave)
 
-root.mainloop() 
\ No newline at end of file
+# Build the main window; nothing here runs on import, so the processing
+# functions above can be used without a display (see ocr_cli.py)
+def build_gui():
+    global root, file_entry, page_entry, target_lang_var, conversion_var, progress_var
+    global progress_label, total_pages_label, elapsed_label, estimated_label
+    global start_button, cancel_button
+
+    root = tkdnd.TkinterDnD.Tk()
+    root.title("OCR and Conversion Tool")
+    root.grid_rowconfigure(0, weight=1)
+    root.grid_columnconfigure(0, weight=1)
+    root.configure(bg="#f5f5f5")  # Light gray background
+
+    # Custom styles for ttk widgets
+    style = ttk.Style()
+    style.theme_use('clam')  # Use clam theme as base
+    style.configure('TProgressbar', thickness=20, troughcolor='#E0E0E0', background='#4CAF50')
+    style.configure('TCombobox', padding=5, background='#FFFFFF')
+
+    # Replace container creation and packing with grid
+    container = tk.Frame(root, bg="#f5f5f5", padx=20, pady=10)
+    container.grid(row=0, column=0, sticky="nsew")
+
+    # Configure container grid
+    container.grid_columnconfigure(0, weight=1)
+    for i in range(8):  # For title, subtitle, and 6 main sections
+        container.grid_rowconfigure(i, weight=1)
+
+    # Update title frame
+    title_frame = tk.Frame(container, bg="#f5f5f5")
+    title_frame.grid(row=0, column=0, sticky="ew", pady=(0, 15))
+    title_frame.grid_columnconfigure(0, weight=1)
+
+    title_label = tk.Label(
+        title_frame,
+        text="OCR Conversion Tool",
+        font=("Helvetica", 28, "bold"),
+        bg="#f5f5f5",
+        fg="#2C3E50"
+    )
+    title_label.pack()
+
+    subtitle_label = tk.Label(
+        title_frame,
+        text="Convert PDF documents to text and speech",
+        font=("Helvetica", 12),
+        bg="#f5f5f5",
+        fg="#7F8C8D"
+    )
+    subtitle_label.pack()
+
+    # Update file frame
+    file_frame = tk.LabelFrame(
+        container,
+        text="Document Selection (Browse or Drag & Drop)",
+        font=("Helvetica", 12, "bold"),
+        bg="#f5f5f5",
+        fg="#2C3E50",
+        padx=10,
+        pady=5
+    )
+    file_frame.grid(row=1, column=0, sticky="ew", pady=(0, 10))
+    file_frame.grid_columnconfigure(1, weight=1)
+
+    # Update file entry with drop binding
+    file_entry = tk.Entry(
+        file_frame,
+        font=("Helvetica", 10),
+        relief="solid",
+        bd=1
+    )
+    file_entry.grid(row=0, column=1, sticky="ew", padx=(0, 10))
+    file_entry.drop_target_register(tkdnd.DND_FILES)
+    file_entry.dnd_bind('<<Drop>>', handle_drop)
+
+    # Add browse button back
+    browse_button = tk.Button(
+        file_frame,
+        text="Browse",
+        command=select_pdf,
+        font=("Helvetica", 10),
+        bg="#3498DB",
+        fg="white",
+        relief="flat",
+        padx=15,
+        pady=5
+    )
+    browse_button.grid(row=0, column=2)
+
+    browse_button.bind("<Enter>", on_browse_enter)
+    browse_button.bind("<Leave>", on_browse_leave)
+
+    # Update extraction frame
+    extraction_frame = tk.LabelFrame(
+        container,
+        text="Page Range (Optional)",
+        font=("Helvetica", 12, "bold"),
+        bg="#f5f5f5",
+        fg="#2C3E50",
+        padx=10,
+        pady=5
+    )
+    extraction_frame.grid(row=2, column=0, sticky="ew", pady=(0, 10))
+    extraction_frame.grid_columnconfigure(0, weight=1)
+
+    # Remove the combobox and just keep the entry with placeholder
+    page_entry = tk.Entry(
+        extraction_frame,
+        font=("Helvetica", 10),
+        relief="solid",
+        bd=1
+    )
+    page_entry.grid(row=0, column=0, sticky="ew")
+    page_entry.insert(0, "e.g., 1-3, 5, 7-9")  # Add placeholder text
+    page_entry.config(fg='gray')  # Gray out placeholder text
+
+    page_entry.bind('<FocusIn>', on_entry_click)
+    page_entry.bind('<FocusOut>', on_focus_out)
+
+    # Update language frame
+    language_frame = tk.LabelFrame(
+        container,
+        text="Target Language",
+        font=("Helvetica", 12, "bold"),
+        bg="#f5f5f5",
+        fg="#2C3E50",
+        padx=10,
+        pady=5
+    )
+    language_frame.grid(row=3, column=0, sticky="ew", pady=(0, 10))
+    language_frame.grid_columnconfigure(0, weight=1)
+
+    # Target language contents remain the same
+    target_lang_var = tk.StringVar(value='en')
+    target_lang_combo = ttk.Combobox(
+        language_frame,
+        textvariable=target_lang_var,
+        values=["en", "ta"],
+        state="readonly",
+        font=("Helvetica", 10)
+    )
+    target_lang_combo.grid(row=0, column=0, sticky="ew")
+
+    # Update conversion frame
+    conversion_frame = tk.LabelFrame(
+        container,
+        text="Output Format",
+        font=("Helvetica", 12, "bold"),
+        bg="#f5f5f5",
+        fg="#2C3E50",
+        padx=10,
+        pady=5
+    )
+    conversion_frame.grid(row=4, column=0, sticky="ew", pady=(0, 10))
+    conversion_frame.grid_columnconfigure(0, weight=1)
+
+    # Conversion type contents remain the same
+    conversion_var = tk.StringVar(value="DOCX")
+    conversion_combo = ttk.Combobox(
+        conversion_frame,
+        textvariable=conversion_var,
+        values=["DOCX", "Speech", "Searchable PDF"],
+        state="readonly",
+        font=("Helvetica", 10)
+    )
+    conversion_combo.grid(row=0, column=0, sticky="ew")
+
+    # Update progress section
+    progress_frame = tk.Frame(container, bg="#f5f5f5")
+    progress_frame.grid(row=5, column=0, sticky="ew", pady=15)
+    progress_frame.grid_columnconfigure(0, weight=1)
+
+    progress_var = tk.DoubleVar()
+    progress_bar = ttk.Progressbar(
+        progress_frame,
+        variable=progress_var,
+        maximum=100,
+        style='TProgressbar'
+    )
+    progress_bar.grid(row=0, column=0, sticky="ew", pady=(0, 10))
+
+    # Update status frame
+    status_frame = tk.Frame(progress_frame, bg="#f5f5f5")
+    status_frame.grid(row=1, column=0, sticky="ew")
+    status_frame.grid_columnconfigure(1, weight=1)  # Make middle space expand
+
+    progress_label = tk.Label(
+        status_frame,
+        text="Ready to start",
+        font=("Helvetica", 10),
+        bg="#f5f5f5",
+        fg="#2C3E50"
+    )
+    progress_label.grid(row=0, column=0, sticky="w")
+
+    total_pages_label = tk.Label(
+        status_frame,
+        text="Total Pages: --",
+        font=("Helvetica", 10),
+        bg="#f5f5f5",
+        fg="#7F8C8D"
+    )
+    total_pages_label.grid(row=0, column=1, sticky="e", padx=(0, 20))
+
+    elapsed_label = tk.Label(
+        status_frame,
+        text="Elapsed Time: 0s",
+        font=("Helvetica", 10),
+        bg="#f5f5f5",
+        fg="#7F8C8D"
+    )
+    elapsed_label.grid(row=0, column=2, sticky="e", padx=(0, 20))
+
+    estimated_label = tk.Label(
+        status_frame,
+        text="Estimated Time: --",
+        font=("Helvetica", 10),
+        bg="#f5f5f5",
+        fg="#7F8C8D"
+    )
+    estimated_label.grid(row=0, column=3, sticky="e", padx=(0, 20))
+
+    # Update button frame
+    button_frame = tk.Frame(container, bg="#f5f5f5")
+    button_frame.grid(row=6, column=0, pady=10)
+
+    start_button = tk.Button(
+        button_frame,
+        text="Start",
+        command=start_processing,
+        font=("Helvetica", 10),
+        bg="#2ECC71",
+        fg="white",
+        relief="flat",
+        padx=15,
+        pady=5
+    )
+    start_button.grid(row=0, column=0, padx=5)
+
+    cancel_button = tk.Button(
+        button_frame,
+        text="Cancel",
+        command=cancel_processing,
+        font=("Helvetica", 10),
+        bg="#E74C3C",
+        fg="white",
+        relief="flat",
+        state=tk.DISABLED,
+        padx=15,
+        pady=5
+    )
+    cancel_button.grid(row=0, column=1, padx=5)
+
+    start_button.bind("<Enter>", on_enter)
+    start_button.bind("<Leave>", on_leave)
+    cancel_button.bind("<Enter>", on_enter)
+    cancel_button.bind("<Leave>", on_leave)
+
+def main():
+    build_gui()
+    root.mainloop()
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,7 @@ from docx.enum.text import WD_ALIGN_PARAGRAPH
 import os
 import json
 import threading
-from PIL import Image, ImageTk, ImageOps
+from PIL import ImageTk
 from io import BytesIO
 import speech_recognition as sr
 import time
@@ -17,9 +17,12 @@ import pytesseract
 from langdetect import detect
 from deep_translator import GoogleTranslator
 import re
-import cv2
-import numpy as np
 from gtts import gTTS
+import ocr_cache
+import ocr_engine
+import ocr_journal
+import ocr_pdf
+import ocr_trace
 
 # Configure Tesseract OCR path
 pytesseract.pytesseract.tesseract_cmd = r"C:\\Program Files\\Tesseract-OCR\\tesseract.exe"
@@ -35,6 +38,18 @@ class DocumentEditor:
         self.is_modified = False
         self.current_theme = "light"
         self.autosave_interval = 300  # 5 minutes
+        self.ocr_workers = ocr_engine.default_worker_count()
+        self.ocr_memory_limit_mb = 0  # 0: no limit
+        self.ocr_confidence_threshold = ocr_engine.DEFAULT_CONFIDENCE_THRESHOLD
+        self.ocr_cache_enabled = True
+        self.ocr_cache_max_mb = ocr_cache.DEFAULT_MAX_BYTES // (1024 * 1024)
+        self.ocr_use_text_layer = True
+        self.ocr_use_layout = True
+        self.ocr_route_script = True
+        self.ocr_adaptive_preprocessing = True
+        self.ocr_searchable_pdf = False
+        self.ocr_resume_jobs = True
+        self.ocr_trace_enabled = False
         
         # Then setup UI and other components
         self.setup_ui()
@@ -651,7 +666,19 @@ class DocumentEditor:
             "theme": self.current_theme,
             "font_family": self.font_var.get(),
             "font_size": self.size_var.get(),
-            "autosave_interval": self.autosave_interval
+            "autosave_interval": self.autosave_interval,
+            "ocr_workers": self.ocr_workers,
+            "ocr_memory_limit_mb": self.ocr_memory_limit_mb,
+            "ocr_confidence_threshold": self.ocr_confidence_threshold,
+            "ocr_cache_enabled": self.ocr_cache_enabled,
+            "ocr_cache_max_mb": self.ocr_cache_max_mb,
+            "ocr_use_text_layer": self.ocr_use_text_layer,
+            "ocr_use_layout": self.ocr_use_layout,
+            "ocr_route_script": self.ocr_route_script,
+            "ocr_adaptive_preprocessing": self.ocr_adaptive_preprocessing,
+            "ocr_searchable_pdf": self.ocr_searchable_pdf,
+            "ocr_resume_jobs": self.ocr_resume_jobs,
+            "ocr_trace_enabled": self.ocr_trace_enabled
         }
         with open("editor_settings.json", "w") as f:
             json.dump(settings, f)
@@ -664,6 +691,19 @@ class DocumentEditor:
                 self.font_var.set(settings.get("font_family", "Calibri"))
                 self.size_var.set(settings.get("font_size", "11"))
                 self.autosave_interval = settings.get("autosave_interval", 300)
+                self.ocr_workers = settings.get("ocr_workers", ocr_engine.default_worker_count())
+                self.ocr_memory_limit_mb = settings.get("ocr_memory_limit_mb", 0)
+                self.ocr_confidence_threshold = settings.get(
+                    "ocr_confidence_threshold", ocr_engine.DEFAULT_CONFIDENCE_THRESHOLD)
+                self.ocr_cache_enabled = settings.get("ocr_cache_enabled", True)
+                self.ocr_cache_max_mb = settings.get("ocr_cache_max_mb", self.ocr_cache_max_mb)
+                self.ocr_use_text_layer = settings.get("ocr_use_text_layer", True)
+                self.ocr_use_layout = settings.get("ocr_use_layout", True)
+                self.ocr_route_script = settings.get("ocr_route_script", True)
+                self.ocr_adaptive_preprocessing = settings.get("ocr_adaptive_preprocessing", True)
+                self.ocr_searchable_pdf = settings.get("ocr_searchable_pdf", False)
+                self.ocr_resume_jobs = settings.get("ocr_resume_jobs", True)
+                self.ocr_trace_enabled = settings.get("ocr_trace_enabled", False)
                 self.apply_settings()
         except FileNotFoundError:
             pass
@@ -677,13 +717,23 @@ class DocumentEditor:
         """Handle OCR from image files"""
         file_paths = filedialog.askopenfilenames(
             filetypes=[
-                ("Image files", "*.png *.jpg *.jpeg *.bmp *.tiff"),
+                ("Image files", "*.png *.jpg *.jpeg *.bmp *.tif *.tiff"),
                 ("All files", "*.*")
             ]
         )
         
         if file_paths:
-            self.process_ocr_files(file_paths, is_pdf=False)
+            # Multi-page TIFFs (faxes, archive exports) get a page range like PDFs
+            try:
+                multi_page = any(ocr_engine.image_frame_count(path) > 1 for path in file_paths)
+            except Exception:
+                multi_page = False
+            if multi_page:
+                self.ask_page_ranges(
+                    "Image Page Range",
+                    lambda page_ranges: self.process_ocr_files(file_paths, is_pdf=False, page_ranges=page_ranges))
+            else:
+                self.process_ocr_files(file_paths, is_pdf=False)
 
     def ocr_from_pdf(self):
         """Handle OCR from PDF files with page range selection"""
@@ -695,68 +745,74 @@ class DocumentEditor:
         )
         
         if file_paths:
-            # Show page range dialog
-            dialog = tk.Toplevel(self.root)
-            dialog.title("PDF Page Range")
-            dialog.geometry("300x150")
-            dialog.transient(self.root)
-            dialog.grab_set()
-            
-            # Center the dialog
-            dialog.update_idletasks()
-            x = self.root.winfo_x() + (self.root.winfo_width() - dialog.winfo_width()) // 2
-            y = self.root.winfo_y() + (self.root.winfo_height() - dialog.winfo_height()) // 2
-            dialog.geometry(f"+{x}+{y}")
-            
-            # Create and pack widgets
-            ttk.Label(dialog, text="Enter page range (e.g., 1-5 or 1,3,5-7):").pack(pady=10)
-            range_entry = ttk.Entry(dialog, width=30)
-            range_entry.pack(pady=5)
-            range_entry.insert(0, "all")
-            
-            def validate_and_process():
-                range_text = range_entry.get().strip()
-                if not range_text or range_text.lower() == 'all':
-                    page_ranges = None
-                else:
-                    try:
-                        page_ranges = []
-                        parts = range_text.split(',')
-                        for part in parts:
-                            if '-' in part:
-                                start, end = map(int, part.split('-'))
-                                if start > end:
-                                    raise ValueError("Invalid range")
-                                page_ranges.extend(range(start-1, end))
-                            else:
-                                page_ranges.append(int(part)-1)
-                        page_ranges = sorted(set(page_ranges))  # Remove duplicates and sort
-                    except ValueError:
-                        messagebox.showerror("Error", "Invalid page range format")
-                        return
-                
-                dialog.destroy()
-                self.process_ocr_files(file_paths, is_pdf=True, page_ranges=page_ranges)
+            self.ask_page_ranges(
+                "PDF Page Range",
+                lambda page_ranges: self.process_ocr_files(file_paths, is_pdf=True, page_ranges=page_ranges))
+
+    def ask_page_ranges(self, title, on_ok):
+        """Ask for a page range and pass it to on_ok as sorted zero-based pages, or None for all"""
+        # Show page range dialog
+        dialog = tk.Toplevel(self.root)
+        dialog.title(title)
+        dialog.geometry("300x150")
+        dialog.transient(self.root)
+        dialog.grab_set()
+        
+        # Center the dialog
+        dialog.update_idletasks()
+        x = self.root.winfo_x() + (self.root.winfo_width() - dialog.winfo_width()) // 2
+        y = self.root.winfo_y() + (self.root.winfo_height() - dialog.winfo_height()) // 2
+        dialog.geometry(f"+{x}+{y}")
+        
+        # Create and pack widgets
+        ttk.Label(dialog, text="Enter page range (e.g., 1-5 or 1,3,5-7):").pack(pady=10)
+        range_entry = ttk.Entry(dialog, width=30)
+        range_entry.pack(pady=5)
+        range_entry.insert(0, "all")
+        
+        def validate_and_process():
+            range_text = range_entry.get().strip()
+            if not range_text or range_text.lower() == 'all':
+                page_ranges = None
+            else:
+                try:
+                    page_ranges = []
+                    parts = range_text.split(',')
+                    for part in parts:
+                        if '-' in part:
+                            start, end = map(int, part.split('-'))
+                            if start > end:
+                                raise ValueError("Invalid range")
+                            page_ranges.extend(range(start-1, end))
+                        else:
+                            page_ranges.append(int(part)-1)
+                    page_ranges = sorted(set(page_ranges))  # Remove duplicates and sort
+                except ValueError:
+                    messagebox.showerror("Error", "Invalid page range format")
+                    return
             
-            def show_help():
-                help_text = """Page Range Format:
+            dialog.destroy()
+            on_ok(page_ranges)
+        
+        def show_help():
+            help_text = """Page Range Format:
 - Use 'all' for all pages
 - Single page: 1
 - Page range: 1-5
 - Multiple ranges: 1-3,5,7-9
 - First page is 1"""
-                messagebox.showinfo("Page Range Help", help_text)
-            
-            button_frame = ttk.Frame(dialog)
-            button_frame.pack(pady=10)
-            
-            ttk.Button(button_frame, text="OK", command=validate_and_process).pack(side=tk.LEFT, padx=5)
-            ttk.Button(button_frame, text="Cancel", command=dialog.destroy).pack(side=tk.LEFT, padx=5)
-            ttk.Button(button_frame, text="Help", command=show_help).pack(side=tk.LEFT, padx=5)
-            
-            range_entry.focus_set()
-            dialog.bind('<Return>', lambda e: validate_and_process())
-            dialog.bind('<Escape>', lambda e: dialog.destroy())
+            messagebox.showinfo("Page Range Help", help_text)
+        
+        button_frame = ttk.Frame(dialog)
+        button_frame.pack(pady=10)
+        
+        ttk.Button(button_frame, text="OK", command=validate_and_process).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Cancel", command=dialog.destroy).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Help", command=show_help).pack(side=tk.LEFT, padx=5)
+        
+        range_entry.focus_set()
+        dialog.bind('<Return>', lambda e: validate_and_process())
+        dialog.bind('<Escape>', lambda e: dialog.destroy())
 
     def format_time(self, seconds):
         """Convert seconds to a readable time format (HH:MM:SS)"""
@@ -775,238 +831,193 @@ class DocumentEditor:
         """Process OCR for multiple files with progress tracking"""
         self.ocr_cancelled = False
         self.cancel_ocr_btn.config(state='normal')
-        total_files = len(file_paths)
+        ocr_options = {
+            "lang": self.ocr_lang_var.get().split()[0],
+            "confidence_threshold": self.ocr_confidence_threshold,
+            "use_cache": self.ocr_cache_enabled,
+            "cache_max_bytes": self.ocr_cache_max_mb * 1024 * 1024,
+            "use_text_layer": self.ocr_use_text_layer,
+            "use_layout": self.ocr_use_layout,
+            "route_script": self.ocr_route_script,
+            "adaptive_preprocessing": self.ocr_adaptive_preprocessing,
+            # Also save a copy of each PDF with the OCR text as an invisible layer
+            "searchable_pdf": is_pdf and self.ocr_searchable_pdf,
+            # Pages already run in parallel on the pool; don't split them further
+            "layout_workers": 1 if self.ocr_page_workers() > 1 else ocr_engine.default_worker_count()
+        }
         start_time = time.time()
         
         def process_files():
-            extracted_text = []
+            journal = None
+            # Searchable copies of the input PDFs, by file index, filled in as pages finish
+            searchable_pdfs = {}
+            trace = ocr_options["trace"] = self.start_trace("ocr")
+            
+            def add_page_words(index, page_words):
+                file_index, page_num, file_path = tasks[index]
+                if file_index not in searchable_pdfs:
+                    searchable_pdfs[file_index] = ocr_pdf.SearchablePDF(file_path)
+                searchable_pdfs[file_index].add_page_words(page_num, page_words["words"], page_words["rotate"])
             
             try:
-                for i, file_path in enumerate(file_paths, 1):
-                    if self.ocr_cancelled:
-                        self.update_ocr_status("OCR cancelled")
-                        return
+                self.update_ocr_status("Preparing pages...")
+                cache = cache_before = None
+                if self.ocr_cache_enabled:
+                    cache = ocr_cache.get_default_cache(ocr_options["cache_max_bytes"])
+                    cache_before = cache.stats()
+                # Every page of every file goes into one shared work queue
+                tasks = ocr_engine.build_page_tasks(file_paths, is_pdf, page_ranges)
+                total_pages = len(tasks)
+                processed_pages = 0
+                
+                # Journaled pages have no word boxes, so searchable PDF jobs always start over
+                if self.ocr_resume_jobs and not ocr_options["searchable_pdf"]:
+                    self.update_ocr_status("Checking for an interrupted run of this job...")
+                    # Cache, worker and trace settings don't change the text, so they don't start a new job
+                    journal_settings = {
+                        key: value for key, value in ocr_options.items()
+                        if key not in ("use_cache", "cache_max_bytes", "layout_workers", "trace")
+                    }
+                    journal = ocr_journal.OCRJournal(file_paths, journal_settings)
+                results = self.resumable_ocr_results(tasks, ocr_options, journal, add_page_words)
+                
+                # Pages can finish out of order; hold them until their turn comes
+                finished_pages = {}
+                next_page = 0
+                inserted_pages = 0
+                blank_pages = 0
+                self.root.after(0, lambda: self.text_area.mark_set('ocr_insert', 'end-1c'))
+                
+                for index, text in results:
+                    if text is None:
+                        # A blank page, skipped without running OCR
+                        blank_pages += 1
+                    finished_pages[index] = text
+                    processed_pages += 1
+                    
+                    # Insert every page that is now next in document/page order
+                    while next_page in finished_pages:
+                        text = finished_pages.pop(next_page)
+                        next_page += 1
+                        if text and text.strip():
+                            separator = "\n\n" if inserted_pages else ""
+                            self.root.after(0, self.insert_ocr_text, separator + text)
+                            inserted_pages += 1
                     
                     # Calculate progress and estimated time
-                    progress = (i - 1) / total_files
+                    progress = processed_pages / total_pages
                     elapsed_time = time.time() - start_time
-                    if progress > 0:
-                        estimated_total = elapsed_time / progress
-                        remaining_time = estimated_total - elapsed_time
-                        time_str = f" - {self.format_time(remaining_time)} remaining"
-                    else:
-                        time_str = ""
+                    estimated_total = elapsed_time / progress
+                    remaining_time = estimated_total - elapsed_time
+                    time_str = f" - {self.format_time(remaining_time)} remaining"
                     
                     self.update_ocr_status(
-                        f"Processing file {i}/{total_files} ({progress*100:.1f}%){time_str}: "
-                        f"{os.path.basename(file_path)}"
+                        f"Processed page {processed_pages}/{total_pages} "
+                        f"({progress*100:.1f}%){time_str}"
                     )
-                    
-                    if is_pdf:
-                        # Convert PDF pages to images and process
-                        pdf_doc = fitz.open(file_path)
-                        
-                        # Determine which pages to process
-                        if page_ranges is None:
-                            pages_to_process = range(pdf_doc.page_count)
-                        else:
-                            pages_to_process = [p for p in page_ranges if p < pdf_doc.page_count]
-                        
-                        total_pages = len(pages_to_process)
-                        
-                        for idx, page_num in enumerate(pages_to_process):
-                            if self.ocr_cancelled:
-                                break
-                            
-                            page_progress = (idx / total_pages + (i - 1)) / total_files
-                            elapsed = time.time() - start_time
-                            if page_progress > 0:
-                                est_total = elapsed / page_progress
-                                remaining = est_total - elapsed
-                                time_str = f" - {self.format_time(remaining)} remaining"
-                            else:
-                                time_str = ""
-                            
-                            self.update_ocr_status(
-                                f"Processing page {page_num + 1} of selected pages "
-                                f"({page_progress*100:.1f}%){time_str}"
-                            )
-                            
-                            page = pdf_doc[page_num]
-                            # Increase DPI for better quality
-                            pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
-                            
-                            # Convert PyMuPDF pixmap to PIL Image
-                            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                            
-                            # Rotate image if needed
-                            width, height = img.size
-                            if width > height:
-                                img = img.rotate(90, expand=True)
-                            
-                            text = self.perform_ocr(img)
-                            if text.strip():
-                                extracted_text.append(text)
-                        
-                        pdf_doc.close()
-                    else:
-                        # Process image file directly with enhanced preprocessing
-                        img = Image.open(file_path)
-                        # Auto-rotate based on EXIF data if available
-                        try:
-                            img = ImageOps.exif_transpose(img)
-                        except:
-                            pass
-                        text = self.perform_ocr(img)
-                        if text.strip():
-                            extracted_text.append(text)
-                    
-                # Insert extracted text into editor
-                if extracted_text:
-                    final_text = "\n\n".join(extracted_text)
-                    self.text_area.insert(tk.END, final_text + "\n")
+                
+                if self.ocr_cancelled:
+                    self.update_ocr_status("OCR cancelled")
+                    return
+                
+                # The job is complete, so there is nothing left to resume
+                if journal is not None:
+                    journal.discard()
+                
+                # Pages that had their own text layer are searchable already
+                for file_index, searchable_pdf in searchable_pdfs.items():
+                    base_name = os.path.splitext(file_paths[file_index])[0]
+                    searchable_pdf.save(f"{base_name}_searchable.pdf")
+                saved_pdfs = len(searchable_pdfs)
+                searchable_pdfs.clear()
+                
+                blank_summary = f", {blank_pages} blank pages skipped" if blank_pages else ""
+                if saved_pdfs:
+                    blank_summary += f", {saved_pdfs} searchable PDFs saved"
+                if inserted_pages:
+                    self.root.after(0, self.insert_ocr_text, "\n")
                     total_time = time.time() - start_time
-                    self.update_ocr_status(f"OCR completed in {self.format_time(total_time)}")
+                    self.update_ocr_status(
+                        f"OCR completed in {self.format_time(total_time)}"
+                        f"{self.ocr_cache_summary(cache, cache_before)}{blank_summary}"
+                    )
                 else:
-                    self.update_ocr_status("No text was extracted")
+                    self.update_ocr_status(f"No text was extracted{blank_summary}")
                     
             except Exception as e:
                 self.update_ocr_status(f"Error during OCR: {str(e)}")
             
             finally:
+                if journal is not None:
+                    journal.close()
+                for searchable_pdf in searchable_pdfs.values():
+                    searchable_pdf.close()
+                self.finish_trace(trace)
                 self.cancel_ocr_btn.config(state='disabled')
         
         # Start processing in a separate thread
         threading.Thread(target=process_files, daemon=True).start()
 
-    def perform_ocr(self, image):
-        """Perform OCR on a single image"""
-        try:
-            # Get language code from combo box (strip description)
-            lang_code = self.ocr_lang_var.get().split()[0]
-            
-            # Convert to grayscale and preprocess
-            img = image.convert('L')
-            cv_img = np.array(img)
-            cv_img = cv2.normalize(cv_img, None, 0, 255, cv2.NORM_MINMAX)
-            
-            # Try different preprocessing methods
-            results = []
-            
-            # Method 1: Adaptive Gaussian Thresholding
-            try:
-                img1 = cv2.adaptiveThreshold(
-                    cv_img, 255,
-                    cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                    cv2.THRESH_BINARY,
-                    11, 2
-                )
-                text1 = pytesseract.image_to_string(img1, lang=lang_code)
-                if text1.strip():
-                    results.append(text1)
-            except Exception as e:
-                self.update_ocr_status(f"Method 1 failed: {str(e)}")
-            
-            # Method 2: Otsu's thresholding
-            try:
-                _, img2 = cv2.threshold(cv_img, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-                text2 = pytesseract.image_to_string(img2, lang=lang_code)
-                if text2.strip():
-                    results.append(text2)
-            except Exception as e:
-                self.update_ocr_status(f"Method 2 failed: {str(e)}")
-            
-            # Method 3: Original image
-            try:
-                text3 = pytesseract.image_to_string(cv_img, lang=lang_code)
-                if text3.strip():
-                    results.append(text3)
-            except Exception as e:
-                self.update_ocr_status(f"Method 3 failed: {str(e)}")
-            
-            # Choose the best result (longest text)
-            if results:
-                return max(results, key=len).strip()
-            
-            self.update_ocr_status("No text could be extracted from the image")
-            return ""
-            
-        except Exception as e:
-            self.update_ocr_status(f"OCR error: {str(e)}")
-            return ""
-
-    def post_process_text(self, text):
-        """Post-process OCR text to improve accuracy"""
-        if not text:
-            return text
+    def resumable_ocr_results(self, tasks, ocr_options, journal, on_page_words=None):
+        """Yield (task_index, text) for every task, reusing pages recorded in the journal"""
+        if journal is None:
+            yield from ocr_engine.iter_ocr_results(
+                tasks, ocr_options, self.ocr_page_workers(), lambda: self.ocr_cancelled, on_page_words)
+            return
         
-        try:
-            # Remove excessive whitespace while preserving paragraphs
-            paragraphs = text.split('\n\n')
-            cleaned_paragraphs = []
-            for para in paragraphs:
-                # Join lines that were split in the middle of sentences
-                lines = para.split('\n')
-                merged_lines = []
-                current_line = ""
-                
-                for line in lines:
-                    line = line.strip()
-                    if not line:
-                        continue
-                        
-                    # If the previous line doesn't end with punctuation, it's probably a continuation
-                    if current_line and not current_line[-1] in '.!?":)]}':
-                        current_line += ' ' + line
-                    else:
-                        if current_line:
-                            merged_lines.append(current_line)
-                        current_line = line
-                
-                if current_line:
-                    merged_lines.append(current_line)
-                
-                cleaned_para = ' '.join(merged_lines)
-                if cleaned_para:
-                    cleaned_paragraphs.append(cleaned_para)
-            
-            text = '\n\n'.join(cleaned_paragraphs)
-            
-            # Fix common OCR mistakes
-            common_fixes = {
-                'l': 'I',  # Common confusion between l and I
-                '0': 'O',  # Common confusion between 0 and O
-                '|': 'I',  # Common confusion with vertical bar
-                '1': 'l',  # Common confusion between 1 and l
-                'rn': 'm',  # Common confusion between rn and m
-                '[': '(',  # Common bracket confusions
-                ']': ')',
-                '{': '(',
-                '}': ')',
-            }
-            
-            for wrong, correct in common_fixes.items():
-                text = text.replace(wrong, correct)
-            
-            # Fix spacing issues
-            text = re.sub(r'(?<=\w)\s+(?=[\.,!?])', '', text)  # Remove space before punctuation
-            text = re.sub(r'(?<=[\.,!?])\s*(?=\w)', ' ', text)  # Ensure space after punctuation
-            
-            # Remove likely OCR errors (single characters surrounded by spaces)
-            text = re.sub(r'\s+[b-zB-Z]\s+', ' ', text)
-            
-            # Fix hyphenation
-            text = re.sub(r'(?<=\w)[-]\s+', '-', text)
-            text = re.sub(r'\s+[-](?=\w)', '-', text)
-            
-            # Remove non-printable characters while preserving newlines
-            text = ''.join(char for char in text if char.isprintable() or char in '\n\t')
-            
-            return text.strip()
-            
-        except Exception as e:
-            self.update_ocr_status(f"Post-processing error: {str(e)}")
-            return text.strip()
+        def page_key(task):
+            file_index, page_num, _ = task
+            return f"{journal.digests[file_index]}:{page_num}"
+        
+        remaining = []
+        for index, task in enumerate(tasks):
+            key = page_key(task)
+            if key in journal.completed:
+                yield index, journal.completed[key]
+            else:
+                remaining.append(index)
+        
+        if len(remaining) < len(tasks):
+            self.update_ocr_status(
+                f"Resuming: {len(tasks) - len(remaining)} of {len(tasks)} pages already done")
+        
+        for sub_index, text in ocr_engine.iter_ocr_results(
+                [tasks[index] for index in remaining], ocr_options, self.ocr_page_workers(),
+                lambda: self.ocr_cancelled,
+                None if on_page_words is None else lambda sub_index, words: on_page_words(remaining[sub_index], words)):
+            index = remaining[sub_index]
+            journal.record(page_key(tasks[index]), text)
+            yield index, text
+
+    def ocr_page_workers(self):
+        """OCR worker processes to start, within the configured memory limit"""
+        return ocr_engine.memory_bounded_workers(self.ocr_workers, self.ocr_memory_limit_mb * 1024 * 1024)
+
+    def start_trace(self, job_name):
+        """Start a trace for a job when tracing is on in settings or via OCR_TRACE"""
+        trace_dir = ocr_trace.DEFAULT_TRACE_DIR if self.ocr_trace_enabled else None
+        return ocr_trace.start_job(job_name, trace_dir)
+
+    def finish_trace(self, trace):
+        """Merge a job's trace and show where it was saved in the status bar"""
+        trace_path = ocr_trace.finish_job(trace)
+        if trace_path:
+            self.root.after(0, lambda: self.status_label.config(text=f"Trace saved to {trace_path}"))
+
+    def insert_ocr_text(self, text):
+        """Append OCR output at the position the current job started writing to"""
+        self.text_area.insert('ocr_insert', text)
+
+    def ocr_cache_summary(self, cache, stats_before):
+        """Describe how many page and text block results of the job that just
+        finished came from the cache. OSD and word box lookups aren't counted.
+        """
+        if cache is None:
+            return ""
+        stats = cache.stats()
+        hits = stats["hits"] - stats_before["hits"]
+        misses = stats["misses"] - stats_before["misses"]
+        return f" (cache: {hits} of {hits + misses} page and block texts)"
 
     def update_ocr_status(self, message):
         """Update OCR status message"""
@@ -1041,6 +1052,7 @@ class DocumentEditor:
         self.translation_cancelled = False
         
         def translate_chunks():
+            trace = self.start_trace("translate")
             try:
                 # Split text into chunks
                 chunks = self.split_into_chunks(text, 500)
@@ -1070,7 +1082,8 @@ class DocumentEditor:
                     )
                     
                     try:
-                        translated_text = translator.translate(chunk)
+                        with ocr_trace.span("translate", chunk=i, chars=len(chunk)):
+                            translated_text = translator.translate(chunk)
                         if translated_text and not translated_text.isspace():
                             translated_chunks.append(translated_text)
                     except Exception as e:
@@ -1098,6 +1111,7 @@ class DocumentEditor:
                 self.update_trans_status(f"Translation error: {str(e)}")
             
             finally:
+                self.finish_trace(trace)
                 self.cancel_trans_btn.config(state='disabled')
         
         # Start translation in a separate thread
@@ -1193,6 +1207,7 @@ class DocumentEditor:
         self.tts_cancelled = False
         
         def convert_to_speech():
+            trace = self.start_trace("speech")
             try:
                 # Split text into smaller chunks
                 chunks = text.split('. ')
@@ -1222,8 +1237,9 @@ class DocumentEditor:
                     temp_file = os.path.join(temp_dir, f"temp_{i}.mp3")
                     
                     try:
-                        tts = gTTS(text=chunk, lang=lang_code)
-                        tts.save(temp_file)
+                        with ocr_trace.span("gTTS", chunk=i, chars=len(chunk)):
+                            tts = gTTS(text=chunk, lang=lang_code)
+                            tts.save(temp_file)
                         
                         # Update progress
                         processed_chunks += 1
@@ -1278,6 +1294,7 @@ class DocumentEditor:
                 self.tts_status_label.config(text=f"Error during conversion: {str(e)}")
                 
             finally:
+                self.finish_trace(trace)
                 self.cancel_tts_btn.config(state='disabled')
                 # Clean up temp directory if it still exists
                 try:
@@ -0,0 +1,199 @@
+"""Persistent cache of OCR results, keyed by page content.
+
+Entries are stored in a SQLite database and looked up by a hash of the
+page pixels plus every setting that changes the OCR output. The database
+is bounded in size; the least recently used entries are evicted first.
+"""
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".ocr_tool", "ocr_cache.sqlite")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512 MB of cached text
+
+# One cache per process, created on first use
+_default_cache = None
+# Caches inherited from the parent by a forked process. They are kept
+# referenced so they are never closed or freed here, which would use the
+# parent's SQLite connection.
+_inherited_caches = []
+
+
+def make_key(pixels, **params):
+    """Hash page pixels together with the settings that affect the OCR result"""
+    array = np.ascontiguousarray(pixels)
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"{array.shape}|{array.dtype}".encode())
+    digest.update(json.dumps(params, sort_keys=True).encode())
+    digest.update(memoryview(array).cast('B'))
+    return digest.hexdigest()
+
+
+class OCRCache:
+    """Size-bounded LRU store of OCR text with hit/miss counters.
+
+    Lookups only read the database. The hits and misses they count and the
+    last-used times of the entries they find are written with the next put,
+    flush or stats call.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        self._touched = {}
+        self._pending_counts = {"hits": 0, "misses": 0}
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Several worker processes share the database, so wait on locks
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, text TEXT NOT NULL, "
+                "size INTEGER NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)"
+            )
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(results)")]
+            if "confidence" not in columns:
+                self._conn.execute("ALTER TABLE results ADD COLUMN confidence REAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+            # The total size is kept in counters by triggers, so puts don't
+            # sum the table. Databases from before the triggers are summed once.
+            self._conn.execute(
+                "INSERT OR IGNORE INTO counters (name, value) "
+                "SELECT 'bytes', COALESCE(SUM(size), 0) FROM results"
+            )
+            self._conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS results_size_insert AFTER INSERT ON results BEGIN "
+                "UPDATE counters SET value = value + NEW.size WHERE name = 'bytes'; END"
+            )
+            self._conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS results_size_update AFTER UPDATE OF size ON results BEGIN "
+                "UPDATE counters SET value = value + NEW.size - OLD.size WHERE name = 'bytes'; END"
+            )
+            self._conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS results_size_delete AFTER DELETE ON results BEGIN "
+                "UPDATE counters SET value = value - OLD.size WHERE name = 'bytes'; END"
+            )
+
+    def _write_pending(self):
+        """Write counted lookups and last-used times; call holding the lock, in a transaction"""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE results SET last_used = ? WHERE key = ?",
+                [(used, key) for key, used in self._touched.items()]
+            )
+            self._touched.clear()
+        for name, value in self._pending_counts.items():
+            if value:
+                self._conn.execute(
+                    "INSERT INTO counters (name, value) VALUES (?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                    (name, value)
+                )
+                self._pending_counts[name] = 0
+
+    def lookup(self, key, count=True):
+        """Return (text, confidence) for key, or None on a miss.
+
+        confidence is None for entries stored without one. Only lookups with
+        count set add to the hit/miss counters; callers pass count=False for
+        entries that aren't OCR text, such as word boxes or OSD results.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text, confidence FROM results WHERE key = ?", (key,)).fetchone()
+            if count:
+                self._pending_counts["misses" if row is None else "hits"] += 1
+            if row is not None:
+                self._touched[key] = time.time()
+            return row
+
+    def get(self, key, count=True):
+        """Return the cached text for key, or None on a miss"""
+        entry = self.lookup(key, count)
+        return None if entry is None else entry[0]
+
+    def put(self, key, text, confidence=None):
+        """Store text for key, evicting least recently used entries if over the size limit"""
+        size = len(text.encode('utf-8'))
+        with self._lock, self._conn:
+            self._write_pending()
+            self._conn.execute(
+                "INSERT INTO results (key, text, size, last_used, confidence) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET text = excluded.text, size = excluded.size, "
+                "last_used = excluded.last_used, confidence = excluded.confidence",
+                (key, text, size, time.time(), confidence)
+            )
+            total = self._conn.execute("SELECT value FROM counters WHERE name = 'bytes'").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            # Trim to 90% of the limit so eviction doesn't run on every put
+            target = self.max_bytes * 0.9
+            evicted = 0
+            for old_key, old_size in self._conn.execute(
+                    "SELECT key, size FROM results ORDER BY last_used").fetchall():
+                if total - evicted <= target:
+                    break
+                self._conn.execute("DELETE FROM results WHERE key = ?", (old_key,))
+                evicted += old_size
+
+    def flush(self):
+        """Write the counted lookups and last-used times of entries found since the last write"""
+        with self._lock:
+            if not self._touched and not any(self._pending_counts.values()):
+                return
+            with self._conn:
+                self._write_pending()
+
+    def stats(self):
+        """Return hit/miss counters and the current size of the cache"""
+        with self._lock:
+            with self._conn:
+                self._write_pending()
+            counters = dict(self._conn.execute("SELECT name, value FROM counters").fetchall())
+            entries = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        return {
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+            "entries": entries,
+            "bytes": counters.get("bytes", 0),
+        }
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+
+def get_default_cache(max_bytes=DEFAULT_MAX_BYTES):
+    """Return this process's shared cache, opening it on first use"""
+    global _default_cache
+    if _default_cache is not None and _default_cache.pid != os.getpid():
+        # A forked worker inherited the parent's cache. SQLite connections
+        # can't be used across fork(), so open the same database again.
+        _inherited_caches.append(_default_cache)
+        _default_cache = OCRCache(_default_cache.path, _default_cache.max_bytes)
+    if _default_cache is None:
+        _default_cache = OCRCache(max_bytes=max_bytes)
+    return _default_cache
+
+
+@atexit.register
+def _flush_default_cache():
+    # Pool workers leave without running this, so ocr_engine flushes after each page
+    if _default_cache is not None and _default_cache.pid == os.getpid():
+        _default_cache.flush()
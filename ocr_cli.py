@@ -0,0 +1,142 @@
+"""Command-line batch OCR without the GUI.
+
+Runs the same OCR, translation and DOCX/MP3/PDF output code as gui.py, but
+reports progress on the console and never creates a Tk window, so it works
+on servers and in scripts:
+
+    python ocr_cli.py scans/ "archive/*.pdf" --format docx --lang en --workers 4
+"""
+import argparse
+import glob
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import fitz  # PyMuPDF
+import pytesseract
+
+import gui
+import ocr_engine
+import ocr_trace
+
+
+def expand_inputs(inputs):
+    """Turn files, directories and glob patterns into a sorted list of PDF paths"""
+    pdf_paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            candidates = glob.glob(os.path.join(item, "**", "*"), recursive=True)
+        elif os.path.isfile(item):
+            candidates = [item]
+        else:
+            candidates = glob.glob(item, recursive=True)
+            if not candidates:
+                print(f"No files match {item}", file=sys.stderr)
+        pdf_paths.extend(path for path in candidates
+                         if os.path.isfile(path) and path.lower().endswith('.pdf'))
+    # Keep the first occurrence of each file
+    return list(dict.fromkeys(os.path.abspath(path) for path in sorted(pdf_paths)))
+
+
+def _init_worker(tesseract_cmd):
+    pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+
+
+def convert_document(pdf_path, options):
+    """Process one PDF with the GUI's pipeline; returns (pdf_path, ok, message)"""
+    name = os.path.basename(pdf_path)
+    try:
+        with fitz.open(pdf_path) as pdf_document:
+            total_pages = len(pdf_document)
+        pages_to_process = gui.parse_page_ranges(options["pages"], total_pages)
+    except Exception as e:
+        return pdf_path, False, f"{name}: {e}"
+
+    ok = gui.process_pdf(
+        pdf_path,
+        pages_to_process,
+        options["conversion_type"],
+        options["target_lang"],
+        progress=gui.ConsoleProgress(f"[{name}] "),
+        output_dir=options["output_dir"],
+        ocr_lang=options["ocr_lang"],
+        play_audio=False,
+        trace_dir=options["trace_dir"],
+        use_layout=options["use_layout"],
+    )
+    return pdf_path, ok, f"{name}: {'done' if ok else 'failed'}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch OCR PDFs to DOCX, MP3 or searchable PDF without the GUI")
+    parser.add_argument("inputs", nargs="+", help="PDF files, directories or glob patterns")
+    parser.add_argument("--format", choices=["docx", "speech", "pdf"], default="docx",
+                        help="output format; pdf is a searchable copy of the input (default: docx)")
+    parser.add_argument("--lang", default="en",
+                        help="target language; text in other languages is translated (default: en)")
+    parser.add_argument("--ocr-lang", default=gui.tamil_lang,
+                        help=f"Tesseract language(s) to recognize (default: {gui.tamil_lang})")
+    parser.add_argument("--pages", default="",
+                        help="page ranges applied to every document, e.g. '1-3, 5' (default: all)")
+    parser.add_argument("--workers", type=int, default=ocr_engine.default_worker_count(),
+                        help="documents processed in parallel (default: %(default)s)")
+    parser.add_argument("--memory-limit", type=int, default=0, metavar="MB",
+                        help="run fewer documents in parallel so their pages fit in MB megabytes "
+                             "(default: no limit)")
+    parser.add_argument("--output-dir", default=gui.DEFAULT_OUTPUT_DIR,
+                        help="where to write the outputs (default: %(default)s)")
+    parser.add_argument("--trace", metavar="DIR", nargs="?", const=ocr_trace.DEFAULT_TRACE_DIR,
+                        help="write a Chrome trace of each document's stages to DIR "
+                             f"(default: {ocr_trace.DEFAULT_TRACE_DIR})")
+    parser.add_argument("--no-layout", action="store_true",
+                        help="OCR whole pages instead of only the text blocks found on them")
+    parser.add_argument("--tesseract-cmd", default=pytesseract.pytesseract.tesseract_cmd,
+                        help="path to the tesseract executable")
+    args = parser.parse_args(argv)
+
+    pdf_paths = expand_inputs(args.inputs)
+    if not pdf_paths:
+        parser.error("no PDF files found")
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    options = {
+        "conversion_type": {"docx": "DOCX", "speech": "Speech", "pdf": "Searchable PDF"}[args.format],
+        "target_lang": args.lang,
+        "ocr_lang": args.ocr_lang,
+        "pages": args.pages,
+        "output_dir": args.output_dir,
+        "trace_dir": args.trace,
+        "use_layout": not args.no_layout,
+    }
+
+    failures = 0
+    # Each document has one page in flight at a time
+    workers = ocr_engine.memory_bounded_workers(args.workers, args.memory_limit * 1024 * 1024)
+    workers = max(1, min(workers, len(pdf_paths)))
+    if workers == 1:
+        _init_worker(args.tesseract_cmd)
+        results = (convert_document(path, options) for path in pdf_paths)
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=(args.tesseract_cmd,))
+        futures = [pool.submit(convert_document, path, options) for path in pdf_paths]
+        results = (future.result() for future in as_completed(futures))
+
+    try:
+        for _, ok, message in results:
+            print(message, flush=True)
+            failures += not ok
+    except KeyboardInterrupt:
+        gui.cancel_event.set()
+        print("Cancelled", file=sys.stderr)
+        return 130
+    finally:
+        if workers > 1:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    print(f"{len(pdf_paths) - failures} of {len(pdf_paths)} documents converted")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
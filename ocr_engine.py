@@ -0,0 +1,1531 @@
+"""OCR helpers shared by the editor and conversion tools.
+
+Nothing in here touches Tkinter, so these functions can run inside worker
+processes as well as on the GUI's background threads.
+"""
+import contextlib
+import json
+import os
+import queue
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import cv2
+import fitz  # PyMuPDF
+import numpy as np
+import pytesseract
+from PIL import Image, ImageOps, ImageSequence
+
+import ocr_cache
+import ocr_trace
+
+try:
+    import tesserocr
+except ImportError:  # Fall back to running the tesseract executable per call
+    tesserocr = None
+
+# The PDF most recently opened by this process, as (path, document)
+_open_document = (None, None)
+# The multi-page image most recently opened by this process, as (path, image)
+_open_image = (None, None)
+
+# Zoom applied when rendering PDF pages (2x = 144 dpi) if no better one is known
+RENDER_ZOOM = 2
+# Adaptive rendering probes each page at this zoom to measure its text...
+PROBE_ZOOM = 1
+# ...then picks the smallest zoom in this range, in half steps, that makes
+# the median glyph about TARGET_GLYPH_HEIGHT pixels tall. The target matches
+# what the fixed 2x zoom gives ordinary 10-11pt body text.
+MIN_RENDER_ZOOM = 1
+MAX_RENDER_ZOOM = 4
+TARGET_GLYPH_HEIGHT = 12
+
+# Mean word confidence (0-100) at which the first preprocessing method is
+# accepted without running the others
+DEFAULT_CONFIDENCE_THRESHOLD = 80
+
+
+# A PDF text layer is trusted when it has at least this many characters...
+MIN_TEXT_LAYER_CHARS = 20
+# ...and no more than this share of them are unreadable
+MAX_TEXT_LAYER_GARBAGE = 0.1
+# Images smaller than this share of the page are ignored by the text layer path
+MIN_IMAGE_REGION_SHARE = 0.05
+# Image regions with fewer text layer words than this are sent to OCR
+MIN_REGION_WORDS = 3
+
+# Orientation detection (OSD) runs on a copy of the page scaled down to at
+# most this many pixels on its long side...
+OSD_MAX_SIDE = 1200
+# ...and a page is only turned when Tesseract's orientation confidence
+# reaches this; below it the page is OCR'd as rendered
+MIN_OSD_CONFIDENCE = 2.0
+# Orientation results kept in memory per process, keyed by page hash
+OSD_MEMO_SIZE = 4096
+# Tesseract's OSD error for pages with too little text to tell orientation
+OSD_TOO_FEW_CHARACTERS = "Too few characters"
+
+# Script routing: the script OSD reports for each Tesseract language. A page
+# written in one script is OCR'd with just that language of a combined pack
+# such as tam+eng, which is several times faster than the whole pack
+LANGUAGE_SCRIPTS = {
+    'tam': 'Tamil',
+    'eng': 'Latin',
+    'fra': 'Latin',
+    'spa': 'Latin',
+    'deu': 'Latin',
+    'hin': 'Devanagari',
+    'tel': 'Telugu',
+    'kan': 'Kannada',
+    'mal': 'Malayalam',
+    'chi_sim': 'Han',
+    'jpn': 'Japanese',
+}
+# OSD script confidence needed before a page is routed to one language
+MIN_SCRIPT_CONFIDENCE = 1.0
+# A region read by a single-language model with a lower mean word confidence
+# is taken to be mixed script and read again with the combined pack
+MIN_ROUTED_CONFIDENCE = 60
+
+# Layout analysis works on a copy of the page scaled down to at most this
+# many pixels on its long side
+LAYOUT_MAX_SIDE = 1000
+# When text blocks cover more than this share of the page, cropping saves
+# little and the whole page is OCR'd instead
+LAYOUT_MAX_COVERAGE = 0.8
+# Ink density (share of dark pixels) a text block falls within; photos and
+# filled shapes are denser
+LAYOUT_MIN_INK, LAYOUT_MAX_INK = 0.02, 0.5
+# Lines are smeared into blocks across gaps of up to this many line pitches
+# (baseline to baseline), which also joins the paragraphs of a column
+LAYOUT_PITCH_SMEAR = 1.5
+# Blocks mostly covered by pictures and other shapes taller than a glyph are dropped
+LAYOUT_MAX_SHAPE_SHARE = 0.5
+
+# Images with at least this many pixels (a 300 dpi A2 sheet, roughly) are
+# OCR'd in tiles of at most TILE_SIDE pixels a side
+TILE_MIN_PIXELS = 50_000_000
+TILE_SIDE = 4000
+# Neighbouring tiles overlap by this much, which must be more than the widest
+# word, so every word is whole in the tile that keeps it
+TILE_OVERLAP = 800
+# PIL refuses images above its decompression-bomb limit (about 180
+# megapixels); an A0 scan at 600 dpi is about 560. The higher limit applies
+# only while OCR opens page images, not to the rest of the process
+MAX_IMAGE_PIXELS = 1_000_000_000
+
+# Blank page check: pixels this much darker than the page's median count
+# as ink...
+BLANK_INK_OFFSET = 64
+# ...and a page is blank if it has less than this share of ink spread over
+# at most BLANK_MAX_MARKS specks of at least BLANK_MIN_MARK_AREA pixels
+# (punch holes, dust, a stray pen mark). The ink share is first measured on
+# a copy at most BLANK_SAMPLE_SIDE pixels on its long side; marks are counted
+# at up to BLANK_MARK_SIDE, where the letters of small print are still apart.
+BLANK_SAMPLE_SIDE = 500
+BLANK_MARK_SIDE = 2000
+BLANK_MAX_INK = 0.003
+BLANK_MAX_MARKS = 3
+BLANK_MIN_MARK_AREA = 4
+
+# Adaptive preprocessing: the first pages of a document try every method...
+STRATEGY_LEARN_PAGES = 3
+# ...after that the method that usually wins runs alone, except on every
+# this-many-th page, which still tries them all...
+STRATEGY_EXPLORE_EVERY = 10
+# ...and on pages where its confidence falls this far below the document's
+# running average
+STRATEGY_CONFIDENCE_DROP = 10
+
+# Set OCR_DEBUG_IMAGES to a directory to keep a PNG of every page sent to OCR
+DEBUG_IMAGE_DIR = os.environ.get("OCR_DEBUG_IMAGES")
+
+# Rough peak memory of a worker OCRing one page at the highest zoom: the
+# pixmap, its preprocessed copies and Tesseract's models and buffers
+PAGE_MEMORY_BYTES = 256 * 1024 * 1024
+# Pages handed to the worker pool ahead of the oldest unfinished page, per
+# worker. Workers render a page only when they start on it, so this bounds
+# both the rendered pages in memory and the results waiting for their turn
+PAGES_AHEAD_PER_WORKER = 4
+
+# Numeric columns of Tesseract's TSV output, as returned by image_to_data
+_TSV_INT_COLUMNS = ('level', 'page_num', 'block_num', 'par_num', 'line_num', 'word_num',
+                    'left', 'top', 'width', 'height')
+_PSM_OPTION = re.compile(r"^\s*(?:--psm\s+(\d+))?\s*$")
+
+
+class TesseractEngine:
+    """Long-lived Tesseract API handles, pooled per language.
+
+    Loading traineddata for a combined pack such as tam+eng costs more than
+    recognizing a small page, so handles are kept for the life of the
+    process and reused. image_to_string and image_to_data take the same
+    arguments as their pytesseract counterparts. Without tesserocr, or for
+    configs other than --psm, calls go through pytesseract unchanged.
+    """
+
+    def __init__(self):
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    @property
+    def available(self):
+        return tesserocr is not None
+
+    def _create_api(self, lang, psm):
+        kwargs = {'lang': lang}
+        # Use the traineddata that ships next to the configured executable
+        tessdata = os.path.join(os.path.dirname(pytesseract.pytesseract.tesseract_cmd), 'tessdata')
+        if os.path.isdir(tessdata):
+            kwargs['path'] = tessdata
+        if psm is not None:
+            kwargs['psm'] = psm
+        return tesserocr.PyTessBaseAPI(**kwargs)
+
+    def _acquire(self, lang, psm):
+        with self._lock:
+            pool = self._pools.setdefault((lang, psm), queue.SimpleQueue())
+        try:
+            return pool.get_nowait()
+        except queue.Empty:
+            return self._create_api(lang, psm)
+
+    def _release(self, lang, psm, api):
+        api.Clear()
+        self._pools[(lang, psm)].put(api)
+
+    def _run(self, image, lang, config, read_result):
+        psm = _PSM_OPTION.match(config)
+        psm = int(psm.group(1)) if psm.group(1) else None
+        api = self._acquire(lang, psm)
+        try:
+            if isinstance(image, np.ndarray):
+                image = Image.fromarray(image)
+            api.SetImage(image)
+            return read_result(api)
+        finally:
+            self._release(lang, psm, api)
+
+    @staticmethod
+    def _read_data(api):
+        api.Recognize()
+        return api.GetTSVText(0)
+
+    def _can_handle(self, config):
+        return self.available and _PSM_OPTION.match(config) is not None
+
+    def image_to_string(self, image, lang='eng', config=''):
+        with ocr_trace.span("tesseract", call="image_to_string", lang=lang):
+            if not self._can_handle(config):
+                return pytesseract.image_to_string(image, lang=lang, config=config)
+            return self._run(image, lang, config, lambda api: api.GetUTF8Text())
+
+    def image_to_data(self, image, lang='eng', config='', output_type=pytesseract.Output.DICT):
+        with ocr_trace.span("tesseract", call="image_to_data", lang=lang):
+            if output_type != pytesseract.Output.DICT or not self._can_handle(config):
+                return pytesseract.image_to_data(image, lang=lang, config=config, output_type=output_type)
+            tsv = self._run(image, lang, config, self._read_data)
+
+        data = {column: [] for column in _TSV_INT_COLUMNS + ('conf', 'text')}
+        for row in tsv.splitlines():
+            fields = row.split('\t')
+            if len(fields) < 12:
+                continue
+            for column, value in zip(_TSV_INT_COLUMNS, fields):
+                data[column].append(int(value))
+            data['conf'].append(float(fields[10]))
+            data['text'].append(fields[11])
+        return data
+
+    def image_to_osd(self, image):
+        """Tesseract orientation and script detection, as a dict with the
+        rotate, orientation_conf, script and script_conf keys of pytesseract's
+        image_to_osd. rotate is the clockwise turn that makes the page upright.
+        """
+        with ocr_trace.span("tesseract", call="image_to_osd"):
+            if not self.available:
+                return pytesseract.image_to_osd(image, output_type=pytesseract.Output.DICT)
+            osd = self._run(image, 'osd', '--psm 0', lambda api: api.DetectOrientationScript())
+        if osd is None:
+            # What the tesseract executable reports for the same pages
+            raise RuntimeError(f"{OSD_TOO_FEW_CHARACTERS}; orientation detection failed")
+        return {
+            'rotate': (360 - osd['orient_deg']) % 360,
+            'orientation_conf': osd['orient_conf'],
+            'script': osd['script_name'],
+            'script_conf': osd['script_conf'],
+        }
+
+
+# One engine per process; worker processes get their own on import
+engine = TesseractEngine()
+image_to_string = engine.image_to_string
+image_to_data = engine.image_to_data
+image_to_osd = engine.image_to_osd
+
+# Orientation results for pages seen by this process, by page hash
+_osd_memo = {}
+
+
+def default_worker_count():
+    """Number of OCR worker processes to use when none is configured"""
+    return os.cpu_count() or 1
+
+
+def memory_bounded_workers(workers, memory_limit=None):
+    """Cap a worker count so pages in flight fit in memory_limit bytes (None or 0: no cap)"""
+    if not memory_limit:
+        return workers
+    return max(1, min(workers, memory_limit // PAGE_MEMORY_BYTES))
+
+
+# Threads inside _large_images_allowed, and PIL's limit from before the first
+# of them raised it; the last one out puts the limit back
+_large_images_lock = threading.Lock()
+_large_images_users = 0
+_pil_pixel_limit = None
+
+
+@contextlib.contextmanager
+def _large_images_allowed():
+    """Let PIL open images of up to MAX_IMAGE_PIXELS inside the block"""
+    global _large_images_users, _pil_pixel_limit
+    with _large_images_lock:
+        if _large_images_users == 0:
+            _pil_pixel_limit = Image.MAX_IMAGE_PIXELS
+            if _pil_pixel_limit and _pil_pixel_limit < MAX_IMAGE_PIXELS:
+                Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+        _large_images_users += 1
+    try:
+        yield
+    finally:
+        with _large_images_lock:
+            _large_images_users -= 1
+            if _large_images_users == 0:
+                Image.MAX_IMAGE_PIXELS = _pil_pixel_limit
+
+
+def image_frame_count(file_path):
+    """Number of pages in an image file (frames of a multi-page TIFF); reads only headers"""
+    with _large_images_allowed(), Image.open(file_path) as img:
+        return getattr(img, 'n_frames', 1)
+
+
+def build_page_tasks(file_paths, is_pdf, page_ranges=None):
+    """Flatten a batch into (file_index, page_num, file_path) tasks in document order.
+
+    page_num is the zero-based PDF page or frame of a multi-page image, or
+    None for single-page image files. page_ranges applies to both.
+    """
+    tasks = []
+    for file_index, file_path in enumerate(file_paths):
+        if is_pdf:
+            pdf_doc = fitz.open(file_path)
+            page_count = pdf_doc.page_count
+            pdf_doc.close()
+        else:
+            page_count = image_frame_count(file_path)
+            if page_count == 1:
+                tasks.append((file_index, None, file_path))
+                continue
+
+        if page_ranges is None:
+            pages = range(page_count)
+        else:
+            pages = [p for p in page_ranges if p < page_count]
+        tasks.extend((file_index, page_num, file_path) for page_num in pages)
+    return tasks
+
+
+def _get_document(file_path):
+    """Reuse the open PDF while a worker keeps getting pages from the same file"""
+    global _open_document
+    open_path, pdf_doc = _open_document
+    if open_path != file_path:
+        if pdf_doc is not None:
+            pdf_doc.close()
+        pdf_doc = fitz.open(file_path)
+        _open_document = (file_path, pdf_doc)
+    return pdf_doc
+
+
+def _get_image(file_path):
+    """Keep a multi-page image open while a worker keeps getting frames from it"""
+    global _open_image
+    open_path, img = _open_image
+    if open_path != file_path:
+        if img is not None:
+            img.close()
+        img = Image.open(file_path)
+        _open_image = (file_path, img)
+    return img
+
+
+def load_image_frame(file_path, frame):
+    """Decode one frame of a multi-page image as a grayscale array.
+
+    Only that frame is decoded; moving on to the next frame of the file
+    the process already has open just reads on from the current one.
+    """
+    with _large_images_allowed():
+        img = ImageSequence.Iterator(_get_image(file_path))[frame]
+        return to_grayscale(img)
+
+
+class _PixmapArray:
+    """Exposes a pixmap's samples to NumPy without copying.
+
+    The array's base is this object, which keeps the pixmap (and so the
+    sample buffer) alive for as long as the array is in use.
+    """
+
+    def __init__(self, pix):
+        self.pix = pix
+        self.__array_interface__ = {
+            'shape': (pix.height, pix.width),
+            'typestr': '|u1',
+            'data': (pix.samples_ptr, False),
+            'strides': (pix.stride, 1),
+            'version': 3,
+        }
+
+
+def render_page_gray(page, zoom=RENDER_ZOOM, clip=None):
+    """Render a PDF page (or part of it) as an 8-bit grayscale NumPy array view"""
+    with ocr_trace.span("get_pixmap", zoom=zoom):
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False, clip=clip)
+    return np.asarray(_PixmapArray(pix))
+
+
+def to_grayscale(image):
+    """Return a PIL image or NumPy array as a 2-D uint8 array, copying only if needed"""
+    if isinstance(image, np.ndarray):
+        if image.ndim == 2:
+            return image
+        return cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    return np.asarray(image.convert('L'))
+
+
+def dump_debug_image(image, name):
+    """Save a page image to DEBUG_IMAGE_DIR when debugging is enabled"""
+    if not DEBUG_IMAGE_DIR:
+        return
+    os.makedirs(DEBUG_IMAGE_DIR, exist_ok=True)
+    if isinstance(image, np.ndarray):
+        image = Image.fromarray(image)
+    # The process id keeps concurrent jobs from overwriting each other
+    image.save(os.path.join(DEBUG_IMAGE_DIR, f"{name}_{os.getpid()}.png"))
+
+
+def detect_orientation(gray, cache=None):
+    """Run OSD on a downscaled copy of a page, once per distinct page.
+
+    Returns {"rotate", "confidence", "script", "script_conf"}; rotate is the
+    clockwise turn in degrees that makes the page upright, or 0 when the
+    detector isn't confident or the page has too little text to tell.
+    Results are remembered per page hash in this process and, when an
+    OCRCache is given, across runs; failures other than too little text
+    are not kept across runs.
+    """
+    scale = min(1.0, OSD_MAX_SIDE / max(gray.shape))
+    small = gray if scale == 1.0 else cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+    key = ocr_cache.make_key(small, method="osd")
+    result = _osd_memo.get(key)
+    if result is None and cache is not None:
+        cached = cache.get(key, count=False)
+        if cached is not None:
+            result = json.loads(cached)
+    if result is None:
+        try:
+            osd = image_to_osd(small)
+            confident = osd['orientation_conf'] >= MIN_OSD_CONFIDENCE
+            result = {
+                "rotate": int(osd['rotate']) if confident else 0,
+                "confidence": float(osd['orientation_conf']),
+                "script": osd['script'],
+                "script_conf": float(osd['script_conf']),
+            }
+            persistent = True
+        except Exception as e:
+            # Pages with too little text are OCR'd as they are; other errors
+            # (osd.traineddata missing, say) may be fixed by the next run
+            result = {"rotate": 0, "confidence": 0.0, "script": None, "script_conf": 0.0}
+            persistent = OSD_TOO_FEW_CHARACTERS in str(e)
+        if cache is not None and persistent:
+            cache.put(key, json.dumps(result))
+
+    if len(_osd_memo) >= OSD_MEMO_SIZE:
+        _osd_memo.clear()
+    _osd_memo[key] = result
+    return result
+
+
+def rotate_upright(gray, rotate):
+    """Turn a page clockwise by rotate degrees (a multiple of 90), as a view"""
+    return np.rot90(gray, -(rotate // 90) % 4)
+
+
+def page_orienter(cache=None, detected=None):
+    """A prepare step for ocr_page_adaptive that turns a page upright.
+
+    Orientation is detected on the first rendering and reused for the
+    higher-zoom retry of the same page. detected, if given, is a dict that
+    receives the detect_orientation result, script included.
+    """
+    detected = {} if detected is None else detected
+
+    def prepare(gray):
+        if "rotate" not in detected:
+            detected.update(detect_orientation(gray, cache))
+        return rotate_upright(gray, detected["rotate"])
+    return prepare
+
+
+def route_language(lang, script, script_conf=0.0):
+    """The one language of a combined pack written in the given OSD script.
+
+    Returns lang unchanged when OSD wasn't confident, or when no language or
+    more than one language of the pack uses that script (eng+fra on a Latin
+    page, say).
+    """
+    if not script or script_conf < MIN_SCRIPT_CONFIDENCE:
+        return lang
+    if script in ('Hiragana', 'Katakana'):
+        script = 'Japanese'
+    matches = [code for code in lang.split('+') if LANGUAGE_SCRIPTS.get(code) == script]
+    return matches[0] if len(matches) == 1 else lang
+
+
+def page_language(gray, lang, cache=None):
+    """route_language for a page image, with the script from detect_orientation"""
+    if '+' not in lang:
+        return lang
+    osd = detect_orientation(gray, cache)
+    return route_language(lang, osd["script"], osd["script_conf"])
+
+
+def recognize_routed(ocr_with, lang, page_lang, words=None):
+    """OCR a region with the page's single language, falling back to the pack.
+
+    ocr_with(lang_code) must return (text, confidence). If page_lang is a
+    single language picked from lang and reads the region with low
+    confidence, the region is OCR'd again with lang and the more confident
+    result is returned. When a words list is given, ocr_with is called with
+    a words keyword too, and the word boxes of the returned result are
+    added to the list.
+    """
+    def run(lang_code):
+        if words is None:
+            return ocr_with(lang_code), None
+        run_words = []
+        return ocr_with(lang_code, words=run_words), run_words
+
+    (text, confidence), run_words = run(page_lang)
+    if page_lang != lang and confidence < MIN_ROUTED_CONFIDENCE:
+        with ocr_trace.span("mixed script fallback", lang=lang):
+            (combined_text, combined_confidence), combined_words = run(lang)
+        if combined_confidence > confidence:
+            text, confidence, run_words = combined_text, combined_confidence, combined_words
+    if words is not None:
+        words.extend(run_words)
+    return text, confidence
+
+
+def load_page_image(file_path, page_num, zoom=RENDER_ZOOM):
+    """Load an image file as a PIL image, or render a PDF page as a grayscale array"""
+    if page_num is None:
+        img = Image.open(file_path)
+        # Auto-rotate based on EXIF data if available
+        try:
+            img = ImageOps.exif_transpose(img)
+        except Exception:
+            pass
+        return img
+
+    page = _get_document(file_path)[page_num]
+    return render_page_gray(page, zoom)
+
+
+# EXIF orientations that mirror the image, as NumPy views; the plain
+# rotations (3, 6 and 8) go through rotate_upright
+_EXIF_FLIPS = {
+    2: lambda gray: gray[:, ::-1],
+    4: lambda gray: gray[::-1],
+    5: lambda gray: gray.T,
+    7: lambda gray: gray[::-1, ::-1].T,
+}
+_EXIF_ROTATIONS = {3: 180, 6: 90, 8: 270}
+
+
+def is_large_image(file_path):
+    """True if an image file should be OCR'd in tiles; reads only its header"""
+    with _large_images_allowed(), Image.open(file_path) as img:
+        return img.width * img.height >= TILE_MIN_PIXELS
+
+
+def load_large_image_gray(file_path):
+    """Decode an image file straight to an 8-bit grayscale array.
+
+    JPEGs are decoded to grayscale by the codec itself, and other formats
+    are converted without keeping a full-colour copy. EXIF orientation is
+    applied as a view rather than a new image.
+    """
+    with _large_images_allowed(), Image.open(file_path) as img:
+        orientation = img.getexif().get(0x0112, 1)
+        img.draft('L', img.size)  # Only JPEG supports this; a no-op otherwise
+        gray = np.asarray(img.convert('L'))
+    if orientation in _EXIF_ROTATIONS:
+        return rotate_upright(gray, _EXIF_ROTATIONS[orientation])
+    if orientation in _EXIF_FLIPS:
+        return _EXIF_FLIPS[orientation](gray)
+    return gray
+
+
+def estimate_glyph_height(gray):
+    """Median height in pixels of the character-sized blobs on a page, or None"""
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    _, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    widths = stats[1:, cv2.CC_STAT_WIDTH]
+    # Ignore specks as well as rules, pictures and other large shapes
+    page_height, page_width = gray.shape
+    glyphs = (heights >= 2) & (heights < page_height / 20) & (widths < page_width / 20)
+    if not glyphs.any():
+        return None
+    return float(np.median(heights[glyphs]))
+
+
+def is_blank_page(image):
+    """True if a page image has no text worth sending to OCR.
+
+    Pages with plenty of ink are recognized on a downsample in about a
+    millisecond; nearly empty ones take a few more, because their marks are
+    counted at close to full resolution so a single line of small print
+    isn't averaged away. Light show-through from the other side of the
+    sheet is not counted as ink.
+    """
+    gray = to_grayscale(image)
+    scale = min(1.0, BLANK_SAMPLE_SIDE / max(gray.shape))
+    sample = gray if scale == 1.0 else cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    ink_level = np.median(sample) - BLANK_INK_OFFSET
+    if np.count_nonzero(sample < ink_level) > BLANK_MAX_INK * sample.size:
+        return False
+
+    step = int(np.ceil(max(gray.shape) / BLANK_MARK_SIDE))
+    if step > 1:
+        # Keep the darkest pixel of each step x step block, so thin strokes survive
+        gray = cv2.erode(gray, np.ones((step, step), np.uint8))[::step, ::step]
+    ink = gray < ink_level
+    ink_pixels = np.count_nonzero(ink)
+    if ink_pixels > BLANK_MAX_INK * ink.size:
+        return False
+    if ink_pixels <= BLANK_MAX_MARKS * BLANK_MIN_MARK_AREA:
+        return True
+    # Components are only looked for around the ink
+    rows, columns = np.flatnonzero(ink.any(axis=1)), np.flatnonzero(ink.any(axis=0))
+    ink = ink[rows[0]:rows[-1] + 1, columns[0]:columns[-1] + 1]
+    count, _, stats, _ = cv2.connectedComponentsWithStats(ink.view(np.uint8), connectivity=8)
+    marks = np.count_nonzero(stats[1:, cv2.CC_STAT_AREA] >= BLANK_MIN_MARK_AREA)
+    return marks <= BLANK_MAX_MARKS
+
+
+def choose_render_zoom(page, probe=None):
+    """Pick the smallest zoom that renders the page's text at a readable size.
+
+    probe is the page already rendered at PROBE_ZOOM, if the caller has it.
+    """
+    if probe is None:
+        probe = render_page_gray(page, PROBE_ZOOM)
+    glyph_height = estimate_glyph_height(probe)
+    if glyph_height is None:
+        return RENDER_ZOOM
+    zoom = TARGET_GLYPH_HEIGHT * PROBE_ZOOM / glyph_height
+    # Round up to a half step so similar pages share a zoom (and cache entries)
+    zoom = np.ceil(zoom * 2) / 2
+    return float(min(max(zoom, MIN_RENDER_ZOOM), MAX_RENDER_ZOOM))
+
+
+def ocr_page_adaptive(page, ocr_scored, confidence_threshold=DEFAULT_CONFIDENCE_THRESHOLD, prepare=None,
+                      skip_blank=False, words=None):
+    """OCR a PDF page rendered at the smallest zoom that keeps its text legible.
+
+    ocr_scored(gray, zoom) must return (text, confidence). If the confidence
+    is below confidence_threshold the page is rendered again at twice the
+    zoom (up to MAX_RENDER_ZOOM) and the more confident text is returned.
+    prepare, if given, is applied to each rendered page before OCR. With
+    skip_blank, blank pages are not OCR'd at all and None is returned.
+
+    When a words list is given, ocr_scored is called with a words keyword
+    too, and the word boxes of the returned text are added to the list in
+    points (the page's size at zoom 1) of the prepared page.
+    """
+    def run(zoom):
+        gray = render_page_gray(page, zoom)
+        if prepare is not None:
+            gray = prepare(gray)
+        if words is None:
+            return ocr_scored(gray, zoom), None
+        run_words = []
+        text, confidence = ocr_scored(gray, zoom, words=run_words)
+        return (text, confidence), [(left / zoom, top / zoom, right / zoom, bottom / zoom, word)
+                                    for left, top, right, bottom, word in run_words]
+
+    probe = render_page_gray(page, PROBE_ZOOM)
+    if skip_blank and is_blank_page(probe):
+        return None
+    zoom = choose_render_zoom(page, probe)
+    (text, confidence), run_words = run(zoom)
+    if confidence < confidence_threshold and zoom < MAX_RENDER_ZOOM:
+        (retry_text, retry_confidence), retry_words = run(min(zoom * 2, MAX_RENDER_ZOOM))
+        if retry_confidence > confidence:
+            text, confidence, run_words = retry_text, retry_confidence, retry_words
+    if words is not None:
+        words.extend(run_words)
+    return text, confidence
+
+
+def page_text_from_layer(page, ocr_region):
+    """Return a PDF page's text from its own text layer, or None if it needs full OCR.
+
+    Born-digital pages are read directly. Images that cover a noticeable
+    part of the page and carry no text of their own are rendered and passed
+    to ocr_region(image). The text keeps the order of the text layer's
+    blocks, which follows its columns; each OCR'd region goes before the
+    first block below it in the same column.
+    """
+    text = page.get_text("text").strip()
+    if len(text) < MIN_TEXT_LAYER_CHARS:
+        return None
+    garbage = sum(1 for char in text if char == '\ufffd' or not (char.isprintable() or char.isspace()))
+    if garbage / len(text) > MAX_TEXT_LAYER_GARBAGE:
+        return None
+
+    # Text blocks keep the text layer's own order, which follows its columns
+    blocks = [
+        (fitz.Rect(block[:4]), block[4].strip())
+        for block in page.get_text("blocks")
+        if block[6] == 0 and block[4].strip()
+    ]
+    # (index of the block it goes before, y0, text) for OCR'd image-only regions
+    regions = []
+    page_area = page.rect.get_area()
+    for info in page.get_image_info():
+        rect = fitz.Rect(info["bbox"]) & page.rect
+        if rect.is_empty or rect.get_area() < MIN_IMAGE_REGION_SHARE * page_area:
+            continue
+        if len(page.get_text("words", clip=rect)) >= MIN_REGION_WORDS:
+            continue
+        region_text = ocr_region(render_page_gray(page, clip=rect)).strip()
+        if region_text:
+            # Before the first block that starts below it in the same column
+            before = next((
+                index for index, (block_rect, _) in enumerate(blocks)
+                if block_rect.y0 >= rect.y0 and block_rect.x0 < rect.x1 and rect.x0 < block_rect.x1
+            ), len(blocks))
+            regions.append((before, rect.y0, region_text))
+
+    regions.sort(key=lambda region: region[:2])
+    pieces = []
+    for index, (_, block_text) in enumerate(blocks):
+        pieces.extend(text for before, _, text in regions if before == index)
+        pieces.append(block_text)
+    pieces.extend(text for before, _, text in regions if before == len(blocks))
+    return "\n\n".join(pieces)
+
+
+def _split_on_gaps(boxes, axis):
+    """Group (x, y, w, h) boxes that overlap along axis (0 = x, 1 = y)"""
+    ordered = sorted(boxes, key=lambda box: box[axis])
+    groups = [[ordered[0]]]
+    end = ordered[0][axis] + ordered[0][axis + 2]
+    for box in ordered[1:]:
+        if box[axis] >= end:
+            groups.append([])
+        groups[-1].append(box)
+        end = max(end, box[axis] + box[axis + 2])
+    return groups
+
+
+def reading_order(boxes):
+    """Sort blocks for reading with a recursive XY cut: split into bands at
+    horizontal gaps, then into columns at vertical gaps, and so on.
+    """
+    if len(boxes) <= 1:
+        return list(boxes)
+    for axis in (1, 0):
+        groups = _split_on_gaps(boxes, axis)
+        if len(groups) > 1:
+            return [box for group in groups for box in reading_order(group)]
+    return sorted(boxes, key=lambda box: (box[1], box[0]))
+
+
+def estimate_line_pitch(ink, glyph):
+    """Median distance in pixels between the centres of text lines and the
+    lines right below them, or None. ink is a binary page with white glyphs.
+    """
+    lines = cv2.dilate(ink, cv2.getStructuringElement(cv2.MORPH_RECT, (int(glyph * 1.2) + 1, 1)))
+    _, _, stats, _ = cv2.connectedComponentsWithStats(lines, connectivity=8)
+    stats = stats[1:]
+    heights = stats[:, cv2.CC_STAT_HEIGHT]
+    stats = stats[(heights >= glyph * 0.5) & (heights <= glyph * 2.5) & (stats[:, cv2.CC_STAT_WIDTH] >= glyph * 2)]
+    if len(stats) < 2:
+        return None
+    left = stats[:, cv2.CC_STAT_LEFT]
+    right = left + stats[:, cv2.CC_STAT_WIDTH]
+    center = stats[:, cv2.CC_STAT_TOP] + stats[:, cv2.CC_STAT_HEIGHT] / 2
+    # below[i, j] is how far line j sits below line i, where the two share columns
+    below = center[None, :] - center[:, None]
+    beside = (left[None, :] < right[:, None]) & (left[:, None] < right[None, :])
+    below = np.where(beside & (below > glyph * 0.5), below, np.inf).min(axis=1)
+    below = below[np.isfinite(below)]
+    return float(np.median(below)) if len(below) else None
+
+
+def _clip_to_neighbours(boxes, padded):
+    """Shrink each padded (x0, y0, x1, y1) box so it stops short of the unpadded
+    boxes of the other blocks beside it"""
+    clipped = []
+    for number, (x0, y0, x1, y1) in enumerate(padded):
+        box = boxes[number]
+        for other_number, other in enumerate(boxes):
+            if other_number == number or not (other[0] < x1 and x0 < other[2] and other[1] < y1 and y0 < other[3]):
+                continue
+            if other[1] >= box[3]:
+                y1 = min(y1, other[1])
+            elif other[3] <= box[1]:
+                y0 = max(y0, other[3])
+            elif other[0] >= box[2]:
+                x1 = min(x1, other[0])
+            elif other[2] <= box[0]:
+                x0 = max(x0, other[2])
+        clipped.append((x0, y0, x1, y1))
+    return clipped
+
+
+def find_text_blocks(gray):
+    """Locate the text blocks on a page with morphology and connected components.
+
+    Returns (x, y, w, h) boxes in page pixels, in reading order. Rules are
+    removed before glyphs are smeared into blocks, and blocks that are
+    mostly large solid shapes or have the ink density of a photo are
+    dropped. Lines are joined across gaps sized from the measured line
+    pitch, so a block is a paragraph or a column rather than a line. Each
+    box has a little margin, cut short where it would reach another block.
+    """
+    scale = min(1.0, LAYOUT_MAX_SIDE / max(gray.shape))
+    small = gray if scale == 1.0 else cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    _, binary = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    glyph = estimate_glyph_height(small) or 8.0
+
+    # Take out long horizontal and vertical rules so they don't join columns
+    rule_length = max(25, int(glyph * 8))
+    rules = cv2.morphologyEx(binary, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (rule_length, 1)))
+    rules |= cv2.morphologyEx(binary, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (1, rule_length)))
+    text_ink = cv2.subtract(binary, rules)
+
+    # Anything much taller than a glyph is a picture, a drop cap or a shape.
+    # They are left out of the smearing so they don't join blocks together.
+    _, ink_labels, ink_stats, _ = cv2.connectedComponentsWithStats(text_ink, connectivity=8)
+    large_labels = np.flatnonzero(ink_stats[:, cv2.CC_STAT_HEIGHT] > glyph * 4)
+    large_labels = large_labels[large_labels > 0]
+    large = ink_stats[large_labels]
+    glyph_ink = text_ink
+    if len(large_labels):
+        glyph_ink = text_ink.copy()
+        glyph_ink[np.isin(ink_labels, large_labels)] = 0
+
+    # Smear words into lines and lines into blocks; the gap between columns stays open
+    pitch = estimate_line_pitch(glyph_ink, glyph) or glyph * 2
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (int(glyph * 1.2) + 1, int(pitch * LAYOUT_PITCH_SMEAR) + 1))
+    smeared = cv2.dilate(glyph_ink, kernel)
+    _, block_labels, block_stats, _ = cv2.connectedComponentsWithStats(smeared, connectivity=8)
+
+    boxes = []
+    for label, (x, y, w, h, _) in enumerate(block_stats[1:], 1):
+        # The block's own glyphs, without the margin the smearing added
+        glyphs = ((block_labels[y:y + h, x:x + w] == label) & (glyph_ink[y:y + h, x:x + w] > 0)).view(np.uint8)
+        gx, gy, w, h = cv2.boundingRect(glyphs)
+        x, y = x + gx, y + gy
+        if h < glyph * 0.6 or w < glyph:
+            continue
+        ink = np.count_nonzero(text_ink[y:y + h, x:x + w]) / (w * h)
+        if not LAYOUT_MIN_INK <= ink <= LAYOUT_MAX_INK:
+            continue
+        shape_overlap = (
+            np.clip(np.minimum(large[:, cv2.CC_STAT_LEFT] + large[:, cv2.CC_STAT_WIDTH], x + w)
+                    - np.maximum(large[:, cv2.CC_STAT_LEFT], x), 0, None)
+            * np.clip(np.minimum(large[:, cv2.CC_STAT_TOP] + large[:, cv2.CC_STAT_HEIGHT], y + h)
+                      - np.maximum(large[:, cv2.CC_STAT_TOP], y), 0, None)
+        ).sum()
+        if shape_overlap > LAYOUT_MAX_SHAPE_SHARE * w * h:
+            continue
+        boxes.append((x, y, x + w, y + h))
+
+    # Back to page pixels, with a little margin around the glyphs
+    height, width = gray.shape
+    pad = glyph / 2
+    page_boxes = [(int(x0 / scale), int(y0 / scale), int(np.ceil(x1 / scale)), int(np.ceil(y1 / scale)))
+                  for x0, y0, x1, y1 in boxes]
+    padded = [(max(0, int((x0 - pad) / scale)), max(0, int((y0 - pad) / scale)),
+               min(width, int(np.ceil((x1 + pad) / scale))), min(height, int(np.ceil((y1 + pad) / scale))))
+              for x0, y0, x1, y1 in boxes]
+    return reading_order([(x0, y0, x1 - x0, y1 - y0) for x0, y0, x1, y1 in _clip_to_neighbours(page_boxes, padded)])
+
+
+def ocr_text_blocks(gray, ocr_block, workers=1, words=None):
+    """OCR only the text blocks of a page and stitch them in reading order.
+
+    ocr_block(crop) must return (text, confidence); with workers > 1 blocks
+    are recognized concurrently. Returns (text, confidence), where the
+    confidence is the mean over blocks weighted by text length, or None
+    when no blocks are found or they cover most of the page, in which case
+    the caller should OCR the whole page. When a words list is given,
+    ocr_block is called with a words keyword too, and the word boxes are
+    added to the list in page coordinates.
+    """
+    with ocr_trace.span("layout"):
+        boxes = find_text_blocks(gray)
+    covered = sum(w * h for _, _, w, h in boxes)
+    if not boxes or covered > LAYOUT_MAX_COVERAGE * gray.size:
+        return None
+
+    block_words = [None if words is None else [] for _ in boxes]
+
+    def run(number):
+        x, y, w, h = boxes[number]
+        crop = gray[y:y + h, x:x + w]
+        if words is None:
+            return ocr_block(crop)
+        return ocr_block(crop, words=block_words[number])
+
+    if workers > 1 and len(boxes) > 1:
+        with ThreadPoolExecutor(max_workers=min(workers, len(boxes))) as executor:
+            results = list(executor.map(run, range(len(boxes))))
+    else:
+        results = [run(number) for number in range(len(boxes))]
+
+    if words is not None:
+        for (x, y, _, _), found in zip(boxes, block_words):
+            words.extend((left + x, top + y, right + x, bottom + y, word)
+                         for left, top, right, bottom, word in found)
+
+    results = [(text.strip(), conf) for text, conf in results if text.strip()]
+    if not results:
+        return "", 0.0
+    total_chars = sum(len(text) for text, _ in results)
+    confidence = sum(conf * len(text) for text, conf in results) / total_chars
+    return "\n\n".join(text for text, _ in results), confidence
+
+
+def _adaptive_threshold(cv_img):
+    return cv2.adaptiveThreshold(
+        cv_img, 255,
+        cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+        cv2.THRESH_BINARY,
+        11, 2
+    )
+
+
+def _otsu_threshold(cv_img):
+    _, img = cv2.threshold(cv_img, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return img
+
+
+# Preprocessing methods in the order they are tried
+PREPROCESS_METHODS = [
+    ("adaptive", _adaptive_threshold),
+    ("otsu", _otsu_threshold),
+    ("original", lambda cv_img: cv_img),
+]
+
+
+def data_to_text(data):
+    """Rebuild plain text from image_to_data output.
+
+    Words are joined into lines, and paragraphs are separated by a blank
+    line, matching what image_to_string would return.
+    """
+    lines = []
+    current_line = None
+    current_par = None
+    words = []
+    for i, word in enumerate(data['text']):
+        if not word or not word.strip():
+            continue
+        par_key = (data['block_num'][i], data['par_num'][i])
+        line_key = par_key + (data['line_num'][i],)
+        if line_key != current_line:
+            if words:
+                lines.append(' '.join(words))
+                words = []
+            if current_par is not None and par_key != current_par:
+                lines.append('')
+            current_line = line_key
+            current_par = par_key
+        words.append(word)
+    if words:
+        lines.append(' '.join(words))
+    return '\n'.join(lines)
+
+
+def mean_confidence(data):
+    """Mean Tesseract confidence of the recognized words, 0 if there are none"""
+    confidences = [
+        float(conf) for conf, word in zip(data['conf'], data['text'])
+        if word and word.strip() and float(conf) >= 0
+    ]
+    if not confidences:
+        return 0.0
+    return sum(confidences) / len(confidences)
+
+
+def data_words(data):
+    """Recognized words of image_to_data output as (left, top, right, bottom, text) in pixels"""
+    return [
+        (data['left'][i], data['top'][i], data['left'][i] + data['width'][i],
+         data['top'][i] + data['height'][i], word)
+        for i, word in enumerate(data['text']) if word and word.strip()
+    ]
+
+
+def recognize(img, lang_code, words=None):
+    """OCR one preprocessed image, returning (text, mean word confidence).
+
+    The word boxes are added to words, if given (see data_words).
+    """
+    data = image_to_data(img, lang=lang_code)
+    if words is not None:
+        words.extend(data_words(data))
+    return data_to_text(data), mean_confidence(data)
+
+
+def recognize_data(img, lang_code, confidence_threshold=DEFAULT_CONFIDENCE_THRESHOLD):
+    """OCR one image with the preprocessing methods in turn, stopping at the
+    first confident one; returns (image_to_data output, mean confidence).
+
+    Unlike perform_ocr_scored the methods run one after another, so only one
+    preprocessed copy of the image exists at a time.
+    """
+    cv_img = cv2.normalize(to_grayscale(img), None, 0, 255, cv2.NORM_MINMAX)
+    best = None
+    for name, preprocess in PREPROCESS_METHODS:
+        with ocr_trace.span("cv2 preprocess", method=name):
+            prepared = preprocess(cv_img)
+        data = image_to_data(prepared, lang=lang_code)
+        confidence = mean_confidence(data)
+        if best is None or confidence > best[1]:
+            best = data, confidence
+        if confidence >= confidence_threshold:
+            break
+    return best
+
+
+def tile_boxes(width, height, side=TILE_SIDE, overlap=TILE_OVERLAP):
+    """(x, y, w, h) of overlapping tiles that cover an image, row by row"""
+    step = side - overlap
+    xs = range(0, max(width - overlap, 1), step)
+    ys = range(0, max(height - overlap, 1), step)
+    return [(x, y, min(side, width - x), min(side, height - y)) for y in ys for x in xs]
+
+
+def _tile_lines(data, box, image_width, image_height, overlap):
+    """Lines of one tile as (left, top, right, bottom, words) in image coordinates.
+
+    A word is kept only if its centre lies in the part of the tile closer to
+    this tile than to any neighbour, so words in an overlap come out once.
+    """
+    x, y, w, h = box
+    half = overlap // 2
+    core_left = x + half if x > 0 else 0
+    core_top = y + half if y > 0 else 0
+    core_right = x + w - half if x + w < image_width else image_width
+    core_bottom = y + h - half if y + h < image_height else image_height
+
+    lines = {}
+    for i, word in enumerate(data['text']):
+        if not word or not word.strip():
+            continue
+        left, top = x + data['left'][i], y + data['top'][i]
+        right, bottom = left + data['width'][i], top + data['height'][i]
+        centre_x, centre_y = (left + right) / 2, (top + bottom) / 2
+        if not (core_left <= centre_x < core_right and core_top <= centre_y < core_bottom):
+            continue
+        key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+        line = lines.setdefault(key, [left, top, right, bottom, []])
+        line[0], line[1] = min(line[0], left), min(line[1], top)
+        line[2], line[3] = max(line[2], right), max(line[3], bottom)
+        line[4].append((left, word))
+    return list(lines.values())
+
+
+def _merge_seam_lines(tiles):
+    """Join line pieces from different tiles that continue each other across a
+    vertical seam; lines from the same tile are left as Tesseract found them.
+    """
+    pieces = sorted(((line, number) for number, lines in enumerate(tiles) for line in lines),
+                    key=lambda piece: piece[0][0])
+    merged = []
+    for line, number in pieces:
+        height = line[3] - line[1]
+        for other, numbers in merged:
+            overlap = min(other[3], line[3]) - max(other[1], line[1])
+            gap = line[0] - other[2]
+            if (number not in numbers and overlap >= 0.5 * min(height, other[3] - other[1])
+                    and -height <= gap <= 2 * height):
+                other[0], other[1] = min(other[0], line[0]), min(other[1], line[1])
+                other[2], other[3] = max(other[2], line[2]), max(other[3], line[3])
+                other[4].extend(line[4])
+                numbers.add(number)
+                break
+        else:
+            merged.append((line, {number}))
+    return [line for line, _ in merged]
+
+
+def ocr_tiled(gray, ocr_tile, workers=1, side=TILE_SIDE, overlap=TILE_OVERLAP):
+    """OCR a very large image in overlapping tiles and stitch the text.
+
+    ocr_tile(tile) must return image_to_data output for a tile, or None to
+    skip it (a blank tile, say). Tiles are cut only when a worker starts on
+    them, so memory grows with the tile size and the number of workers, not
+    with the image. Words in the overlaps are kept once, lines cut by a seam
+    are joined again, and the lines are returned in reading order.
+    """
+    image_height, image_width = gray.shape
+    boxes = tile_boxes(image_width, image_height, side, overlap)
+
+    def run(box):
+        x, y, w, h = box
+        with ocr_trace.span("tile", x=x, y=y):
+            data = ocr_tile(np.ascontiguousarray(gray[y:y + h, x:x + w]))
+        if data is None:
+            return []
+        return _tile_lines(data, box, image_width, image_height, overlap)
+
+    if workers > 1 and len(boxes) > 1:
+        with ThreadPoolExecutor(max_workers=min(workers, len(boxes))) as executor:
+            tiles = list(executor.map(run, boxes))
+    else:
+        tiles = [run(box) for box in boxes]
+
+    lines = _merge_seam_lines(tiles)
+    # reading_order only looks at the first four values, as (x, y, w, h)
+    ordered = reading_order([(left, top, right - left, bottom - top, i)
+                             for i, (left, top, right, bottom, _) in enumerate(lines)])
+    return '\n'.join(' '.join(word for _, word in sorted(lines[box[4]][4])) for box in ordered)
+
+
+def perform_ocr(image, lang_code, report=None, confidence_threshold=DEFAULT_CONFIDENCE_THRESHOLD,
+                cache=None, cache_params=None):
+    """Run OCR on a single image and return the best text, or an empty string.
+
+    Blank pages are skipped without calling Tesseract. See
+    perform_ocr_scored for how the preprocessing methods are chosen.
+    """
+    if is_blank_page(image):
+        if report is not None:
+            report("Blank page skipped")
+        return ""
+    text, _ = perform_ocr_scored(image, lang_code, report, confidence_threshold, cache, cache_params)
+    return text
+
+
+class PreprocessLearner:
+    """Learns which preprocessing method wins on the pages of one document.
+
+    plan() gives the settings for perform_ocr_scored on the next page, and
+    record() takes the outcomes of a finished page. The first
+    STRATEGY_LEARN_PAGES pages try every method. Later pages run the method
+    that won most often on its own and fall back to trying all of them when
+    its confidence drops. Every STRATEGY_EXPLORE_EVERY-th page also tries
+    all of them, so a better method can still take over. Only pages where
+    the methods were compared count as wins.
+    """
+
+    def __init__(self):
+        self.pages_planned = 0
+        self.pages_recorded = 0
+        self.wins = {}
+        self.confidence_total = 0.0
+        self.outcome_count = 0
+
+    def plan(self):
+        self.pages_planned += 1
+        if self.pages_recorded < STRATEGY_LEARN_PAGES or self.pages_planned % STRATEGY_EXPLORE_EVERY == 0:
+            return {"explore": True}
+        names = [name for name, _ in PREPROCESS_METHODS]
+        best = max(names, key=lambda name: self.wins.get(name, 0))
+        return {
+            "order": [best] + [name for name in names if name != best],
+            "accept": self.confidence_total / self.outcome_count - STRATEGY_CONFIDENCE_DROP,
+        }
+
+    def record(self, outcomes):
+        """outcomes: (method name, confidence, compared) of every image OCR'd on
+        one page, as perform_ocr_scored reports them"""
+        if not outcomes:
+            # Blank, text-layer or cached pages say nothing about the methods
+            return
+        self.pages_recorded += 1
+        for name, confidence, compared in outcomes:
+            # A method that ran alone had nothing to beat
+            if compared:
+                self.wins[name] = self.wins.get(name, 0) + 1
+            self.confidence_total += confidence
+            self.outcome_count += 1
+
+
+def perform_ocr_scored(image, lang_code, report=None, confidence_threshold=DEFAULT_CONFIDENCE_THRESHOLD,
+                       cache=None, cache_params=None, plan=None, outcomes=None, words=None):
+    """Run OCR on a single image with several preprocessing methods.
+
+    The first method is tried on its own and kept if its mean word
+    confidence reaches confidence_threshold. Otherwise the remaining methods
+    run concurrently and the most confident result wins. Returns (text,
+    confidence); text is empty if nothing was recognized. Failures are
+    passed to the optional report callback instead of being raised, and
+    are not cached; neither are results kept only because of a plan's
+    lower "accept".
+
+    plan, from PreprocessLearner.plan(), changes this: "explore" runs every
+    method, "order" names the method to try first, and "accept" lowers the
+    confidence at which that method is kept. The winning method, its
+    confidence and whether other methods ran too are appended to the
+    outcomes list, if one is given, and its word boxes to the words list
+    (see data_words).
+
+    When an OCRCache is given, results are looked up by the page pixels,
+    the language, the method settings and any extra cache_params (such as
+    the render zoom) before Tesseract is called.
+    """
+    def notify(message):
+        if report is not None:
+            report(message)
+
+    # Each method's word boxes, kept apart until the winner is known
+    method_words = [None if words is None else [] for _ in PREPROCESS_METHODS]
+    # Methods that raised rather than recognizing the image
+    failed = []
+
+    def run_method(number):
+        name, preprocess = PREPROCESS_METHODS[number]
+        try:
+            with ocr_trace.span("cv2 preprocess", method=name):
+                prepared = preprocess(cv_img)
+            return recognize(prepared, lang_code, method_words[number])
+        except Exception as e:
+            failed.append(number)
+            notify(f"Method {number + 1} ({name}) failed: {str(e)}")
+            return "", 0.0
+
+    try:
+        # Convert to grayscale and preprocess
+        cv_img = to_grayscale(image)
+
+        cache_key = None
+        if cache is not None:
+            cache_key = ocr_cache.make_key(
+                cv_img, lang=lang_code, confidence_threshold=confidence_threshold,
+                methods=[name for name, _ in PREPROCESS_METHODS], **(cache_params or {})
+            )
+            cached = cache.lookup(cache_key)
+            cached_words = None
+            if cached is not None and words is not None:
+                # Word boxes are stored next to the text; entries without them are OCR'd again
+                cached_words = cache.get(cache_key + ":words", count=False)
+            if cached is not None and (words is None or cached_words is not None):
+                text, confidence = cached
+                if words is not None:
+                    words.extend(json.loads(cached_words))
+                # Entries from before confidences were stored count as accepted
+                return text, confidence_threshold if confidence is None else confidence
+
+        cv_img = cv2.normalize(cv_img, None, 0, 255, cv2.NORM_MINMAX)
+
+        plan = plan or {}
+        names = [name for name, _ in PREPROCESS_METHODS]
+        order = [names.index(name) for name in plan.get("order", names)]
+        accept = confidence_threshold
+        if plan.get("accept") is not None:
+            accept = min(accept, plan["accept"])
+
+        if plan.get("explore"):
+            numbers, results = [], []
+        else:
+            numbers, results = [order[0]], [run_method(order[0])]
+        if not results or results[0][1] < accept:
+            # Tesseract runs out of process, so threads give real parallelism
+            remaining = [number for number in order if number not in numbers]
+            with ThreadPoolExecutor(max_workers=len(remaining)) as executor:
+                results.extend(executor.map(run_method, remaining))
+            numbers.extend(remaining)
+
+        # Choose the most confident result, preferring longer text on ties
+        results = [(number, text, conf) for number, (text, conf) in zip(numbers, results) if text.strip()]
+        text, confidence = "", 0.0
+        if results:
+            number, text, confidence = max(results, key=lambda result: (result[2], len(result[1])))
+            text = text.strip()
+            if outcomes is not None:
+                outcomes.append((names[number], confidence, len(numbers) > 1))
+            if words is not None:
+                words.extend(method_words[number])
+        else:
+            notify("No text could be extracted from the image")
+
+        # A failed method (Tesseract missing, no traineddata, a timeout) may
+        # work next time, so only results of methods that all ran are kept.
+        # Neither is a result accepted on its own below confidence_threshold,
+        # thanks to a plan's lower "accept", since the key doesn't include it
+        accepted_below = len(numbers) == 1 and confidence < confidence_threshold
+        if cache_key is not None and not failed and not accepted_below:
+            cache.put(cache_key, text, confidence)
+            if words is not None:
+                cache.put(cache_key + ":words", json.dumps(method_words[number] if results else []))
+        return text, confidence
+
+    except Exception as e:
+        notify(f"OCR error: {str(e)}")
+        return "", 0.0
+
+
+def cached_image_to_string(image, lang, cache=None):
+    """image_to_string, answered from the result cache when possible"""
+    if cache is None:
+        return image_to_string(image, lang=lang)
+    key = ocr_cache.make_key(np.asarray(image), lang=lang, method="image_to_string")
+    text = cache.get(key)
+    if text is None:
+        text = image_to_string(image, lang=lang)
+        cache.put(key, text)
+    return text
+
+
+def cached_recognize(image, lang, cache=None, words=None):
+    """recognize() without preprocessing, answered from the result cache when possible"""
+    if cache is None:
+        return recognize(image, lang, words)
+    key = ocr_cache.make_key(np.asarray(image), lang=lang, method="image_to_data")
+    cached = cache.lookup(key)
+    cached_words = None
+    if cached is not None and words is not None:
+        # Word boxes are stored next to the text; entries without them are OCR'd again
+        cached_words = cache.get(key + ":words", count=False)
+    if cached is not None and cached[1] is not None and (words is None or cached_words is not None):
+        if words is not None:
+            words.extend(json.loads(cached_words))
+        return cached
+    found = [] if words is not None else None
+    text, confidence = recognize(image, lang, found)
+    cache.put(key, text, confidence)
+    if words is not None:
+        cache.put(key + ":words", json.dumps(found))
+        words.extend(found)
+    return text, confidence
+
+
+def ocr_page(task, options, plan=None):
+    """Render and OCR one (file_index, page_num, file_path) task.
+
+    Returns the page text, or None for a blank page that was skipped.
+
+    options is a plain dict of job settings so it can be sent to workers:
+    "lang" and optionally "confidence_threshold", "use_cache",
+    "cache_max_bytes", "use_text_layer", "use_layout", "layout_workers",
+    "route_script", "adaptive_preprocessing", "searchable_pdf" and "trace"
+    (from ocr_trace.start_job). plan is passed on to perform_ocr_scored.
+    """
+    return ocr_page_outcomes(task, options, plan)[0]
+
+
+def ocr_page_outcomes(task, options, plan=None):
+    """ocr_page, also returning the page's preprocessing outcomes for
+    PreprocessLearner.record and, with options["searchable_pdf"], the word
+    boxes of an OCR'd PDF page as {"rotate", "words"} (see
+    ocr_pdf.SearchablePDF.add_page_words), or None.
+    """
+    _, page_num, file_path = task
+    if options.get("trace"):
+        ocr_trace.configure(options["trace"])
+    ocr_trace.set_context(file=os.path.basename(file_path), page=None if page_num is None else page_num + 1)
+    outcomes = []
+    page_words = {} if options.get("searchable_pdf") else None
+    try:
+        text = _ocr_page(page_num, file_path, options, plan, outcomes, page_words)
+        return text, outcomes, page_words or None
+    finally:
+        # Workers can be stopped between pages, so their spans and cache
+        # lookups are written per page
+        ocr_trace.flush()
+        if options.get("use_cache"):
+            ocr_cache.get_default_cache(options.get("cache_max_bytes", ocr_cache.DEFAULT_MAX_BYTES)).flush()
+
+
+def _ocr_page(page_num, file_path, options, plan=None, outcomes=None, page_words=None):
+    cache = None
+    if options.get("use_cache"):
+        cache = ocr_cache.get_default_cache(options.get("cache_max_bytes", ocr_cache.DEFAULT_MAX_BYTES))
+
+    confidence_threshold = options.get("confidence_threshold", DEFAULT_CONFIDENCE_THRESHOLD)
+    lang = options["lang"]
+    # Filled in with the page's orientation and script once OSD has run
+    osd = {}
+
+    def ocr_whole(image, zoom=None, words=None):
+        def ocr_with(lang_code, words=None):
+            return perform_ocr_scored(
+                image,
+                lang_code,
+                confidence_threshold=confidence_threshold,
+                cache=cache,
+                cache_params={"zoom": zoom},
+                plan=plan,
+                outcomes=outcomes,
+                words=words
+            )
+
+        if not options.get("route_script", True):
+            return ocr_with(lang, words=words)
+        page_lang = route_language(lang, osd.get("script"), osd.get("script_conf", 0.0))
+        return recognize_routed(ocr_with, lang, page_lang, words)
+
+    def ocr_tile(tile):
+        if is_blank_page(tile):
+            return None
+
+        def ocr_with(lang_code):
+            return recognize_data(tile, lang_code, confidence_threshold)
+
+        if not options.get("route_script", True):
+            return ocr_with(lang)[0]
+        page_lang = route_language(lang, osd.get("script"), osd.get("script_conf", 0.0))
+        return recognize_routed(ocr_with, lang, page_lang)[0]
+
+    def ocr_scored(image, zoom=None, words=None):
+        # Only the text blocks are recognized when layout analysis finds them
+        if options.get("use_layout", True):
+            result = ocr_text_blocks(
+                to_grayscale(image), lambda crop, words=None: ocr_whole(crop, zoom, words),
+                options.get("layout_workers", 1), words)
+            if result is not None:
+                return result
+        return ocr_whole(image, zoom, words)
+
+    if page_num is None or not file_path.lower().endswith('.pdf'):
+        # An image file, or one frame of a multi-page TIFF
+        if page_num is not None:
+            gray = load_image_frame(file_path, page_num)
+        elif is_large_image(file_path):
+            gray = load_large_image_gray(file_path)
+        else:
+            gray = to_grayscale(load_page_image(file_path, None))
+        if is_blank_page(gray):
+            return None
+        gray = page_orienter(cache, osd)(gray)
+        if gray.size >= TILE_MIN_PIXELS:
+            return ocr_tiled(gray, ocr_tile, options.get("layout_workers", 1))
+        text, _ = ocr_scored(gray)
+        return text
+
+    page = _get_document(file_path)[page_num]
+    if options.get("use_text_layer", True):
+        # Image regions of a text-layer page have no OSD result and use the whole pack
+        text = page_text_from_layer(page, lambda image: ocr_scored(image, RENDER_ZOOM)[0])
+        if text is not None:
+            return text
+
+    words = None if page_words is None else []
+    result = ocr_page_adaptive(page, ocr_scored, confidence_threshold, prepare=page_orienter(cache, osd),
+                               skip_blank=True, words=words)
+    if result is None:
+        return None
+    if page_words is not None:
+        page_words.update(rotate=osd.get("rotate", 0), words=words)
+    return result[0]
+
+
+def _init_worker(tesseract_cmd):
+    # Spawned workers don't run the GUI script's module setup
+    pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+
+
+def iter_ocr_results(tasks, options, workers, is_cancelled, on_page_words=None):
+    """OCR page tasks and yield (task_index, text) as pages finish.
+
+    text is None for blank pages that were skipped.
+
+    With more than one worker every task goes into a single shared process
+    pool, so pages from all files in the batch are spread across cores.
+    Results arrive in completion order; callers put them back in task order.
+    A single task runs in this process, with up to workers threads for its
+    text blocks or tiles.
+    Tasks are handed to the pool only while they are fewer than
+    PAGES_AHEAD_PER_WORKER per worker ahead of the oldest unfinished one, so
+    a long book never has more pages rendered, or results waiting for their
+    turn, than that. Once is_cancelled() is true, pages not yet started are
+    dropped, and the generator returns when the running ones have finished.
+
+    Unless options["adaptive_preprocessing"] is False, a PreprocessLearner
+    per file decides which preprocessing methods each page tries. With
+    options["searchable_pdf"], on_page_words(task_index, page_words) is
+    called with the word boxes of every OCR'd PDF page before its text is
+    yielded (see ocr_page_outcomes).
+    """
+    learners = {}
+    adaptive = options.get("adaptive_preprocessing", True)
+
+    def plan_for(task):
+        if not adaptive:
+            return None
+        return learners.setdefault(task[0], PreprocessLearner()).plan()
+
+    def finish(index, result):
+        text, outcomes, page_words = result
+        if adaptive:
+            learners[tasks[index][0]].record(outcomes)
+        if page_words is not None and on_page_words is not None:
+            on_page_words(index, page_words)
+        return text
+
+    if workers <= 1 or len(tasks) <= 1:
+        if len(tasks) == 1:
+            # No pool is started for a lone page, so its text blocks or tiles
+            # get the workers instead
+            options = dict(options, layout_workers=max(options.get("layout_workers", 1), workers))
+        for index, task in enumerate(tasks):
+            if is_cancelled():
+                return
+            yield index, finish(index, ocr_page_outcomes(task, options, plan_for(task)))
+        return
+
+    workers = min(workers, len(tasks))
+    pages_ahead = PAGES_AHEAD_PER_WORKER * workers
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(pytesseract.pytesseract.tesseract_cmd,)
+    )
+    try:
+        pending = {}
+        next_index = 0
+        while next_index < len(tasks) or pending:
+            # Top up the pool; past the window, submitting waits for the oldest page
+            oldest = min(pending.values(), default=next_index)
+            while next_index < len(tasks) and next_index < oldest + pages_ahead:
+                task = tasks[next_index]
+                pending[executor.submit(ocr_page_outcomes, task, options, plan_for(task))] = next_index
+                next_index += 1
+
+            if is_cancelled():
+                return
+            # Wake up periodically so cancellation is noticed between pages
+            done, _ = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                yield index, finish(index, future.result())
+    finally:
+        # Let the pages already running finish, so their trace spans are
+        # flushed before the caller merges the job's trace
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,79 @@
+"""On-disk journals that let interrupted OCR jobs resume where they stopped.
+
+A journal is an append-only JSON-lines file named after a hash of the
+input files' contents and the job settings. Each finished page is written
+and flushed as soon as it is done, so after a crash, cancel or sleep the
+same job picks up the recorded pages instead of recognizing them again.
+"""
+import hashlib
+import json
+import os
+
+DEFAULT_JOURNAL_DIR = os.path.join(os.path.expanduser("~"), ".ocr_tool", "journals")
+
+
+def file_digest(file_path, chunk_size=1024 * 1024):
+    """SHA-256 of a file's contents, read in chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class OCRJournal:
+    """Record of the pages an OCR job has finished, keyed by page"""
+
+    def __init__(self, file_paths, settings, journal_dir=DEFAULT_JOURNAL_DIR):
+        self.digests = [file_digest(path) for path in file_paths]
+        job_key = json.dumps({"files": self.digests, "settings": settings}, sort_keys=True)
+        job_id = hashlib.sha256(job_key.encode()).hexdigest()[:32]
+
+        os.makedirs(journal_dir, exist_ok=True)
+        self.path = os.path.join(journal_dir, f"{job_id}.jsonl")
+        self.completed = self._load()
+        self._file = None
+
+    def _load(self):
+        completed = {}
+        # Whether the file ends part way through a line
+        self._torn = False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    self._torn = not line.endswith("\n")
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A line cut short by a crash; the page is simply redone
+                        continue
+                    completed[entry["page"]] = entry["text"]
+        except FileNotFoundError:
+            pass
+        return completed
+
+    def record(self, page_key, text):
+        """Append a finished page and make sure it reaches the disk"""
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+            if self._torn:
+                # End the line a crash cut short, so this record gets its own
+                self._file.write("\n")
+                self._torn = False
+        self._file.write(json.dumps({"page": page_key, "text": text}) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.completed[page_key] = text
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def discard(self):
+        """Remove the journal once the job has finished"""
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
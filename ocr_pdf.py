@@ -0,0 +1,101 @@
+"""Searchable PDF output: a copy of the input with an invisible OCR text layer.
+
+The words and their boxes come from the same image_to_data calls that
+produce the page text (see the words arguments in ocr_engine), so making
+the searchable copy costs no extra recognition. Each word is written in
+invisible text (render mode 3) over its place on the page, which lets PDF
+viewers search, select and copy it.
+"""
+import os
+
+import fitz  # PyMuPDF
+
+# Fonts for the text layer. The text is never drawn, but copy and search only
+# work for characters the font covers, so a font with Tamil and Latin is
+# preferred; the first file found is used. Set OCR_PDF_FONT to use another.
+FONT_FILES = [
+    os.environ.get("OCR_PDF_FONT"),
+    r"C:\Windows\Fonts\Nirmala.ttf",  # Windows: Latin and the Indic scripts
+    "/usr/share/fonts/truetype/freefont/FreeSerif.ttf",
+    "/usr/share/fonts/truetype/noto/NotoSansTamil-Regular.ttf",
+]
+
+
+def _load_font():
+    for path in FONT_FILES:
+        if path and os.path.isfile(path):
+            return fitz.Font(fontfile=path)
+    # Covers Latin only, but is always available
+    return fitz.Font("helv")
+
+
+def _upright_to_page(rotate, width, height):
+    """Matrix from a page turned clockwise by rotate degrees (as ocr_engine.rotate_upright
+    does) back to the page as rendered, both in points"""
+    if rotate == 90:
+        return fitz.Matrix(0, -1, 1, 0, 0, height)
+    if rotate == 180:
+        return fitz.Matrix(-1, 0, 0, -1, width, height)
+    if rotate == 270:
+        return fitz.Matrix(0, 1, -1, 0, width, 0)
+    return fitz.Matrix(1, 0, 0, 1, 0, 0)
+
+
+def _text_matrix(page, rotate):
+    """Matrix for TextWriter.write_text that moves text written on the upright
+    page to its place on the PDF page.
+
+    Upright points are turned back to the page as rendered, then into the
+    unrotated page coordinates that text is stored in. write_text applies
+    the matrix to the writer's own, y-up coordinates (and only then shifts
+    them for the page's /Rotate), so the turn is wrapped in that flip.
+    """
+    rendered = page.rect
+    flip = fitz.Matrix(1, 0, 0, -1, 0, rendered.height)
+    turn = _upright_to_page(rotate, rendered.width, rendered.height) * page.derotation_matrix
+    return flip * turn * flip
+
+
+class SearchablePDF:
+    """A copy of a PDF that OCR'd pages get an invisible text layer on"""
+
+    def __init__(self, pdf_path):
+        self.doc = fitz.open(pdf_path)
+        self.font = _load_font()
+        self.pages_with_text = 0
+
+    def add_page_words(self, page_index, words, rotate=0):
+        """Write the words of one page as invisible text.
+
+        words are (left, top, right, bottom, text) in points of the page as
+        rendered by ocr_engine, after turning it clockwise by rotate degrees.
+        """
+        if not words:
+            return
+        page = self.doc[page_index]
+        writer = fitz.TextWriter(page.rect)
+        line_height = self.font.ascender - self.font.descender
+        for left, top, right, bottom, word in words:
+            height = bottom - top
+            if height <= 0 or right <= left:
+                continue
+            # Size the word to its box, so selections line up with the scan
+            fontsize = height / line_height
+            length = self.font.text_length(word, fontsize=fontsize)
+            if length > right - left:
+                fontsize *= (right - left) / length
+            baseline = bottom + self.font.descender * fontsize
+            writer.append((left, baseline), word, font=self.font, fontsize=fontsize)
+
+        # The words are placed on the upright page; the matrix turns them,
+        # glyphs included, to match the scan
+        writer.write_text(page, render_mode=3, matrix=_text_matrix(page, rotate))
+        self.pages_with_text += 1
+
+    def save(self, output_path):
+        """Write the searchable copy and close it"""
+        self.doc.save(output_path, garbage=3, deflate=True)
+        self.doc.close()
+
+    def close(self):
+        self.doc.close()
@@ -0,0 +1,152 @@
+"""Timeline tracing of OCR jobs, exported as Chrome trace-event JSON.
+
+Pipeline stages (page rendering, cv2 preprocessing, Tesseract, text
+cleanup, translation and speech) are wrapped in named spans tagged with
+the file, page and worker process they ran for. While a job is traced,
+each process appends its spans to a part file; finish_job() merges them
+into one <job>.json that opens in chrome://tracing or ui.perfetto.dev.
+
+Tracing is off unless the OCR_TRACE environment variable names a
+directory or the caller passes one to start_job(); when off, span() costs
+a single check.
+"""
+import contextlib
+import functools
+import glob
+import json
+import os
+import re
+import threading
+import time
+
+DEFAULT_TRACE_DIR = os.path.join(os.path.expanduser("~"), ".ocr_tool", "traces")
+ENV_TRACE_DIR = os.environ.get("OCR_TRACE")
+
+# The job this process is recording, as {"dir": ..., "job": ...}, or None
+_trace = None
+_events = []
+_context = {}
+_lock = threading.Lock()
+
+
+def _now_us():
+    # Wall-clock time, so spans from different processes share one timeline
+    return time.time_ns() // 1000
+
+
+def start_job(name, trace_dir=None):
+    """Start tracing a job if trace_dir or OCR_TRACE is set.
+
+    Returns the trace settings to hand to worker processes (see
+    configure), or None when tracing is off or another job in this process
+    is already being traced; its spans then go to that job's file.
+    """
+    trace_dir = trace_dir or ENV_TRACE_DIR
+    if not trace_dir or _trace is not None:
+        return None
+    os.makedirs(trace_dir, exist_ok=True)
+    safe_name = re.sub(r"[^\w.-]+", "_", name)
+    job_id = f"{safe_name}_{time.strftime('%Y%m%d-%H%M%S')}_{os.getpid()}"
+    trace = {"dir": trace_dir, "job": job_id}
+    configure(trace)
+    return trace
+
+
+def configure(trace):
+    """Record spans for the given job (from start_job) in this process, or stop with None"""
+    global _trace
+    if trace == _trace:
+        return
+    flush()
+    _context.clear()
+    _trace = trace
+
+
+def set_context(**tags):
+    """Tags such as file and page added to every span this process records next"""
+    _context.clear()
+    _context.update({key: value for key, value in tags.items() if value is not None})
+
+
+@contextlib.contextmanager
+def span(name, **args):
+    """Time the enclosed block as a named stage"""
+    if _trace is None:
+        yield
+        return
+    start = _now_us()
+    try:
+        yield
+    finally:
+        event = {
+            "name": name,
+            "cat": "ocr",
+            "ph": "X",
+            "ts": start,
+            "dur": _now_us() - start,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": dict(_context, worker=os.getpid(), **args),
+        }
+        with _lock:
+            _events.append(event)
+
+
+def traced(name):
+    """Decorator form of span() for whole functions"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def flush():
+    """Append this process's buffered spans to its part file"""
+    with _lock:
+        if _trace is None or not _events:
+            _events.clear()
+            return
+        events = list(_events)
+        _events.clear()
+    part_path = os.path.join(_trace["dir"], f"{_trace['job']}.{os.getpid()}.part")
+    with open(part_path, 'a', encoding='utf-8') as f:
+        for event in events:
+            f.write(json.dumps(event) + "\n")
+
+
+def finish_job(trace):
+    """Merge every process's spans for the job into one trace file and return its path.
+
+    Worker processes must have flushed their spans before this is called.
+    """
+    if trace is None:
+        return None
+    if _trace == trace:
+        configure(None)
+
+    events = []
+    pids = set()
+    part_paths = glob.glob(os.path.join(trace["dir"], f"{glob.escape(trace['job'])}.*.part"))
+    for part_path in part_paths:
+        with open(part_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                events.append(event)
+                pids.add(event["pid"])
+        os.remove(part_path)
+
+    # Name the timeline rows after the process that produced them
+    for pid in pids:
+        label = "main" if pid == os.getpid() else f"worker {pid}"
+        events.append({"name": "process_name", "ph": "M", "pid": pid, "args": {"name": label}})
+
+    trace_path = os.path.join(trace["dir"], f"{trace['job']}.json")
+    with open(trace_path, 'w', encoding='utf-8') as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    return trace_path
@@ -0,0 +1,18 @@
+import pytest
+
+gui = pytest.importorskip("gui")
+
+
+def test_parse_page_ranges():
+    assert gui.parse_page_ranges("1-3, 5, 7-8", 10) == {1, 2, 3, 5, 7, 8}
+    assert gui.parse_page_ranges(" 4 ", 10) == {4}
+
+
+def test_parse_page_ranges_empty_selects_every_page():
+    assert gui.parse_page_ranges("", 3) == {1, 2, 3}
+
+
+@pytest.mark.parametrize("text", ["0", "11", "5-3", "2-11", "a", "1-"])
+def test_parse_page_ranges_rejects_bad_input(text):
+    with pytest.raises(ValueError):
+        gui.parse_page_ranges(text, 10)
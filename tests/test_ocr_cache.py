@@ -0,0 +1,110 @@
+import sqlite3
+
+import pytest
+
+np = pytest.importorskip("numpy")
+import ocr_cache  # noqa: E402
+from ocr_cache import OCRCache, make_key  # noqa: E402
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = OCRCache(str(tmp_path / "cache.sqlite"))
+    yield cache
+    cache.close()
+
+
+def test_make_key_depends_on_pixels_and_settings():
+    page = np.zeros((20, 30), np.uint8)
+    other = page.copy()
+    other[5, 5] = 255
+    assert make_key(page, lang="eng") == make_key(page.copy(), lang="eng")
+    assert make_key(page, lang="eng") != make_key(other, lang="eng")
+    assert make_key(page, lang="eng") != make_key(page, lang="tam")
+    # Same bytes, different shape
+    assert make_key(page, lang="eng") != make_key(page.reshape(30, 20), lang="eng")
+
+
+def test_lookup_counts_hits_and_misses(cache):
+    assert cache.lookup("page") is None
+    cache.put("page", "text", 91.5)
+    assert cache.lookup("page") == ("text", 91.5)
+    assert cache.get("page") == "text"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"], stats["bytes"]) == (2, 1, 1, 4)
+
+
+def test_uncounted_lookups_leave_the_counters_alone(cache):
+    cache.put("page:words", "[]")
+    assert cache.get("page:words", count=False) == "[]"
+    assert cache.lookup("osd", count=False) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (0, 0)
+
+
+def test_lookups_are_written_on_flush(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = OCRCache(path)
+    cache.put("page", "text")
+    cache.lookup("page")
+    cache.lookup("other")
+    # Another process sees nothing until the lookups are flushed
+    other = OCRCache(path)
+    assert (other.stats()["hits"], other.stats()["misses"]) == (0, 0)
+    cache.flush()
+    assert (other.stats()["hits"], other.stats()["misses"]) == (1, 1)
+    other.close()
+    cache.close()
+
+
+def test_replacing_an_entry_keeps_the_size_right(cache):
+    cache.put("page", "long text")
+    cache.put("page", "short")
+    assert cache.stats()["bytes"] == 5
+
+
+def test_put_evicts_least_recently_used_to_ninety_percent(tmp_path):
+    cache = OCRCache(str(tmp_path / "cache.sqlite"), max_bytes=100)
+    for name in "abcde":
+        cache.put(name, name * 20)
+    cache.get("a")  # a is now the most recently used
+    cache.put("f", "f" * 20)
+
+    # 120 bytes is over the limit; the oldest entries go until at most 90 remain
+    assert cache.get("b") is None and cache.get("c") is None
+    assert [cache.get(name) is not None for name in "adef"] == [True] * 4
+    assert cache.stats()["bytes"] == 80
+    cache.close()
+
+
+def test_opens_a_cache_from_before_confidences(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute("CREATE TABLE results (key TEXT PRIMARY KEY, text TEXT NOT NULL, "
+                     "size INTEGER NOT NULL, last_used REAL NOT NULL)")
+        conn.execute("INSERT INTO results VALUES ('old', 'old text', 8, 0)")
+    conn.close()
+
+    cache = OCRCache(path)
+    assert cache.lookup("old") == ("old text", None)
+    cache.put("new", "new text", 75.0)
+    assert cache.lookup("new") == ("new text", 75.0)
+    assert cache.stats()["bytes"] == 16
+    cache.close()
+
+
+def test_forked_process_opens_its_own_default_cache(tmp_path, monkeypatch):
+    parent = OCRCache(str(tmp_path / "cache.sqlite"))
+    monkeypatch.setattr(ocr_cache, "_default_cache", parent)
+    monkeypatch.setattr(ocr_cache, "_inherited_caches", [])
+    assert ocr_cache.get_default_cache() is parent
+
+    monkeypatch.setattr(ocr_cache.os, "getpid", lambda: parent.pid + 1)
+    child = ocr_cache.get_default_cache()
+    assert child is not parent
+    assert (child.path, child.pid) == (parent.path, parent.pid + 1)
+    assert ocr_cache.get_default_cache() is child
+    child.close()
+    parent.close()
+
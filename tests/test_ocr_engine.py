@@ -0,0 +1,353 @@
+import pytest
+
+ocr_engine = pytest.importorskip("ocr_engine")
+import fitz  # noqa: E402
+import numpy as np  # noqa: E402
+import pytesseract  # noqa: E402
+from ocr_cache import OCRCache  # noqa: E402
+from ocr_engine import PreprocessLearner, reading_order, tile_boxes  # noqa: E402
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = OCRCache(str(tmp_path / "cache.sqlite"))
+    yield cache
+    cache.close()
+
+
+def test_tile_boxes_cover_the_image_with_overlap():
+    boxes = tile_boxes(10000, 5000, side=4000, overlap=800)
+    assert boxes[0] == (0, 0, 4000, 4000)
+    covered = np.zeros((5000, 10000), bool)
+    for x, y, w, h in boxes:
+        assert w <= 4000 and h <= 4000
+        covered[y:y + h, x:x + w] = True
+    assert covered.all()
+    # Neighbours overlap by exactly the overlap
+    assert boxes[1][0] == boxes[0][0] + 4000 - 800
+
+
+def test_tile_boxes_small_image_is_one_tile():
+    assert tile_boxes(300, 200, side=4000, overlap=800) == [(0, 0, 300, 200)]
+
+
+def test_large_images_allowed_until_the_last_thread_leaves():
+    default = ocr_engine.Image.MAX_IMAGE_PIXELS
+    first, second = ocr_engine._large_images_allowed(), ocr_engine._large_images_allowed()
+    # Two threads overlap: the first leaves while the second is still opening its page
+    first.__enter__()
+    second.__enter__()
+    first.__exit__(None, None, None)
+    assert ocr_engine.Image.MAX_IMAGE_PIXELS == ocr_engine.MAX_IMAGE_PIXELS
+    second.__exit__(None, None, None)
+    assert ocr_engine.Image.MAX_IMAGE_PIXELS == default
+
+
+# Words of a fake wide image as (left, top, width, height, text), on two lines
+TILED_WORDS = [(10 + 40 * i, 20, 25, 10, word) for i, word in enumerate(
+    "alpha beta gamma delta epsilon zeta".split())] + [
+    (60, 60, 25, 10, "second"), (95, 60, 25, 10, "line")]
+
+
+DATA_COLUMNS = ("text", "left", "top", "width", "height", "block_num", "par_num", "line_num")
+
+
+def _fake_tile_ocr(tile):
+    """image_to_data output for a tile of the fake image, whose pixel values are
+    their x coordinate; like Tesseract, it only sees words wholly in the tile"""
+    x, width = int(tile[0, 0]), tile.shape[1]
+    data = {column: [] for column in DATA_COLUMNS}
+    for left, top, w, h, word in TILED_WORDS:
+        if x <= left and left + w <= x + width:
+            row = (word, left - x, top, w, h, 1, 1, 1 if top < 50 else 2)
+            for column, value in zip(DATA_COLUMNS, row):
+                data[column].append(value)
+    return data
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_ocr_tiled_keeps_words_once_and_joins_lines_at_seams(workers):
+    gray = np.tile(np.arange(250, dtype=np.uint8), (100, 1))
+    text = ocr_engine.ocr_tiled(gray, _fake_tile_ocr, workers, side=100, overlap=30)
+    assert text == "alpha beta gamma delta epsilon zeta\nsecond line"
+
+
+def test_merge_seam_lines_leaves_lines_of_one_tile_apart():
+    # Two lines of one tile side by side, as in two columns
+    tile = [[0, 0, 50, 10, [(0, "left")]], [60, 0, 110, 10, [(60, "right")]]]
+    assert len(ocr_engine._merge_seam_lines([tile])) == 2
+
+
+PARAGRAPH = ("The quick brown fox jumps over the lazy dog while the river keeps running past "
+             "the old mill and the village market opens early on every day of the week. ") * 2
+
+
+def _text_page(columns):
+    """A page of two paragraphs per column, rendered as a scan would be"""
+    doc = fitz.open()
+    page = doc.new_page(width=595, height=842)
+    width = (495 - 30 * (columns - 1)) / columns
+    for column in range(columns):
+        x = 50 + column * (width + 30)
+        assert page.insert_textbox(fitz.Rect(x, 60, x + width, 800), f"{PARAGRAPH}\n\n{PARAGRAPH}", fontsize=10) >= 0
+    gray = ocr_engine.render_page_gray(page, 2)
+    doc.close()
+    return gray
+
+
+def test_find_text_blocks_joins_the_lines_of_a_column():
+    assert len(ocr_engine.find_text_blocks(_text_page(1))) == 1
+
+
+def test_find_text_blocks_keeps_columns_apart():
+    left, right = ocr_engine.find_text_blocks(_text_page(2))
+    assert left[0] + left[2] < right[0]
+    assert abs(left[1] - right[1]) < 5 and abs(left[3] - right[3]) < 5
+
+
+def test_clip_to_neighbours_keeps_margins_out_of_other_blocks():
+    # Two blocks one above the other, and a column to their right
+    boxes = [(10, 10, 100, 50), (10, 52, 100, 90), (103, 10, 150, 90)]
+    padded = [(6, 6, 104, 54), (6, 48, 104, 94), (99, 6, 154, 94)]
+    assert ocr_engine._clip_to_neighbours(boxes, padded) == [
+        (6, 6, 103, 52), (6, 50, 103, 94), (100, 6, 154, 94)]
+
+
+def _probe(text="", fontsize=8):
+    """A page with at most one line of text, rendered as the blank check sees it"""
+    doc = fitz.open()
+    page = doc.new_page(width=595, height=842)
+    if text:
+        page.insert_text((72, 400), text, fontsize=fontsize)
+    gray = ocr_engine.render_page_gray(page, ocr_engine.PROBE_ZOOM)
+    doc.close()
+    return gray
+
+
+@pytest.mark.parametrize("text, fontsize", [
+    ("ISBN 978-0-12-345678-9", 8),
+    ("Printed in India", 8),
+    ("Figure 1", 9),
+])
+def test_is_blank_page_keeps_a_line_of_small_print(text, fontsize):
+    assert not ocr_engine.is_blank_page(_probe(text, fontsize))
+
+
+def test_is_blank_page_ignores_a_few_specks():
+    gray = _probe()
+    assert ocr_engine.is_blank_page(gray)
+    gray[100:104, 100:104] = 0
+    gray[700:703, 500:503] = 0
+    assert ocr_engine.is_blank_page(gray)
+
+
+def test_reading_order_reads_columns_under_a_heading():
+    heading = (0, 0, 300, 20)
+    left = [(0, 40, 120, 50), (0, 100, 120, 50)]
+    # Paragraphs that don't line up across the columns
+    right = [(180, 40, 120, 80), (180, 130, 120, 30)]
+    assert reading_order([right[1], left[1], heading, right[0], left[0]]) == [heading, *left, *right]
+
+
+def _two_column_page(picture=False):
+    """A born-digital page with two paragraphs per column, level with each other"""
+    doc = fitz.open()
+    page = doc.new_page(width=400, height=400)
+    for x, column in ((40, "LEFT"), (220, "RIGHT")):
+        for number, y in ((1, 40), (2, 240)):
+            page.insert_textbox(fitz.Rect(x, y, x + 140, y + 60),
+                                f"{column}{number} paragraph text in the column", fontsize=11)
+    if picture:
+        # An image of text between the left column's paragraphs
+        pixmap = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 20, 10), False)
+        pixmap.clear_with(255)
+        page.insert_image(fitz.Rect(40, 120, 180, 200), pixmap=pixmap)
+    return doc, page
+
+
+def test_page_text_from_layer_reads_columns_in_turn():
+    doc, page = _two_column_page()
+    text = ocr_engine.page_text_from_layer(page, lambda image: pytest.fail("nothing to OCR"))
+    assert [paragraph.split()[0] for paragraph in text.split("\n\n")] == ["LEFT1", "LEFT2", "RIGHT1", "RIGHT2"]
+    doc.close()
+
+
+def test_page_text_from_layer_places_ocr_regions_in_their_column():
+    doc, page = _two_column_page(picture=True)
+    text = ocr_engine.page_text_from_layer(page, lambda image: "PICTURE")
+    assert [paragraph.split()[0] for paragraph in text.split("\n\n")] == [
+        "LEFT1", "PICTURE", "LEFT2", "RIGHT1", "RIGHT2"]
+    doc.close()
+
+
+def test_route_language_picks_the_pack_language_of_the_script():
+    assert ocr_engine.route_language("tam+eng", "Tamil", 5.0) == "tam"
+    assert ocr_engine.route_language("tam+eng", "Latin", 5.0) == "eng"
+    # Not confident, or more than one language of the pack uses the script
+    assert ocr_engine.route_language("tam+eng", "Tamil", 0.1) == "tam+eng"
+    assert ocr_engine.route_language("eng+fra", "Latin", 5.0) == "eng+fra"
+
+
+def test_memory_bounded_workers():
+    page = ocr_engine.PAGE_MEMORY_BYTES
+    assert ocr_engine.memory_bounded_workers(8) == 8
+    assert ocr_engine.memory_bounded_workers(8, 3 * page) == 3
+    assert ocr_engine.memory_bounded_workers(8, page // 2) == 1
+
+
+def _run_pages(learner, pages):
+    """Plan and record pages, returning the plans"""
+    plans = []
+    for _ in range(pages):
+        plan = learner.plan()
+        plans.append(plan)
+        learner.record([_outcome(plan)])
+    return plans
+
+
+def _outcome(plan):
+    # otsu wins whenever the methods are compared; alone, the leader scores 85
+    if plan.get("explore"):
+        return ("otsu", 90.0, True)
+    return (plan["order"][0], 85.0, False)
+
+
+def test_learner_tries_every_method_while_learning():
+    learner = PreprocessLearner()
+    plans = _run_pages(learner, ocr_engine.STRATEGY_LEARN_PAGES)
+    assert all(plan == {"explore": True} for plan in plans)
+    plan = learner.plan()
+    assert plan["order"][0] == "otsu"
+    assert plan["accept"] == pytest.approx(90.0 - ocr_engine.STRATEGY_CONFIDENCE_DROP)
+
+
+def test_learner_explores_every_few_pages():
+    learner = PreprocessLearner()
+    plans = _run_pages(learner, 40)
+    explored = [number for number, plan in enumerate(plans, 1) if plan.get("explore")]
+    every = ocr_engine.STRATEGY_EXPLORE_EVERY
+    assert explored == list(range(1, ocr_engine.STRATEGY_LEARN_PAGES + 1)) + list(range(every, 41, every))
+
+
+def test_learner_lets_a_better_method_take_over():
+    learner = PreprocessLearner()
+    # adaptive wins the learning pages...
+    for _ in range(ocr_engine.STRATEGY_LEARN_PAGES):
+        learner.plan()
+        learner.record([("adaptive", 90.0, True)])
+    # ...then otsu wins every page where the methods are compared again
+    plans = _run_pages(learner, 200)
+    leaders = [plan["order"][0] for plan in plans if not plan.get("explore")]
+    assert leaders[0] == "adaptive"
+    assert leaders[-1] == "otsu"
+
+
+def test_learner_ignores_pages_without_outcomes():
+    learner = PreprocessLearner()
+    learner.plan()
+    learner.record([])
+    assert learner.pages_recorded == 0
+
+
+def _fake_recognize(results):
+    """recognize() returning the given (text, confidence) results, or raising them, in call order"""
+    calls = []
+
+    def recognize(img, lang_code, words=None):
+        number = len(calls) % len(results)
+        calls.append(number)
+        result = results[number]
+        if isinstance(result, Exception):
+            raise result
+        return result
+    return recognize, calls
+
+
+def _page_image():
+    gray = np.full((60, 80), 255, np.uint8)
+    gray[20:40, 10:70] = 0
+    return gray
+
+
+def test_perform_ocr_scored_caches_recognized_text(monkeypatch, cache):
+    recognize, calls = _fake_recognize([("text", 95.0)])
+    monkeypatch.setattr(ocr_engine, "recognize", recognize)
+    assert ocr_engine.perform_ocr_scored(_page_image(), "eng", cache=cache) == ("text", 95.0)
+    assert ocr_engine.perform_ocr_scored(_page_image(), "eng", cache=cache) == ("text", 95.0)
+    assert len(calls) == 1
+
+
+def test_perform_ocr_scored_does_not_cache_failures(monkeypatch, cache):
+    monkeypatch.setattr(ocr_engine, "recognize", _fake_recognize([RuntimeError("tesseract missing")])[0])
+    reports = []
+    assert ocr_engine.perform_ocr_scored(_page_image(), "eng", reports.append, cache=cache) == ("", 0.0)
+    assert reports
+    assert cache.stats()["entries"] == 0
+
+
+def test_perform_ocr_scored_plan_runs_the_leader_alone(monkeypatch, cache):
+    recognize, calls = _fake_recognize([("good enough", 70.0)])
+    monkeypatch.setattr(ocr_engine, "recognize", recognize)
+    outcomes = []
+    plan = {"order": ["otsu", "adaptive", "original"], "accept": 60.0}
+    result = ocr_engine.perform_ocr_scored(_page_image(), "eng", cache=cache, plan=plan, outcomes=outcomes)
+    assert result == ("good enough", 70.0)
+    assert outcomes == [("otsu", 70.0, False)]
+    assert len(calls) == 1
+    # Accepted below confidence_threshold only because of the plan, so not cached
+    assert cache.stats()["entries"] == 0
+
+
+class _InlineExecutor:
+    """ThreadPoolExecutor stand-in that runs calls in order, so fake results line up"""
+
+    def __init__(self, max_workers=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def map(self, func, items):
+        return [func(item) for item in items]
+
+
+def test_perform_ocr_scored_reports_compared_winner(monkeypatch):
+    recognize, _ = _fake_recognize([("weak", 40.0), ("best", 88.0), ("middling", 60.0)])
+    monkeypatch.setattr(ocr_engine, "recognize", recognize)
+    monkeypatch.setattr(ocr_engine, "ThreadPoolExecutor", _InlineExecutor)
+    outcomes = []
+    assert ocr_engine.perform_ocr_scored(_page_image(), "eng", outcomes=outcomes) == ("best", 88.0)
+    assert outcomes == [("otsu", 88.0, True)]
+
+
+def test_detect_orientation_caches_only_lasting_answers(monkeypatch, cache):
+    page = _page_image()
+
+    def missing_osd(image):
+        raise pytesseract.TesseractError(1, "Failed loading language 'osd'")
+    monkeypatch.setattr(ocr_engine, "image_to_osd", missing_osd)
+    monkeypatch.setattr(ocr_engine, "_osd_memo", {})
+    assert ocr_engine.detect_orientation(page, cache)["rotate"] == 0
+    assert cache.stats()["entries"] == 0
+
+    def too_few(image):
+        raise pytesseract.TesseractError(1, "Too few characters. Skipping this page")
+    monkeypatch.setattr(ocr_engine, "image_to_osd", too_few)
+    monkeypatch.setattr(ocr_engine, "_osd_memo", {})
+    assert ocr_engine.detect_orientation(page, cache)["rotate"] == 0
+    assert cache.stats()["entries"] == 1
+
+
+def test_detect_orientation_turns_only_confident_pages(monkeypatch):
+    osd = {"rotate": 90, "orientation_conf": 5.0, "script": "Latin", "script_conf": 3.0}
+    monkeypatch.setattr(ocr_engine, "image_to_osd", lambda image: dict(osd))
+    monkeypatch.setattr(ocr_engine, "_osd_memo", {})
+    assert ocr_engine.detect_orientation(_page_image())["rotate"] == 90
+
+    osd["orientation_conf"] = 0.5
+    monkeypatch.setattr(ocr_engine, "_osd_memo", {})
+    result = ocr_engine.detect_orientation(_page_image())
+    assert (result["rotate"], result["script"]) == (0, "Latin")
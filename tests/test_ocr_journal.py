@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+from ocr_journal import OCRJournal
+
+
+@pytest.fixture
+def scan(tmp_path):
+    path = tmp_path / "scan.pdf"
+    path.write_bytes(b"%PDF-1.4 not really a scan")
+    return str(path)
+
+
+def test_resume_picks_up_recorded_pages(tmp_path, scan):
+    journal = OCRJournal([scan], {"lang": "eng"}, str(tmp_path))
+    journal.record("raw:1", "first page")
+    journal.record("raw:2", None)
+    journal.close()
+
+    resumed = OCRJournal([scan], {"lang": "eng"}, str(tmp_path))
+    assert resumed.completed == {"raw:1": "first page", "raw:2": None}
+
+
+def test_settings_and_contents_select_the_journal(tmp_path, scan):
+    journal = OCRJournal([scan], {"lang": "eng"}, str(tmp_path))
+    journal.record("1", "text")
+    journal.close()
+
+    assert OCRJournal([scan], {"lang": "tam"}, str(tmp_path)).completed == {}
+    with open(scan, "ab") as f:
+        f.write(b" edited")
+    assert OCRJournal([scan], {"lang": "eng"}, str(tmp_path)).completed == {}
+
+
+def test_torn_last_line_loses_only_that_page(tmp_path, scan):
+    journal = OCRJournal([scan], {}, str(tmp_path))
+    journal.record("1", "one")
+    journal.close()
+    # Killed while writing page 2
+    with open(journal.path, "a", encoding="utf-8") as f:
+        f.write('{"page": "2", "te')
+
+    resumed = OCRJournal([scan], {}, str(tmp_path))
+    assert resumed.completed == {"1": "one"}
+    resumed.record("2", "two")
+    resumed.record("3", "three")
+    resumed.close()
+
+    assert OCRJournal([scan], {}, str(tmp_path)).completed == {"1": "one", "2": "two", "3": "three"}
+
+
+def test_discard_removes_the_journal(tmp_path, scan):
+    journal = OCRJournal([scan], {}, str(tmp_path))
+    journal.record("1", "one")
+    journal.discard()
+    assert not os.path.exists(journal.path)
+    assert OCRJournal([scan], {}, str(tmp_path)).completed == {}
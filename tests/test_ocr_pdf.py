@@ -0,0 +1,62 @@
+import pytest
+
+fitz = pytest.importorskip("fitz")
+ocr_engine = pytest.importorskip("ocr_engine")
+import numpy as np  # noqa: E402
+import ocr_pdf  # noqa: E402
+
+# Where the scanned word is, in the unrotated page coordinates that
+# get_text reports: across the page, or down it on pages scanned sideways
+ACROSS = fitz.Rect(40, 80, 160, 100)
+DOWN = fitz.Rect(80, 40, 100, 160)
+
+
+def make_scan(path, page_rotation, word_rect=ACROSS):
+    """A one-page PDF with a black bar standing in for a scanned word"""
+    doc = fitz.open()
+    page = doc.new_page(width=400, height=600)
+    page.draw_rect(word_rect, color=None, fill=(0, 0, 0))
+    page.set_rotation(page_rotation)
+    doc.save(path)
+    doc.close()
+
+
+def upright_word_box(path, osd_rotation):
+    """The bar's box as OCR sees it: rendered at zoom 1, then turned upright"""
+    with fitz.open(path) as doc:
+        gray = ocr_engine.rotate_upright(ocr_engine.render_page_gray(doc[0], 1), osd_rotation)
+        ys, xs = np.nonzero(gray < 128)
+        return (int(xs.min()), int(ys.min()), int(xs.max()) + 1, int(ys.max()) + 1)
+
+
+@pytest.mark.parametrize("page_rotation", [0, 90, 180, 270])
+@pytest.mark.parametrize("osd_rotation", [0, 90, 180, 270])
+def test_words_land_on_their_scan(tmp_path, page_rotation, osd_rotation):
+    scan_path = str(tmp_path / "scan.pdf")
+    output_path = str(tmp_path / "searchable.pdf")
+    # The word reads across the page once it is turned upright
+    word_rect = ACROSS if (page_rotation + osd_rotation) % 180 == 0 else DOWN
+    make_scan(scan_path, page_rotation, word_rect)
+    box = upright_word_box(scan_path, osd_rotation)
+    assert box[2] - box[0] > box[3] - box[1]
+
+    searchable = ocr_pdf.SearchablePDF(scan_path)
+    searchable.add_page_words(0, [box + ("searchable",)], osd_rotation)
+    searchable.save(output_path)
+
+    with fitz.open(output_path) as doc:
+        words = doc[0].get_text("words")
+    assert [word[4] for word in words] == ["searchable"]
+    found = fitz.Rect(words[0][:4])
+    # Same place and the same way round as the scanned word
+    assert (found.tl + found.br) / 2 in word_rect
+    assert (found.width > found.height) == (word_rect.width > word_rect.height)
+
+
+def test_pages_without_words_are_left_alone(tmp_path):
+    scan_path = str(tmp_path / "scan.pdf")
+    make_scan(scan_path, 0)
+    searchable = ocr_pdf.SearchablePDF(scan_path)
+    searchable.add_page_words(0, [])
+    assert searchable.pages_with_text == 0
+    searchable.close()
@@ -0,0 +1,93 @@
+import pytest
+
+import text_processing
+from text_processing import BoilerplateIndex, detect_language, join_paragraph_lines, post_process_text
+
+
+def test_join_paragraph_lines():
+    text = "first line\n  second line \n\n\nnext paragraph\n"
+    assert join_paragraph_lines(text) == "first line second line\n\nnext paragraph"
+
+
+def test_post_process_text_empty():
+    assert post_process_text("") == ""
+    assert post_process_text(None) is None
+
+
+def test_post_process_text_character_fixes_apply_in_order():
+    # A 1 becomes l, but an l already in the text becomes I
+    assert post_process_text("1ine") == "line"
+    assert post_process_text("ab|e") == "abIe"
+    assert post_process_text("[x]") == "(x)"
+
+
+def test_post_process_text_spacing():
+    assert post_process_text("Good ,bad") == "Good, bad"
+    assert post_process_text("co- operate") == "co-operate"
+    assert post_process_text("a -b") == "a-b"
+
+
+def test_post_process_text_keeps_dash_without_word_before_it():
+    assert post_process_text("- item") == "- item"
+
+
+def test_post_process_text_removes_non_printable():
+    assert post_process_text("ab\u200bc\td\x07") == "abc\td"
+
+
+def _page(number, body):
+    return "\n".join(["Annual Report 2023", *body, f"Page {number} of 5"])
+
+
+BODY_WORDS = "river temple market letter archive village record history".split()
+
+
+def _body(number):
+    return [f"{BODY_WORDS[(number + i) % len(BODY_WORDS)]} line {chr(97 + i)}" for i in range(8)]
+
+
+def test_boilerplate_index_removes_running_headers_and_footers():
+    pages = [_page(n, _body(n)) for n in range(1, 6)]
+    index = BoilerplateIndex(pages)
+    assert index.clean_lines(pages[1], 2) == _body(2)
+
+
+def test_boilerplate_index_needs_lines_on_enough_pages():
+    pages = ["Chapter One\nbody a", "Chapter One\nbody b", "Other\nbody c", "Other\nbody d",
+             "Other\nbody e", "Other\nbody f", "Other\nbody g"]
+    index = BoilerplateIndex(pages)
+    # Two pages out of seven is below both BOILERPLATE_MIN_PAGES and the share
+    assert index.clean_lines(pages[0]) == ["Chapter One", "body a"]
+    assert index.clean_lines(pages[2]) == ["body c"]
+
+
+def test_boilerplate_index_drops_own_page_number():
+    index = BoilerplateIndex([])
+    assert index.clean_lines("12\nsome text\nmore text", 12) == ["some text", "more text"]
+    assert index.clean_lines("7\nsome text", 12) == ["7", "some text"]
+
+
+@pytest.mark.parametrize("text, language", [
+    ("தமிழ் மொழி நூல் பக்கம் கோயில்", "ta"),
+    ("यह एक हिंदी वाक्य है", "hi"),
+    ("これは日本語の文です", "ja"),
+    ("这是中文句子", "zh-cn"),
+    ("", None),
+    ("   ", None),
+    ("12 345 - 67 !!", None),
+])
+def test_detect_language_by_script(text, language):
+    assert detect_language(text) == language
+
+
+def test_detect_language_latin_uses_langdetect():
+    pytest.importorskip("langdetect")
+    assert detect_language("The quick brown fox jumps over the lazy dog near the river bank.") == "en"
+
+
+def test_detect_language_samples_long_text():
+    # Mostly Tamil with a long English tail still counts as Tamil
+    text = "தமிழ் மொழி நூல் " * 2000 + "plain English words " * 100
+    sample = text_processing._language_sample(text)
+    assert len(sample) <= text_processing.LANGUAGE_SAMPLE_CHARS + text_processing.LANGUAGE_SAMPLE_WINDOWS
+    assert detect_language(text) == "ta"
@@ -0,0 +1,234 @@
+"""Cleanup and language detection of OCR text, shared by the editor and conversion tools.
+
+The cleanup rules are declared once below and compiled at import. Each
+rule is one C-level pass over the text (str.replace or a precompiled
+regular expression); nothing loops over the text character by character
+in Python, so a whole book is cleaned in well under a second.
+"""
+import hashlib
+import re
+
+# Characters and sequences OCR commonly confuses, replaced in this order
+# (so a 1 becomes l, but an original l becomes I)
+CHARACTER_FIXES = [
+    ('l', 'I'),  # Common confusion between l and I
+    ('0', 'O'),  # Common confusion between 0 and O
+    ('|', 'I'),  # Common confusion with vertical bar
+    ('1', 'l'),  # Common confusion between 1 and l
+    ('rn', 'm'),  # Common confusion between rn and m
+    ('[', '('),  # Common bracket confusions
+    (']', ')'),
+    ('{', '('),
+    ('}', ')'),
+]
+
+# Spacing and hyphenation fixes, applied in order as (pattern, replacement).
+# A replacement of None marks a pattern whose leading lookbehind, (?<=\w),
+# is checked by _after_word instead: the regex can then start from a
+# literal, which makes it several times faster on long text.
+SPACING_RULES = [
+    (r'(?<=\w)\s+(?=[\.,!?])', ''),  # Remove space before punctuation
+    (r'(?<=[\.,!?])\s*(?=\w)', ' '),  # Ensure space after punctuation
+    (r'\s+[b-zB-Z]\s+', ' '),  # Remove likely OCR errors (single characters surrounded by spaces)
+    (r'-\s+', None),  # Fix hyphenation: (?<=\w)-\s+ becomes -
+    (r'\s+-(?=\w)', '-'),
+]
+
+# Control characters kept when non-printable characters are removed
+KEPT_CONTROL_CHARACTERS = '\n\t'
+
+_WORD_CHARACTER = re.compile(r'\w')
+
+
+def _after_word(match):
+    """Replacement for '-\\s+' that only applies when a word character precedes it"""
+    start = match.start()
+    if start and _WORD_CHARACTER.match(match.string, start - 1):
+        return '-'
+    return match.group()
+
+
+_spacing_rules = [
+    (re.compile(pattern), _after_word if replacement is None else replacement)
+    for pattern, replacement in SPACING_RULES
+]
+
+
+def join_paragraph_lines(text):
+    """Join the lines of every paragraph (separated by blank lines) into one line"""
+    paragraphs = []
+    for para in text.split('\n\n'):
+        lines = [line.strip() for line in para.split('\n')]
+        cleaned_para = ' '.join(line for line in lines if line)
+        if cleaned_para:
+            paragraphs.append(cleaned_para)
+    return '\n\n'.join(paragraphs)
+
+
+def remove_non_printable(text):
+    """Drop non-printable characters other than newlines and tabs"""
+    stripped = text
+    for char in KEPT_CONTROL_CHARACTERS:
+        stripped = stripped.replace(char, '')
+    if stripped.isprintable():
+        # The usual case, answered by a single C-level scan
+        return text
+    for char in set(stripped):
+        if not char.isprintable():
+            text = text.replace(char, '')
+    return text
+
+
+def post_process_text(text):
+    """Clean up OCR text: rejoin paragraphs, fix common misreadings and spacing"""
+    if not text:
+        return text
+
+    text = join_paragraph_lines(text)
+    for wrong, correct in CHARACTER_FIXES:
+        text = text.replace(wrong, correct)
+    for pattern, replacement in _spacing_rules:
+        text = pattern.sub(replacement, text)
+    # Last, as invisible characters such as zero-width joiners still keep
+    # the spacing rules from matching across them
+    text = remove_non_printable(text)
+    return text.strip()
+
+
+# Header/footer detection: the first and last lines of each page...
+BOILERPLATE_EDGE_LINES = 3
+# ...are boilerplate when the same line, with digits ignored, is at the edge
+# of at least this share of the document's pages, and of at least
+# BOILERPLATE_MIN_PAGES of them
+BOILERPLATE_MIN_SHARE = 0.3
+BOILERPLATE_MIN_PAGES = 3
+
+_DIGIT_RUN = re.compile(r'\d+')
+
+
+def _line_signature(line):
+    """A line with page numbers, dates and other digit runs made equal"""
+    return _DIGIT_RUN.sub('#', ' '.join(line.split()).casefold())
+
+
+def _edge_lines(lines, edge_lines):
+    """Indexes of the first and last edge_lines lines"""
+    if len(lines) <= 2 * edge_lines:
+        return range(len(lines))
+    return list(range(edge_lines)) + list(range(len(lines) - edge_lines, len(lines)))
+
+
+class BoilerplateIndex:
+    """Running headers and footers of a document, found across its pages.
+
+    Built from the raw text of every page: the lines at the top and bottom
+    of each page are counted by signature, and signatures that recur on
+    many pages (running titles, "Page 12 of 300" and the like) are treated
+    as boilerplate. A line at the edge of a page that is just the page's
+    own number is always dropped.
+    """
+
+    def __init__(self, pages, edge_lines=BOILERPLATE_EDGE_LINES,
+                 min_share=BOILERPLATE_MIN_SHARE, min_pages=BOILERPLATE_MIN_PAGES):
+        self.edge_lines = edge_lines
+        counts = {}
+        page_count = 0
+        for text in pages:
+            lines = [line for line in text.splitlines() if line.strip()]
+            # Count each signature once per page
+            for signature in {_line_signature(lines[i]) for i in _edge_lines(lines, edge_lines)}:
+                counts[signature] = counts.get(signature, 0) + 1
+            page_count += 1
+        threshold = max(min_pages, min_share * page_count)
+        self.signatures = {signature for signature, count in counts.items() if count >= threshold}
+
+    def clean_lines(self, text, page_number=None):
+        """The non-empty lines of a page with its headers and footers removed"""
+        lines = [line for line in text.splitlines() if line.strip()]
+        page_label = None if page_number is None else str(page_number)
+        drop = set()
+        for i in _edge_lines(lines, self.edge_lines):
+            stripped = lines[i].strip()
+            if stripped == page_label or (self.signatures and _line_signature(stripped) in self.signatures):
+                drop.add(i)
+        return [line for i, line in enumerate(lines) if i not in drop]
+
+
+# Language detection: letters of each script, with the language they stand
+# for. Latin letters are shared by English, French, Spanish and German, so
+# Latin text (None) is told apart by langdetect
+SCRIPT_LANGUAGES = [
+    ('ta', '\u0B80-\u0BFF'),  # Tamil
+    ('hi', '\u0900-\u097F'),  # Devanagari
+    ('te', '\u0C00-\u0C7F'),  # Telugu
+    ('kn', '\u0C80-\u0CFF'),  # Kannada
+    ('ml', '\u0D00-\u0D7F'),  # Malayalam
+    ('ja', '\u3040-\u30FF'),  # Hiragana and Katakana
+    ('zh-cn', '\u4E00-\u9FFF'),  # CJK ideographs, also used in Japanese
+    (None, 'A-Za-z\u00C0-\u024F'),  # Latin
+]
+# Characters looked at: this many, taken in a few windows spread over the text
+LANGUAGE_SAMPLE_CHARS = 2000
+LANGUAGE_SAMPLE_WINDOWS = 4
+# A non-Latin script decides the language alone when it has this share of the letters
+LANGUAGE_MIN_SHARE = 0.6
+LANGUAGE_MEMO_SIZE = 4096
+
+_script_patterns = [(language, re.compile(f'[{letters}]')) for language, letters in SCRIPT_LANGUAGES]
+_language_memo = {}
+
+
+def _language_sample(text):
+    """At most LANGUAGE_SAMPLE_CHARS characters from across the text"""
+    if len(text) <= LANGUAGE_SAMPLE_CHARS:
+        return text
+    window = LANGUAGE_SAMPLE_CHARS // LANGUAGE_SAMPLE_WINDOWS
+    step = (len(text) - window) // (LANGUAGE_SAMPLE_WINDOWS - 1)
+    return ' '.join(text[i * step:i * step + window] for i in range(LANGUAGE_SAMPLE_WINDOWS))
+
+
+def script_counts(text):
+    """Number of letters of each script in SCRIPT_LANGUAGES, by language"""
+    counts = {language: len(pattern.findall(text)) for language, pattern in _script_patterns}
+    if counts['ja']:
+        # Kana next to ideographs means Japanese, not Chinese
+        counts['ja'] += counts.pop('zh-cn')
+    return counts
+
+
+def _detect_sample(sample, counts):
+    letters = sum(counts.values())
+    if not letters:
+        # Empty, numeric or punctuation-only text has no language
+        return None
+    language, count = max(counts.items(), key=lambda item: item[1])
+    if language is not None and count >= LANGUAGE_MIN_SHARE * letters:
+        return language
+
+    # Latin or mixed scripts: only here is langdetect loaded and run, and only on the sample
+    from langdetect import DetectorFactory, LangDetectException, detect
+    DetectorFactory.seed = 0  # Same answer for the same text
+    try:
+        return detect(sample)
+    except LangDetectException:
+        return language
+
+
+def detect_language(text):
+    """Language code of text ('ta', 'en', ...), or None when it has no letters.
+
+    The script of a bounded sample of the text decides for Indic and CJK
+    text; langdetect is the fallback for Latin or mixed text. Results are
+    remembered by text content, so each page is detected once.
+    """
+    if not text or not text.strip():
+        return None
+    key = hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+    if key in _language_memo:
+        return _language_memo[key]
+    sample = _language_sample(text)
+    language = _detect_sample(sample, script_counts(sample))
+    if len(_language_memo) >= LANGUAGE_MEMO_SIZE:
+        _language_memo.clear()
+    _language_memo[key] = language
+    return language